@@ -0,0 +1,258 @@
+import argparse
+import json
+import random
+import sys
+
+import common
+from pySHA import swar
+
+
+# Message sizes covered by a default run, and the larger sizes added with --full.
+# The pure Python implementations take a long time on the largest sizes.
+SIZES = [0, 64, 1 << 10, 64 << 10, 1 << 20]
+FULL_SIZES = SIZES + [16 << 20, 64 << 20]
+
+SUITES = ['throughput', 'chunks', 'construction', 'batch', 'swar']
+
+# The SWAR batch engine functions, for the algorithms that have one
+SWAR_FUNCTIONS = {
+    '1': swar.sha1_batch,
+    '256': swar.sha256_batch,
+}
+
+# The fields that identify a benchmark. Two results with the same values
+# for these fields are compared against each other by the compare command.
+KEY_FIELDS = ['suite', 'algorithm', 'engine', 'size', 'chunk_size', 'count']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the pySHA implementations against hashlib and PyCryptodome.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='Runs the benchmarks and writes the results as JSON')
+    run.add_argument('--suites', nargs='+', choices=SUITES, default=SUITES)
+    run.add_argument('--algorithms', '-a', nargs='+', choices=common.ALGORITHMS, default=common.ALGORITHMS)
+    run.add_argument('--engines', '-e', nargs='+', choices=common.ENGINES, default=common.engines())
+    run.add_argument('--sizes', nargs='+', type=int, default=None,
+                        help='Message sizes in bytes for the throughput suite')
+    run.add_argument('--full', action='store_true',
+                        help='Adds the 16 MiB and 64 MiB messages to the throughput suite')
+    run.add_argument('--chunk-message-size', type=int, default=64 << 10,
+                        help='Size of the message fed in chunks by the chunks suite')
+    run.add_argument('--chunk-sizes', nargs='+', type=int, default=[64, 1 << 10, 16 << 10],
+                        help='Sizes of the chunks passed to update() by the chunks suite')
+    run.add_argument('--batch-count', type=int, default=1000,
+                        help='Number of messages hashed by the batch suite')
+    run.add_argument('--batch-size', type=int, default=64,
+                        help='Size of each message hashed by the batch suite')
+    run.add_argument('--lanes', nargs='+', type=int, default=[4, 16, 64, 256],
+                        help='Numbers of lanes used by the swar suite')
+    run.add_argument('--min-time', type=float, default=0.5,
+                        help='Minimum number of seconds spent on each measurement')
+    run.add_argument('--output', '-o', type=str, default=None,
+                        help='File to write the results to. Defaults to stdout')
+
+    compare = subparsers.add_parser('compare', help='Compares two result files and reports regressions')
+    compare.add_argument('baseline', type=str)
+    compare.add_argument('current', type=str)
+    compare.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown above which a result is reported as a regression')
+
+    return parser.parse_args()
+
+
+def message(size):
+    """
+    Returns a reproducible pseudo-random message of the given size
+    """
+    return random.Random(size).randbytes(size)
+
+
+def record(suite, algorithm, engine, calls, seconds, size=0, chunk_size=None, count=1):
+    """
+    Builds a single result. The latency is the time taken by one call, and
+    the throughput is computed from the total number of bytes hashed.
+    """
+    latency = seconds / calls
+    nbytes = size * count * calls
+    return {
+        'suite': suite,
+        'algorithm': algorithm,
+        'engine': engine,
+        'size': size,
+        'chunk_size': chunk_size,
+        'count': count,
+        'calls': calls,
+        'seconds': seconds,
+        'latency': latency,
+        'mb_per_s': nbytes / seconds / 1e6,
+    }
+
+
+def run_throughput(args, algorithm, engine):
+    """
+    Hashes a whole message in one update() call for each message size
+    """
+    results = []
+    sizes = args.sizes if args.sizes is not None else (FULL_SIZES if args.full else SIZES)
+    for size in sizes:
+        data = message(size)
+
+        def function():
+            hasher = common.new_hasher(engine, algorithm)
+            hasher.update(data)
+            hasher.digest()
+
+        calls, seconds = common.measure(function, args.min_time)
+        results.append(record('throughput', algorithm, engine, calls, seconds, size=size))
+    return results
+
+
+def run_chunks(args, algorithm, engine):
+    """
+    Hashes the same message passed to update() in chunks of different sizes
+    """
+    results = []
+    size = args.chunk_message_size
+    data = message(size)
+    for chunk_size in args.chunk_sizes:
+        chunks = [data[i : i + chunk_size] for i in range(0, size, chunk_size)]
+
+        def function():
+            hasher = common.new_hasher(engine, algorithm)
+            for chunk in chunks:
+                hasher.update(chunk)
+            hasher.digest()
+
+        calls, seconds = common.measure(function, args.min_time)
+        results.append(record('chunks', algorithm, engine, calls, seconds, size=size, chunk_size=chunk_size))
+    return results
+
+
+def run_construction(args, algorithm, engine):
+    """
+    Measures only the cost of creating a new hasher
+    """
+    calls, seconds = common.measure(lambda: common.new_hasher(engine, algorithm), args.min_time)
+    return [record('construction', algorithm, engine, calls, seconds)]
+
+
+def run_batch(args, algorithm, engine):
+    """
+    Hashes many small messages, each with a new hasher
+    """
+    messages = [message(args.batch_size + i)[i:] for i in range(args.batch_count)]
+
+    def function():
+        for data in messages:
+            hasher = common.new_hasher(engine, algorithm)
+            hasher.update(data)
+            hasher.digest()
+
+    calls, seconds = common.measure(function, args.min_time)
+    return [record('batch', algorithm, engine, calls, seconds, size=args.batch_size, count=args.batch_count)]
+
+
+def run_swar(args, algorithm, engine):
+    """
+    Hashes the same messages as the batch suite with the SWAR batch engine,
+    once for each number of lanes, along with the pySHA hasher used once per
+    message for comparison. Only SHA-1 and SHA-256 have a SWAR engine, and
+    the suite only runs once for each of them, with the pysha engine.
+    """
+    if engine != 'pysha' or algorithm not in SWAR_FUNCTIONS:
+        return []
+
+    messages = [message(args.batch_size + i)[i:] for i in range(args.batch_count)]
+
+    def per_message():
+        for data in messages:
+            hasher = common.new_hasher(engine, algorithm)
+            hasher.update(data)
+            hasher.digest()
+
+    calls, seconds = common.measure(per_message, args.min_time)
+    results = [record('swar', algorithm, engine, calls, seconds, size=args.batch_size, count=args.batch_count)]
+
+    for lanes in args.lanes:
+        function = lambda: SWAR_FUNCTIONS[algorithm](messages, lanes)
+        calls, seconds = common.measure(function, args.min_time)
+        results.append(record('swar', algorithm, 'pysha-swar-%d' % (lanes), calls, seconds,
+                              size=args.batch_size, count=args.batch_count))
+    return results
+
+
+def run(args):
+    runners = {
+        'throughput': run_throughput,
+        'chunks': run_chunks,
+        'construction': run_construction,
+        'batch': run_batch,
+        'swar': run_swar,
+    }
+
+    results = []
+    for suite in args.suites:
+        for algorithm in args.algorithms:
+            for engine in args.engines:
+                if engine not in common.engines():
+                    print('Skipping %s, which is not installed' % (engine), file=sys.stderr)
+                    continue
+                if not common.supports(engine, algorithm):
+                    continue
+
+                suite_results = runners[suite](args, algorithm, engine)
+                for result in suite_results:
+                    print('%-12s %-7s %-13s %10s %8s  %12.3f ms  %10.3f MB/s' % (
+                        suite, algorithm, result['engine'], common.format_size(result['size']),
+                        '' if result['chunk_size'] is None else common.format_size(result['chunk_size']),
+                        1000 * result['latency'], result['mb_per_s']), file=sys.stderr)
+                results.extend(suite_results)
+
+    common.write_results(args.output, results)
+    return 0
+
+
+def compare(args):
+    """
+    Matches the results of two runs by their key fields and reports every
+    benchmark whose latency grew by more than the threshold. Returns 1 if
+    there is at least one regression, so that it can be used in scripts.
+    """
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    baseline_results = {tuple(result[field] for field in KEY_FIELDS): result for result in baseline['results']}
+
+    regressions = 0
+    for result in current['results']:
+        key = tuple(result[field] for field in KEY_FIELDS)
+        if key not in baseline_results:
+            continue
+
+        ratio = result['latency'] / baseline_results[key]['latency']
+        if ratio > 1 + args.threshold:
+            status = 'REGRESSION'
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            status = 'improved'
+        else:
+            status = ''
+
+        print('%-12s %-7s %-13s %10s %8s  %8.2fx  %s' % (
+            result['suite'], result['algorithm'], result['engine'], common.format_size(result['size']),
+            '' if result['chunk_size'] is None else common.format_size(result['chunk_size']), ratio, status))
+
+    print()
+    print('%d regression(s) above %.0f%%' % (regressions, 100 * args.threshold))
+    return 1 if regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'run':
+        sys.exit(run(args))
+    else:
+        sys.exit(compare(args))
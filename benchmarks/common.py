@@ -0,0 +1,158 @@
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+# The benchmarks are run as scripts from the repository, so the pySHA
+# package is imported from the directory above this one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+import pySHA
+from pySHA import tables
+
+try:
+    import Crypto
+    from Crypto.Hash import SHA1, SHA224, SHA256, SHA384, SHA512
+except ImportError:
+    Crypto = None
+
+
+# The keys are the same values accepted by sha.py --algorithm
+ALGORITHMS = ['1', '224', '256', '384', '512', '512224', '512256']
+
+PYSHA_CLASSES = {
+    '1': pySHA.SHA1,
+    '224': pySHA.SHA224,
+    '256': pySHA.SHA256,
+    '384': pySHA.SHA384,
+    '512': pySHA.SHA512,
+    '512224': pySHA.SHA512_224,
+    '512256': pySHA.SHA512_256,
+}
+
+# The table-driven engine only implements the 32-bit SHA-2 algorithms
+TABLES_CLASSES = {
+    '224': tables.SHA224_Tables,
+    '256': tables.SHA256_Tables,
+}
+
+ENGINES = ['pysha', 'pysha-tables', 'hashlib', 'pycryptodome']
+
+HASHLIB_NAMES = {
+    '1': 'sha1',
+    '224': 'sha224',
+    '256': 'sha256',
+    '384': 'sha384',
+    '512': 'sha512',
+    '512224': 'sha512_224',
+    '512256': 'sha512_256',
+}
+
+
+def engines():
+    """
+    Returns the names of the engines that can be benchmarked in the
+    current environment. PyCryptodome is optional.
+    """
+    names = ['pysha', 'pysha-tables', 'hashlib']
+    if Crypto is not None:
+        names.append('pycryptodome')
+    return names
+
+
+def supports(engine, algorithm):
+    """
+    Returns whether the engine implements the algorithm
+    """
+    if engine == 'pysha-tables':
+        return algorithm in TABLES_CLASSES
+    return True
+
+
+def new_hasher(engine, algorithm):
+    """
+    Returns a new hasher for the given engine and algorithm. All of the hashers
+    returned support update(), and digest() to compute the hash value.
+    """
+    if engine == 'pysha':
+        return PYSHA_CLASSES[algorithm](verbose=0)
+
+    elif engine == 'pysha-tables':
+        return TABLES_CLASSES[algorithm](verbose=0)
+
+    elif engine == 'hashlib':
+        return hashlib.new(HASHLIB_NAMES[algorithm])
+
+    elif engine == 'pycryptodome':
+        if algorithm == '1': return SHA1.new()
+        elif algorithm == '224': return SHA224.new()
+        elif algorithm == '256': return SHA256.new()
+        elif algorithm == '384': return SHA384.new()
+        elif algorithm == '512': return SHA512.new()
+        elif algorithm == '512224': return SHA512.new(truncate='224')
+        elif algorithm == '512256': return SHA512.new(truncate='256')
+
+    raise ValueError('Unknown engine %s' % (engine))
+
+
+def measure(function, min_time):
+    """
+    Calls function repeatedly until at least min_time seconds have passed,
+    and returns the number of calls along with the total time they took.
+    The function is always called at least once.
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls, elapsed
+
+
+def environment():
+    """
+    Returns a description of the machine and software the benchmarks
+    ran on, stored alongside the results.
+    """
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'pysha': pySHA.__version__,
+        'pycryptodome': Crypto.__version__ if Crypto is not None else None,
+    }
+
+
+def write_results(path, results):
+    """
+    Writes the results along with the environment metadata as JSON,
+    to the given path or to stdout if no path is given.
+    """
+    document = {'environment': environment(), 'results': results}
+    if path is None:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+    else:
+        with open(path, 'w') as f:
+            json.dump(document, f, indent=2)
+    return
+
+
+def format_size(nbytes):
+    """
+    Formats a number of bytes using binary units, for the progress output
+    """
+    if nbytes >= (1 << 20) and nbytes % (1 << 20) == 0:
+        return '%d MiB' % (nbytes >> 20)
+    if nbytes >= (1 << 10) and nbytes % (1 << 10) == 0:
+        return '%d KiB' % (nbytes >> 10)
+    return '%d B' % (nbytes)
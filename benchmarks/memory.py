@@ -0,0 +1,70 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import common
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure the memory held by each live hasher.')
+    parser.add_argument('--algorithms', '-a', nargs='+', choices=common.ALGORITHMS, default=common.ALGORITHMS)
+    parser.add_argument('--engines', '-e', nargs='+', choices=common.ENGINES, default=common.engines())
+    parser.add_argument('--count', type=int, default=10000,
+                        help='Number of hashers kept alive at the same time')
+    parser.add_argument('--size', type=int, default=0,
+                        help='Number of bytes passed to update() on each hasher before measuring')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='File to write the results to. Defaults to stdout')
+    return parser.parse_args()
+
+
+def bytes_per_hasher(engine, algorithm, count, size):
+    """
+    Creates count hashers, feeds each of them size bytes, and returns the
+    memory allocated while doing so divided by the number of hashers. The
+    hashers are all alive when the memory is measured.
+    """
+    data = b'\x00' * size
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    hashers = []
+    for _ in range(count):
+        hasher = common.new_hasher(engine, algorithm)
+        if size > 0:
+            hasher.update(data)
+        hashers.append(hasher)
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # The list holding the hashers is not part of the hashers themselves
+    return (after - before - sys.getsizeof(hashers)) / count
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    results = []
+    for algorithm in args.algorithms:
+        for engine in args.engines:
+            if engine not in common.engines():
+                print('Skipping %s, which is not installed' % (engine), file=sys.stderr)
+                continue
+            if not common.supports(engine, algorithm):
+                continue
+
+            nbytes = bytes_per_hasher(engine, algorithm, args.count, args.size)
+            print('%-7s %-13s %10.1f bytes per hasher' % (algorithm, engine, nbytes), file=sys.stderr)
+            results.append({
+                'suite': 'memory',
+                'algorithm': algorithm,
+                'engine': engine,
+                'size': args.size,
+                'count': args.count,
+                'bytes_per_hasher': nbytes,
+            })
+
+    common.write_results(args.output, results)
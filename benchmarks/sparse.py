@@ -0,0 +1,94 @@
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+import common
+from pySHA import streaming
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Hash a synthetic sparse file with and without skipping its holes.')
+    parser.add_argument('--algorithms', '-a', nargs='+', choices=common.ALGORITHMS, default=['1', '256', '512'])
+    parser.add_argument('--size', type=int, default=4 << 20,
+                        help='Size of the sparse file in bytes')
+    parser.add_argument('--data', type=float, default=0.05,
+                        help='Fraction of the file filled with random data, the rest being holes')
+    parser.add_argument('--extent', type=int, default=64 << 10,
+                        help='Size of each region of random data')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='File to write the results to. Defaults to stdout')
+    return parser.parse_args()
+
+
+def make_sparse_file(path, size, data, extent):
+    """
+    Creates a file of the given size made of holes, with regions of extent
+    random bytes written at random offsets until the given fraction of the
+    file holds data
+    """
+    generator = random.Random(size)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for _ in range(int(size * data) // extent):
+            f.seek(generator.randrange(0, size - extent, 4096))
+            f.write(generator.randbytes(extent))
+    return
+
+
+def plain(path, algorithm):
+    """
+    Reads the whole file and passes it to a single hasher, as sha.py did
+    before holes were skipped
+    """
+    hasher = common.new_hasher('pysha', algorithm)
+    with open(path, 'rb') as f:
+        hasher.update(f.read())
+    return hasher.digest()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sparse.img')
+        make_sparse_file(path, args.size, args.data, args.extent)
+        stat = os.stat(path)
+        allocated = stat.st_blocks * 512 if hasattr(stat, 'st_blocks') else stat.st_size
+        with open(path, 'rb') as f:
+            holes = sum(length for _, length, hole in streaming.regions(f) if hole)
+        print('%s sparse file, %s allocated, %s found in holes' % (
+            common.format_size(args.size), common.format_size(allocated), common.format_size(holes)), file=sys.stderr)
+
+        with open(path, 'rb') as f:
+            contents = f.read()
+        expected = {algorithm: hashlib.new(common.HASHLIB_NAMES[algorithm], contents).hexdigest()
+                    for algorithm in args.algorithms}
+        del contents
+
+        results = []
+        for algorithm in args.algorithms:
+            for engine, function in [('pysha', plain), ('pysha-sparse', lambda path, algorithm:
+                                     streaming.hash_file(path, [common.new_hasher('pysha', algorithm)])[0])]:
+                start = time.perf_counter()
+                digest = function(path, algorithm)
+                seconds = time.perf_counter() - start
+                if digest != expected[algorithm]:
+                    raise AssertionError('%s gave a wrong SHA-%s hash value' % (engine, algorithm))
+
+                print('%-7s %-13s %10.3f s  %10.3f MB/s' % (algorithm, engine, seconds, args.size / seconds / 1e6),
+                      file=sys.stderr)
+                results.append({
+                    'suite': 'sparse',
+                    'algorithm': algorithm,
+                    'engine': engine,
+                    'size': args.size,
+                    'allocated': allocated,
+                    'seconds': seconds,
+                    'mb_per_s': args.size / seconds / 1e6,
+                })
+
+    common.write_results(args.output, results)
@@ -1,5 +1,6 @@
 
-from . import sha1, sha224, sha256, sha384, sha512, sha512_224, sha512_256
+from . import sha1, sha224, sha256, sha384, sha512, sha512_224, sha512_256, sha512_t
+from . import algorithms, backends, cas, double, git, jit, kernel, merkle, multihasher, pipeline, pool, pow, profiling, schedules, shared, streaming, swar, tables, tracing, tree, vectorized
 
 SHA1 = sha1.SHA1
 SHA224 = sha224.SHA224
@@ -8,5 +9,20 @@ SHA384 = sha384.SHA384
 SHA512 = sha512.SHA512
 SHA512_224 = sha512_224.SHA512_224
 SHA512_256 = sha512_256.SHA512_256
+SHA512_t = sha512_t.SHA512_t
+SHA224_Tables = tables.SHA224_Tables
+SHA256_Tables = tables.SHA256_Tables
+
+MultiHasher = multihasher.MultiHasher
+sha256d = double.sha256d
+sha256d_batch = double.sha256d_batch
+hash_iter = pipeline.hash_iter
+HasherPool = pool.HasherPool
+SharedBatchHasher = shared.SharedBatchHasher
+TraceSink = tracing.TraceSink
+PrintSink = tracing.PrintSink
+TraceWriter = tracing.TraceWriter
+HashStats = profiling.HashStats
+profile = profiling.profile
 
 __version__ = "1.0.0"
\ No newline at end of file
@@ -0,0 +1,83 @@
+import struct
+from . import sha1, sha224, sha256, sha384, sha512, sha512_224, sha512_256
+from . import swar
+
+# The registry of the algorithms by name, shared by the modules that take the
+# name of an algorithm, such as 'sha256' or 'sha512_224', rather than a hasher.
+# For each algorithm, it holds the hasher class, the format of its words, the
+# number of bytes of its digest and, for SHA-1 and SHA-256, its SWAR batch
+# engine. Algorithm computes raw hash values with any of them.
+
+# The hasher class for each algorithm name, and the format of its words
+ALGORITHMS = {
+    'sha1': (sha1.SHA1, 'I'),
+    'sha224': (sha224.SHA224, 'I'),
+    'sha256': (sha256.SHA256, 'I'),
+    'sha384': (sha384.SHA384, 'Q'),
+    'sha512': (sha512.SHA512, 'Q'),
+    'sha512_224': (sha512_224.SHA512_224, 'Q'),
+    'sha512_256': (sha512_256.SHA512_256, 'Q'),
+}
+
+# The number of digest bytes kept by each algorithm
+DIGEST_SIZES = {
+    'sha1': 20,
+    'sha224': 28,
+    'sha256': 32,
+    'sha384': 48,
+    'sha512': 64,
+    'sha512_224': 28,
+    'sha512_256': 32,
+}
+
+# The algorithms supported by the SWAR batch engine
+SWAR_ENGINES = {
+    'sha1': (sha1.SHA1, swar.compress_sha1, '>5I'),
+    'sha256': (sha256.SHA256, swar.compress_sha256, '>8I'),
+}
+
+
+class Algorithm:
+    """
+    Computes raw hash values with one of the pySHA algorithms, going straight
+    through its __schedule__ and __compress__ functions. Messages of a fixed
+    length can be hashed with their padding computed ahead of time.
+    """
+
+    def __init__(self, name):
+        if name not in ALGORITHMS:
+            raise ValueError("Unknown algorithm %s. Supported algorithms: %s"%(name, ', '.join(ALGORITHMS)))
+
+        hasher_class, word_format = ALGORITHMS[name]
+        self.name = name
+        self.hasher = hasher_class(verbose=0)
+        self.block_bytes = hasher_class.block_size // 8
+        self.digest_size = DIGEST_SIZES[name]
+        self.state_format = '>%d%s'%(len(hasher_class.H0), word_format)
+        self.H0 = hasher_class.H0
+        return
+
+
+    def padding(self, length):
+        """
+        Returns the bytes appended to every message of the given length
+        """
+        return self.hasher.__pad__(bytes(length))[length:]
+
+
+    def hash(self, message, padding=None):
+        """
+        Returns the raw hash value of the message. If the padding for the
+        length of the message is given, it is not computed again.
+        """
+        hasher = self.hasher
+        if padding is None:
+            padded = hasher.__pad__(message)
+        else:
+            padded = message + padding
+
+        H = self.H0
+        block_bytes = self.block_bytes
+        for i in range(0, len(padded), block_bytes):
+            H = hasher.__compress__(H, hasher.__schedule__(padded[i : i + block_bytes]))
+        return struct.pack(self.state_format, *H)[:self.digest_size]
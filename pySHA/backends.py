@@ -0,0 +1,364 @@
+import hashlib
+import os
+from . import jit
+from . import kernel
+from . import profiling
+from . import tracing
+from . import vectorized
+
+# The engines that compute hash values for the hashers. Every engine computes the
+# same hash values, and the hashers pick one of them each time digest() is called:
+#
+#   - 'reference': __preprocess__ and __hash__, which follow the official
+#     specification step by step. This is the only engine that can display the
+#     steps, so it is always used from trace level 2.
+#   - 'python': the algorithm's __schedule__ and __compress__ functions, which
+#     compute the same result without displaying anything. This is the default.
+#   - 'swar': the SWAR batch engine from swar.py, for batches of SHA-1, SHA-224
+#     and SHA-256 messages, which all have 32-bit words.
+#   - 'numpy': the NumPy batch engine from vectorized.py, for batches of
+#     messages. Only available if NumPy is installed.
+#   - 'numba': the compression functions of jit.py, compiled by Numba. Only
+#     available if Numba is installed, and only used when it is asked for, since
+#     the first process to use it waits for the compilation.
+#   - 'hashlib': passes the message to Python's hashlib. Only used when it is
+#     asked for, since it does not run any of this package's code.
+#   - 'kernel': passes the message to the Linux kernel through an AF_ALG socket,
+#     with kernel.py. Only used when it is asked for, for the same reason. The
+#     file functions of streaming.py also pass files to the kernel without
+#     reading them for the hashers that ask for it.
+#
+# The blocks of a single message are compressed one after the other, so the size
+# of a single message does not change which engine is fastest: the batch engines
+# only pay off when many messages are hashed together, with digest_batch().
+#
+# An engine can be requested for a hasher with its backend argument, for example
+# SHA256(backend='hashlib'), or for every hasher with the PYSHA_BACKEND
+# environment variable. A hasher's own choice comes first. When the requested
+# engine is not available in the current environment, or does not support the
+# algorithm, the engine is chosen automatically.
+#
+# The engines that hash a single message can also hash it in pieces, as it is
+# read from a file or a pipe, with the stream returned by their stream()
+# function. The 'reference' engine needs the whole message to display its steps,
+# and the batch engines only hash whole messages, so they have no stream.
+
+ENVIRONMENT_VARIABLE = 'PYSHA_BACKEND'
+
+# The smallest batches for which the batch engines are chosen automatically
+SWAR_MIN_BATCH = 16
+NUMPY_MIN_BATCH = 64
+
+# The number of messages packed together by the SWAR batch engine
+SWAR_LANES = 64
+
+
+class Backend:
+    """
+    An engine that computes hash values. Subclasses implement digest(),
+    digest_batch() if they hash several messages at once, and stream() if
+    they hash a message passed in pieces, in which case streaming is set.
+    """
+    name = None
+    streaming = False
+
+    def available(self):
+        """
+        Returns whether the engine can be used in the current environment
+        """
+        return True
+
+    def supports(self, hasher):
+        """
+        Returns whether the engine implements the hasher's algorithm
+        """
+        return True
+
+    def digest(self, hasher, message):
+        """
+        Returns the hexadecimal hash value of the message
+        """
+        raise NotImplementedError
+
+    def digest_batch(self, hasher, messages):
+        """
+        Returns the hexadecimal hash value of every message, as a list
+        """
+        return [self.digest(hasher, message) for message in messages]
+
+    def stream(self, hasher):
+        """
+        Returns an object computing the hash value of a message passed in
+        pieces, with update(), update_zeros(), digest() and close() as
+        streaming.Stream, or None if the engine cannot do it
+        """
+        return None
+
+
+
+class ReferenceBackend(Backend):
+    name = 'reference'
+
+    def digest(self, hasher, message):
+        if hasher.trace is not None:
+            return hasher.__hash__(hasher.__preprocess__(message))
+
+        # __preprocess__ and __hash__ pass their steps to a trace sink, and only
+        # run every step of the specification from level 3. The base sink
+        # ignores all of them.
+        hasher.trace = tracing.TraceSink(5)
+        try:
+            return hasher.__hash__(hasher.__preprocess__(message))
+        finally:
+            hasher.trace = None
+
+
+
+class PythonBackend(Backend):
+    name = 'python'
+    streaming = True
+
+    def digest(self, hasher, message):
+        # The blocks of the message are read from the message itself, and
+        # only its last bytes are copied to be padded
+        block_bytes = hasher.block_size // 8
+        schedule = hasher.__schedule__
+        compress = hasher.__compress__
+        final_schedules = hasher.__final_schedules__
+        output = hasher.__output__
+
+        # With profiling, each step is timed and each block counted
+        if hasher.stats is not None:
+            schedule, compress, final_schedules, output = profiling.timed(hasher.stats, schedule, compress, final_schedules, output)
+
+        H = hasher.H0
+        aligned = len(message) - len(message) % block_bytes
+        for i in range(0, aligned, block_bytes):
+            H = compress(H, schedule(message[i : i + block_bytes]))
+        for W in final_schedules(message[aligned:], len(message)):
+            H = compress(H, W)
+        return output(H)
+
+    def stream(self, hasher):
+        # streaming.py imports this module
+        from . import streaming
+        return streaming.Stream(hasher)
+
+
+
+class SWARBackend(Backend):
+    name = 'swar'
+
+    def supports(self, hasher):
+        return hasher.word_size == 32
+
+    def digest_batch(self, hasher, messages):
+        # swar.py imports the algorithm classes, which import this module
+        from . import swar
+        compress = swar.compress_sha1 if hasher.name == 'SHA-1' else swar.compress_sha256
+        states = swar.hash_batch(messages, type(hasher), compress, SWAR_LANES)
+        return [hasher.__output__(H) for H in states]
+
+    def digest(self, hasher, message):
+        return self.digest_batch(hasher, [message])[0]
+
+
+
+class NumpyBackend(Backend):
+    name = 'numpy'
+
+    def available(self):
+        return vectorized.numpy is not None
+
+    def supports(self, hasher):
+        return vectorized.supports(hasher)
+
+    def digest_batch(self, hasher, messages):
+        return [hasher.__output__(H) for H in vectorized.hash_batch(messages, hasher)]
+
+    def digest(self, hasher, message):
+        return self.digest_batch(hasher, [message])[0]
+
+
+
+class NumbaBackend(Backend):
+    name = 'numba'
+    streaming = True
+
+    def available(self):
+        return jit.available()
+
+    def supports(self, hasher):
+        return jit.supports(hasher)
+
+    def digest(self, hasher, message):
+        return hasher.__output__(jit.compress_message(hasher, message))
+
+    def stream(self, hasher):
+        return jit.Stream(hasher)
+
+
+
+class _HashlibStream:
+    """
+    A stream of the 'hashlib' engine, which passes every piece
+    of the message to an incremental hashlib object
+    """
+
+    # The number of zero bytes created at a time by update_zeros()
+    ZEROS_SIZE = 1 << 20
+
+    def __init__(self, hasher, name):
+        self.hasher = hasher
+        self.state = hashlib.new(name)
+        return
+
+    def update(self, data):
+        self.state.update(data)
+        return
+
+    def update_zeros(self, count):
+        zeros = bytes(min(count, self.ZEROS_SIZE))
+        while count > 0:
+            self.state.update(zeros[:count])
+            count -= min(count, len(zeros))
+        return
+
+    def digest(self):
+        hash_value = self.state.hexdigest()
+        if self.hasher.trace is not None:
+            self.hasher.trace.output(self.hasher.name, hash_value)
+        return hash_value
+
+    def close(self):
+        return
+
+
+
+class HashlibBackend(Backend):
+    name = 'hashlib'
+    streaming = True
+
+    # The hashlib name of each algorithm, by the name of the algorithm
+    NAMES = {
+        'SHA-1': 'sha1',
+        'SHA-224': 'sha224',
+        'SHA-256': 'sha256',
+        'SHA-384': 'sha384',
+        'SHA-512': 'sha512',
+        'SHA-512/224': 'sha512_224',
+        'SHA-512/256': 'sha512_256',
+    }
+
+    def supports(self, hasher):
+        return self.NAMES.get(hasher.name) in hashlib.algorithms_available
+
+    def digest(self, hasher, message):
+        hash_value = hashlib.new(self.NAMES[hasher.name], message).hexdigest()
+        if hasher.trace is not None:
+            hasher.trace.output(hasher.name, hash_value)
+        return hash_value
+
+    def stream(self, hasher):
+        return _HashlibStream(hasher, self.NAMES[hasher.name])
+
+
+
+class KernelBackend(Backend):
+    name = 'kernel'
+    streaming = True
+
+    def available(self):
+        return kernel.available()
+
+    def supports(self, hasher):
+        return kernel.supports(hasher)
+
+    def digest(self, hasher, message):
+        hash_value = kernel.digest(hasher, message)
+        if hasher.trace is not None:
+            hasher.trace.output(hasher.name, hash_value)
+        return hash_value
+
+    def stream(self, hasher):
+        return kernel.Stream(hasher)
+
+
+
+# The registered engines, by name
+BACKENDS = {}
+
+
+def register(backend):
+    """
+    Adds an engine to the registry, replacing any engine with the same name
+    """
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def get(name):
+    """
+    Returns the registered engine with the given name, which
+    may not be available in the current environment
+    """
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend %s. Supported backends: %s"%(name, ', '.join(BACKENDS)))
+    return BACKENDS[name]
+
+
+def available():
+    """
+    Returns the names of the engines that can be used in the current environment
+    """
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def requested(hasher):
+    """
+    Returns the engine requested for the hasher, by the hasher itself or by the
+    environment variable, or None if none was requested, if the requested engine
+    is not available or if it cannot hash with the hasher's algorithm
+    """
+    name = hasher.backend or os.environ.get(ENVIRONMENT_VARIABLE)
+    if not name:
+        return None
+    backend = get(name)
+    if not backend.available() or not backend.supports(hasher):
+        return None
+    return backend
+
+
+def select(hasher):
+    """
+    Returns the engine that computes the hash value of a single message for
+    the hasher. The reference engine is always used from trace level 2.
+    """
+    trace = hasher.trace
+    if (trace is not None and trace.level > 1):
+        return BACKENDS['reference']
+    return requested(hasher) or BACKENDS['python']
+
+
+def select_batch(hasher, count):
+    """
+    Returns the engine that computes the hash values of a batch of count
+    messages for the hasher
+    """
+    trace = hasher.trace
+    if (trace is not None and trace.level > 1):
+        return BACKENDS['reference']
+
+    backend = requested(hasher)
+    if backend is not None:
+        return backend
+
+    for name, threshold in [('numpy', NUMPY_MIN_BATCH), ('swar', SWAR_MIN_BATCH)]:
+        backend = BACKENDS[name]
+        if count >= threshold and backend.available() and backend.supports(hasher):
+            return backend
+    return BACKENDS['python']
+
+
+for _backend in [ReferenceBackend(), PythonBackend(), SWARBackend(), NumpyBackend(), NumbaBackend(), HashlibBackend(), KernelBackend()]:
+    register(_backend)
@@ -0,0 +1,293 @@
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from . import algorithms
+from . import streaming
+
+# A content-addressable store on local disk: every object is stored in a file
+# named by the hash value of its contents, so storing the same contents twice
+# keeps a single copy, and an object can be checked at any time by hashing it
+# again. The files are spread over 256 fan-out directories, named by the first
+# two hexadecimal digits of the hash value:
+#
+#     root/objects/9f/86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08
+#     root/tmp/        files being written
+#     root/corrupt/    objects whose contents no longer match their name
+#
+# An object is written to a temporary file in root/tmp and hashed in the same
+# pass, as it is read. Once its hash value is known, the file is renamed into its
+# fan-out directory. Renaming is atomic within a file system, so an object is
+# either missing or complete, even if several processes store it at once.
+#
+# The hash values of the objects are kept in memory, so has() does not touch the
+# disk. They are read from the fan-out directories when the store is opened.
+
+# The number of bytes read from a stream at a time
+CHUNK_SIZE = 1 << 20
+
+
+class _Tee:
+    """
+    A binary file that reads from another one, and writes everything it
+    reads to a file descriptor
+    """
+
+    def __init__(self, stream, fd):
+        self.stream = stream
+        self.fd = fd
+        return
+
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        return data
+
+
+
+class Store:
+    """
+    A content-addressable store of objects in the directory root, which is
+    created if needed. The algorithm is one of the names of
+    algorithms.ALGORITHMS, such as 'sha256', and backend is the engine used
+    by the hasher, as for the hashers.
+
+    If durable is set, every object is flushed to the disk before it is
+    renamed into place, so it survives a power failure once put() returns.
+
+    Public Member Functions:
+        - put()
+        - get()
+        - has()
+        - path()
+        - verify()
+        - verify_all()
+        - verify_in_background()
+        - close()
+
+    """
+
+    def __init__(self, root, algorithm='sha256', backend=None, durable=False):
+        if algorithm not in algorithms.ALGORITHMS:
+            raise ValueError("Unknown algorithm %s. Supported algorithms: %s"%(algorithm, ', '.join(algorithms.ALGORITHMS)))
+
+        self.root = root
+        self.algorithm = algorithm
+        self.backend = backend
+        self.durable = durable
+        self.digest_size = algorithms.DIGEST_SIZES[algorithm]
+
+        self.objects = os.path.join(root, 'objects')
+        self.tmp = os.path.join(root, 'tmp')
+        self.corrupt = os.path.join(root, 'corrupt')
+        for directory in [self.objects, self.tmp, self.corrupt]:
+            os.makedirs(directory, exist_ok=True)
+
+        # The hash values of the stored objects. The lock is held while the
+        # index is updated together with the files, since put() may be called
+        # by several threads while verify() runs in the background
+        self.index = set()
+        self.lock = threading.Lock()
+        for fanout in os.scandir(self.objects):
+            if fanout.is_dir() and len(fanout.name) == 2:
+                self.index.update(fanout.name + entry.name for entry in os.scandir(fanout.path))
+
+        # The hash values of the objects found corrupt, and the event that
+        # stops the background verification
+        self.corrupted = []
+        self.stopped = threading.Event()
+        self.verifier = None
+        return
+
+
+    def __hasher__(self):
+        """
+        Returns a new hasher of the store's algorithm
+        """
+        return algorithms.ALGORITHMS[self.algorithm][0](verbose=0, backend=self.backend)
+
+
+    def __check__(self, digest):
+        """
+        Raises a ValueError if digest is not a hash value of the store's algorithm
+        """
+        if len(digest) != 2 * self.digest_size or digest.strip('0123456789abcdef'):
+            raise ValueError("Invalid %s hash value %s"%(self.algorithm, digest))
+        return
+
+
+    def path(self, digest):
+        """
+        Returns the path of the file holding the object
+        """
+        self.__check__(digest)
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+
+    def put(self, stream):
+        """
+        Stores the contents read from a binary file, or the given bytes, and
+        returns their hexadecimal hash value. If the store already holds the
+        same contents, nothing new is kept.
+        """
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            stream = io.BytesIO(stream)
+
+        fd, temporary = tempfile.mkstemp(dir=self.tmp)
+        try:
+            try:
+                digest = streaming.hash_stream(_Tee(stream, fd), [self.__hasher__()], CHUNK_SIZE)[0]
+                if self.durable:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            path = self.path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(temporary, 0o444)
+            with self.lock:
+                if self.has(digest):
+                    os.remove(temporary)
+                    return digest
+                os.replace(temporary, path)
+                self.index.add(digest)
+            if self.durable:
+                self.__sync_directory__(os.path.dirname(path))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return digest
+
+
+    def __sync_directory__(self, directory):
+        """
+        Flushes a directory to the disk, so that a rename into it is durable
+        """
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return
+
+
+    def get(self, digest):
+        """
+        Returns the contents of the object as a read-only memory map, which the
+        caller closes, or as empty bytes for an empty object. Raises a KeyError
+        if the store does not hold the object.
+        """
+        if not self.has(digest):
+            raise KeyError(digest)
+
+        with open(self.path(digest), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def has(self, digest):
+        """
+        Returns whether the store holds the object, from the index
+        in memory
+        """
+        return digest in self.index
+
+
+    def verify(self, digest):
+        """
+        Hashes the object again and returns whether its contents still match
+        its hash value. An object that does not is moved to the corrupt
+        directory, and removed from the index. An object removed or replaced
+        while it was being verified counts as sound, since the file that was
+        hashed is no longer there.
+        """
+        path = self.path(digest)
+
+        # The object is hashed without holding the lock, so that put() is never
+        # kept waiting. The lock is then held while checking that the file is
+        # still the one that was hashed and moving it away, so that a put() of the
+        # same contents cannot rename a sound copy into place in between, which
+        # would then be moved to the corrupt directory
+        try:
+            before = self.__identity__(path)
+            if streaming.hash_file(path, [self.__hasher__()])[0] == digest:
+                return True
+        except FileNotFoundError:
+            before = None
+
+        with self.lock:
+            try:
+                after = self.__identity__(path)
+            except FileNotFoundError:
+                self.index.discard(digest)
+                return True
+            if after != before:
+                return True
+
+            self.index.discard(digest)
+            self.corrupted.append(digest)
+            shutil.move(path, os.path.join(self.corrupt, digest))
+        return False
+
+
+    def __identity__(self, path):
+        """
+        Returns what tells a file apart from any other file at the same path,
+        or from the same file once it was modified
+        """
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+    def verify_all(self):
+        """
+        Verifies every object of the store, and returns the hash values of
+        the corrupt ones. Stops early if close() is called.
+        """
+        with self.lock:
+            digests = sorted(self.index)
+
+        corrupted = []
+        for digest in digests:
+            if self.stopped.is_set():
+                break
+            if not self.verify(digest):
+                corrupted.append(digest)
+        return corrupted
+
+
+    def verify_in_background(self):
+        """
+        Starts verifying every object of the store in a background thread,
+        and returns the thread. The corrupt objects are listed in corrupted.
+        """
+        self.verifier = threading.Thread(target=self.verify_all, daemon=True)
+        self.verifier.start()
+        return self.verifier
+
+
+    def close(self):
+        """
+        Stops the background verification, if any
+        """
+        self.stopped.set()
+        if self.verifier is not None:
+            self.verifier.join()
+            self.verifier = None
+        return
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,173 @@
+import struct
+from . import sha256
+from . import swar
+
+# Double SHA-256, SHA-256(SHA-256(message)), as used by Bitcoin for block and
+# transaction hashes. The second SHA-256 always hashes a 32-byte message, the
+# raw output of the first one, so its padded input is a single 512-bit block:
+#
+#   W[0..7]   the 8 state variables H produced by the first SHA-256
+#   W[8]      0x80000000, the '1' bit that starts the padding
+#   W[9..14]  zeros
+#   W[15]     256, the length of the 32-byte message in bits
+#
+# The first SHA-256 therefore never needs to be encoded as bytes or hex: its state
+# variables are the first 8 words of the second block. Everything that only depends
+# on the constant words W[8..15] and on the seed values is computed once, below.
+
+_HASHER = sha256.SHA256(verbose=0)
+_MASK = 0xffffffff
+
+# The constant words of the single block of the second SHA-256
+_PAD_WORDS = (0x80000000, 0, 0, 0, 0, 0, 0, 256)
+
+def _rot(x, n):
+    return ((x >> n) | (x << (32 - n))) & _MASK
+
+def _sigma0(x):
+    return _rot(x, 7) ^ _rot(x, 18) ^ (x >> 3)
+
+def _sigma1(x):
+    return _rot(x, 17) ^ _rot(x, 19) ^ (x >> 10)
+
+
+# In the words W[16..30] of the message schedule, some of the four terms only
+# depend on W[8..15]. These terms are added up ahead of time: SCHEDULE_CONSTANTS[j]
+# holds the sum of the constant terms of W[j] for 16 <= j < 31.
+def _schedule_constants():
+    W = [None] * 8 + list(_PAD_WORDS)
+    constants = {}
+    for j in range(16, 31):
+        total = 0
+        if W[j-2] is not None: total += _sigma1(W[j-2])
+        if W[j-7] is not None: total += W[j-7]
+        if W[j-15] is not None: total += _sigma0(W[j-15])
+        if W[j-16] is not None: total += W[j-16]
+        constants[j] = total & _MASK
+        W.append(None)
+    return constants
+
+SCHEDULE_CONSTANTS = _schedule_constants()
+
+# Rounds 8 to 15 of the second SHA-256 add constant words of the schedule, which
+# are added to the round constants ahead of time
+ROUND_WORDS = tuple((sha256.SHA256.K[t] + _PAD_WORDS[t - 8]) & _MASK for t in range(8, 16))
+
+# The first round of the second SHA-256 starts from the seed values, so everything
+# but the message schedule word W[0] is constant: T1 = FIRST_T1 + W[0], and T2 is
+# the same for every message
+def _first_round():
+    a, b, c, d, e, f, g, h = sha256.SHA256.H0
+    T1 = (h + (_rot(e, 6) ^ _rot(e, 11) ^ _rot(e, 25)) + (g ^ (e & (f ^ g))) + sha256.SHA256.K[0]) & _MASK
+    T2 = ((_rot(a, 2) ^ _rot(a, 13) ^ _rot(a, 22)) + ((a & b) | (c & (a | b)))) & _MASK
+    return T1, T2
+
+FIRST_T1, FIRST_T2 = _first_round()
+
+
+def first_state(message):
+    """
+    Runs the first SHA-256 over the message and returns its state
+    variables, which are the raw SHA-256 hash of the message
+    """
+    H = list(sha256.SHA256.H0)
+    padded = _HASHER.__pad__(message)
+    for i in range(0, len(padded), 64):
+        H = _HASHER.__compress__(H, _HASHER.__schedule__(padded[i : i + 64]))
+    return H
+
+
+def second_state(H):
+    """
+    Runs the second SHA-256 over the 8 state variables H of the first
+    one, and returns the state variables of the double SHA-256
+    """
+    mask = _MASK
+    K = sha256.SHA256.K
+    C = SCHEDULE_CONSTANTS
+
+    # Only the terms that depend on H are computed here. W[8..15] are the
+    # constant padding words, whose terms are part of SCHEDULE_CONSTANTS.
+    # The rotations in σ0 and σ1 are written out as in SHA256.__schedule__
+    W = list(H) + list(_PAD_WORDS)
+
+    # W[16..22]: σ1(W[j-2]) is constant for j < 18, and W[j-7] for j < 23
+    for j in range(16, 18):
+        x = W[j-15]
+        W.append((C[j] + ((x >> 7 | x << 25) ^ (x >> 18 | x << 14) ^ (x >> 3)) + W[j-16]) & mask)
+    for j in range(18, 23):
+        x = W[j-15]
+        y = W[j-2]
+        W.append((C[j] + ((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10))
+                  + ((x >> 7 | x << 25) ^ (x >> 18 | x << 14) ^ (x >> 3)) + W[j-16]) & mask)
+
+    # W[23]: σ0(W[8]) is constant. W[24..30]: both σ0(W[j-15]) and W[j-16] are
+    y = W[21]
+    W.append((C[23] + ((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10)) + W[16] + W[7]) & mask)
+    for j in range(24, 31):
+        y = W[j-2]
+        W.append((C[j] + ((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10)) + W[j-7]) & mask)
+
+    for j in range(31, 64):
+        x = W[j-15]
+        y = W[j-2]
+        W.append((((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10)) + W[j-7]
+                  + ((x >> 7 | x << 25) ^ (x >> 18 | x << 14) ^ (x >> 3)) + W[j-16]) & mask)
+
+    # The round constants and schedule words added in each round. Rounds 8
+    # to 15 use the precomputed sums of the constant words
+    KW = [K[t] + W[t] for t in range(8)] + list(ROUND_WORDS) + [K[t] + W[t] for t in range(16, 64)]
+
+    # The first round only adds W[0] to its precomputed T1
+    a0, b0, c0, d0, e0, f0, g0, h0 = sha256.SHA256.H0
+    T1 = FIRST_T1 + W[0]
+    a, b, c, d = (T1 + FIRST_T2) & mask, a0, b0, c0
+    e, f, g, h = (d0 + T1) & mask, e0, f0, g0
+
+    for t in range(1, 64):
+        T1 = h + ((e >> 6 | e << 26) ^ (e >> 11 | e << 21) ^ (e >> 25 | e << 7)) + (g ^ (e & (f ^ g))) + KW[t]
+        T2 = ((a >> 2 | a << 30) ^ (a >> 13 | a << 19) ^ (a >> 22 | a << 10)) + ((a & b) | (c & (a | b)))
+        h = g
+        g = f
+        f = e
+        e = (d + T1) & mask
+        d = c
+        c = b
+        b = a
+        a = (T1 + T2) & mask
+
+    return [(a0 + a) & mask, (b0 + b) & mask, (c0 + c) & mask, (d0 + d) & mask,
+            (e0 + e) & mask, (f0 + f) & mask, (g0 + g) & mask, (h0 + h) & mask]
+
+
+def sha256d(message, raw=False):
+    """
+    Computes SHA-256(SHA-256(message)). Returns the hexadecimal hash value,
+    or the 32 raw bytes of the hash if raw is set.
+    """
+    H = second_state(first_state(message))
+    if raw:
+        return struct.pack('>8I', *H)
+    return struct.pack('>8I', *H).hex()
+
+
+def sha256d_batch(messages, raw=False, lanes=None):
+    """
+    Computes SHA-256(SHA-256(message)) for every message, and returns the hash
+    values as a list in the same order as the messages. The hash values are
+    hexadecimal, or 32 raw bytes each if raw is set.
+
+    If lanes is given, both SHA-256 computations run on the SWAR batch engine,
+    lanes messages at a time. Otherwise, each message goes through the same
+    two steps as sha256d().
+    """
+    if lanes is not None:
+        first = swar.hash_batch(messages, sha256.SHA256, swar.compress_sha256, lanes)
+        inner = [struct.pack('>8I', *H) for H in first]
+        states = swar.hash_batch(inner, sha256.SHA256, swar.compress_sha256, lanes)
+    else:
+        states = [second_state(first_state(message)) for message in messages]
+
+    if raw:
+        return [struct.pack('>8I', *H) for H in states]
+    return [struct.pack('>8I', *H).hex() for H in states]
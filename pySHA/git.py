@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import stat
+from . import sha1, sha256
+from . import streaming
+
+# Object IDs of git, computed for the files of a working tree without git. Every
+# git object is hashed with a header holding its type and the length of its
+# contents:
+#
+#     "blob <length>\0" + contents
+#
+# The header is passed to a streaming hasher first, and the contents of a file
+# right after it, so a file is never held in memory, or concatenated with its
+# header. Repositories in the sha1 object format use SHA-1, and repositories in
+# the sha256 object format use SHA-256.
+#
+# A tree object lists the entries of a directory. Each entry is its mode, a space,
+# its name, a zero byte and the raw object ID of the entry:
+#
+#     b'100644 README.md\x00' + raw ID
+#
+# The entries are sorted by the bytes of their names, as if the names of the
+# directories ended with a '/'. Git only records the executable bit of a file,
+# and does not record empty directories.
+
+# The hasher class of each object format
+OBJECT_FORMATS = {
+    'sha1': sha1.SHA1,
+    'sha256': sha256.SHA256,
+}
+
+# The modes git records in tree objects
+MODE_FILE = '100644'
+MODE_EXECUTABLE = '100755'
+MODE_SYMLINK = '120000'
+MODE_TREE = '40000'
+
+
+def _hasher(object_format):
+    """
+    Returns a hasher for the object format
+    """
+    if object_format not in OBJECT_FORMATS:
+        raise ValueError("Unknown object format %s. Supported formats: %s"%(object_format, ', '.join(OBJECT_FORMATS)))
+    return OBJECT_FORMATS[object_format](verbose=0)
+
+
+def object_id(kind, data, object_format='sha1'):
+    """
+    Returns the hexadecimal object ID of an object of the given kind, such
+    as 'blob' or 'tree', whose contents are data
+    """
+    stream = streaming.Stream(_hasher(object_format))
+    stream.update(b'%s %d\x00'%(kind.encode(), len(data)))
+    stream.update(data)
+    return stream.digest()
+
+
+def blob_id(path, object_format='sha1'):
+    """
+    Returns the hexadecimal object ID of the blob git stores for the file at
+    path: the contents of a file, or the target of a symbolic link
+    """
+    st = os.lstat(path)
+    if stat.S_ISLNK(st.st_mode):
+        return object_id('blob', os.fsencode(os.readlink(path)), object_format)
+
+    header = b'blob %d\x00'%(st.st_size)
+    return streaming.hash_file(path, [_hasher(object_format)], prefix=header)[0]
+
+
+def tree_id(entries, object_format='sha1'):
+    """
+    Returns the hexadecimal object ID of the tree holding the entries, given
+    as (mode, name, object ID) tuples in any order. The mode is a string such
+    as '100644', and the object ID is hexadecimal.
+    """
+    entries = [(mode, os.fsencode(name), bytes.fromhex(oid)) for mode, name, oid in entries]
+    entries.sort(key=lambda entry: entry[1] + b'/' if entry[0] == MODE_TREE else entry[1])
+    data = b''.join(b'%s %s\x00'%(mode.encode(), name) + oid for mode, name, oid in entries)
+    return object_id('tree', data, object_format)
+
+
+def _mode(st):
+    """
+    Returns the mode git records for a file or a symbolic link
+    """
+    if stat.S_ISLNK(st.st_mode):
+        return MODE_SYMLINK
+    if st.st_mode & stat.S_IXUSR:
+        return MODE_EXECUTABLE
+    return MODE_FILE
+
+
+def _blob_id(args):
+    """
+    Runs inside the worker processes. Returns the object ID of a blob.
+    """
+    path, object_format = args
+    return blob_id(path, object_format)
+
+
+def _scan(path, relative, files, directories):
+    """
+    Adds the regular files and symbolic links below path to files, and the
+    directories to directories, as paths relative to the top of the working
+    tree. Directories are added after everything below them.
+    """
+    with os.scandir(path) as iterator:
+        entries = sorted(iterator, key=lambda entry: entry.name)
+
+    for entry in entries:
+        if entry.name == '.git':
+            continue
+        name = os.path.join(relative, entry.name)
+        st = entry.stat(follow_symlinks=False)
+        if stat.S_ISDIR(st.st_mode):
+            _scan(entry.path, name, files, directories)
+        elif stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode):
+            files.append((name, _mode(st)))
+    directories.append(relative)
+    return
+
+
+def worktree(path, object_format='sha1', workers=None):
+    """
+    Computes the object IDs of every file and directory of the working tree at
+    path, as git would store them if they were all added, and returns them as a
+    dictionary mapping each path, relative to the top of the working tree, to
+    its (mode, object ID). The ID of the tree of the whole working tree is
+    stored under ''.
+
+    Every regular file and symbolic link is included, except for the .git
+    directory: the ignore rules of git are not applied, and nested repositories
+    are hashed as ordinary directories. If workers is set, the blobs are hashed
+    by that many worker processes.
+    """
+    files = []
+    directories = []
+    _scan(path, '', files, directories)
+
+    tasks = [(os.path.join(path, name), object_format) for name, _ in files]
+    if workers:
+        with multiprocessing.Pool(workers) as pool:
+            ids = pool.map(_blob_id, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+    else:
+        ids = [_blob_id(task) for task in tasks]
+
+    objects = {}
+    entries = {directory: [] for directory in directories}
+    for (name, mode), oid in zip(files, ids):
+        objects[name] = (mode, oid)
+        entries[os.path.dirname(name)].append((mode, os.path.basename(name), oid))
+
+    # Every directory comes after its subdirectories, so the trees are built bottom-up.
+    # Empty directories are left out, as git does, except for the top one
+    for directory in directories:
+        if not entries[directory] and directory != '':
+            continue
+        oid = tree_id(entries[directory], object_format)
+        objects[directory] = (MODE_TREE, oid)
+        if directory != '':
+            entries[os.path.dirname(directory)].append((MODE_TREE, os.path.basename(directory), oid))
+    return objects
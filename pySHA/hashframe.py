@@ -1,3 +1,10 @@
+import array
+import time
+from . import backends
+from . import profiling
+from . import schedules
+from . import tracing
+
 
 class SHA_HashFrame:
     """
@@ -10,10 +17,44 @@ class SHA_HashFrame:
         - get_current_output()
         - digest()
         - clear_state
+        - reset()
+        - enable_profiling()
+        - disable_profiling()
+        - digest_batch()
 
     """
-    message = b''
-    output = ''
+    # Hashers are created in large numbers, so their attributes are declared
+    # here instead of being stored in a dictionary for each hasher. Everything
+    # that is the same for all hashers of an algorithm, such as the constants K
+    # and the seed values H0, is a class attribute of that algorithm's class.
+    __slots__ = ('verbose', 'trace', 'stats', 'message', 'output', 'H', 'backend')
+
+    def __init__(self, verbose=1, trace=None, backend=None):
+        self.verbose = verbose
+
+        # The name of the engine requested for this hasher, or None to choose one
+        # automatically. See backends.py for the engines and how they are chosen
+        if backend is not None:
+            backends.get(backend)
+        self.backend = backend
+
+        # The steps of the computation are passed to the trace sink. By default,
+        # they are printed to the terminal depending on the verbosity. None means
+        # that nothing is traced, which is the case at verbosity 0
+        self.trace = trace if trace is not None else tracing.default_sink(verbose)
+
+        # Profiling statistics. Profiling is disabled unless this is set to a
+        # HashStats object, either by enable_profiling() or by profiling.profile()
+        self.stats = None
+
+        self.message = b''
+        self.output = ''
+
+        # The state variables start out as a copy of the seed values H0, stored
+        # in an array of words of the algorithm's word size
+        self.H = array.array(self.typecode, self.H0)
+        return
+
 
     def update(self, bytes):
         """
@@ -23,6 +64,10 @@ class SHA_HashFrame:
         state is self.message concatenated with bytes.
         Clears the self.output state variable.
         """
+        if self.stats is not None:
+            self.stats.updates += 1
+            self.stats.bytes += len(bytes)
+
         self.message = self.message + bytes
         self.output = ''
         return self.message
@@ -57,11 +102,59 @@ class SHA_HashFrame:
         state and computes the SHA Hash of the message. Stores
         the value in self.output and returns the output value
         """
-        blocks = self.__preprocess__(self.message)
-        output = self.__hash__(blocks)
+        stats = self.stats
+        if stats is not None:
+            stats.digests += 1
+
+        # From trace level 2 and up, the steps of the computation are passed to
+        # the trace sink by __preprocess__ and __hash__, which follow the official
+        # specification step by step. Otherwise, the 'python' engine is used
+        # unless another engine was requested.
+        backend = backends.select(self)
+        if stats is None:
+            return backend.digest(self, self.message)
+
+        if (backend.name == 'reference' and self.trace is not None):
+            start = time.perf_counter()
+            blocks = self.__preprocess__(self.message)
+            middle = time.perf_counter()
+            output = self.__hash__(blocks)
+            end = time.perf_counter()
+
+            # The schedule and the rounds are interleaved with the displayed steps,
+            # so all of the time spent in __hash__ is counted as compression
+            stats.preprocess_time += middle - start
+            stats.compression_time += end - middle
+            stats.blocks += len(blocks)
+            return output
+
+        # The 'python' engine times its own steps, in the same loop it
+        # runs without profiling
+        if (backend.name == 'python'):
+            return backend.digest(self, self.message)
+
+        # The other engines do not expose their steps, so all of their
+        # time is counted as compression
+        start = time.perf_counter()
+        output = backend.digest(self, self.message)
+        stats.compression_time += time.perf_counter() - start
         return output
 
 
+    def digest_batch(self, messages):
+        """
+        Computes the SHA Hash of each of the messages, independently of the
+        message held by the hasher's internal state, which is not modified.
+        Returns the hash values as a list, in the same order as the messages.
+        Large batches are hashed by one of the batch engines.
+        """
+        messages = list(messages)
+        if self.stats is not None:
+            self.stats.digests += len(messages)
+            self.stats.bytes += sum(len(message) for message in messages)
+        return backends.select_batch(self, len(messages)).digest_batch(self, messages)
+
+
     def clear_state(self):
         """
         Clears the current message held by the hasher's internal
@@ -72,6 +165,86 @@ class SHA_HashFrame:
         return 
 
 
+    def reset(self):
+        """
+        Returns the hasher to the state it was in when it was created, so that
+        it can be reused to hash a new message. Clears the current message and
+        output, and sets the state variables H back to the seed values H0 in
+        place, without allocating a new array. The trace sink and profiling
+        statistics are kept.
+        """
+        self.message = b''
+        self.output = ''
+
+        H = self.H
+        H0 = self.H0
+        for i in range(len(H0)):
+            H[i] = H0[i]
+        return
+
+
+    def enable_profiling(self, stats=None):
+        """
+        Starts recording the time spent in each phase of the computation,
+        along with counts of the blocks, bytes, update() calls and digests,
+        into stats. A new HashStats object is created if stats is not given.
+        The same stats object may be shared by several hashers. Returns the
+        stats object.
+        """
+        if stats is None:
+            stats = profiling.HashStats()
+        self.stats = stats
+        return stats
+
+
+    def disable_profiling(self):
+        """
+        Stops recording profiling statistics, and returns the stats
+        object that was being recorded into.
+        """
+        stats = self.stats
+        self.stats = None
+        return stats
+
+
+    def __pad__(self, message, length=None):
+        """
+        Pads the message to a multiple of the block size, in the same way as
+        __preprocess__: a single '1' bit, then zeros, and then the length of the
+        message in bits, which takes up the last 64 bits of the block (128 bits
+        for 1024-bit blocks). If message is only the end of a longer message
+        starting on a block boundary, length is the length of the whole message.
+        """
+        if length is None:
+            length = len(message)
+        block_bytes = self.block_size // 8
+        length_bytes = block_bytes // 8
+        num_zeros = (block_bytes - length_bytes - 1 - len(message)) % block_bytes
+        return message + b'\x80' + bytes(num_zeros) + (length * 8).to_bytes(length_bytes, 'big')
+
+
+    def __final_schedules__(self, tail, length):
+        """
+        Pads the tail of a message of the given length, which is the last
+        len(tail) bytes of the message and is less than one block, and returns
+        the message schedules of the one or two final blocks. A final block
+        holding only padding depends only on the length of the message, so its
+        schedule is taken from the cache of padding schedules.
+        """
+        block_bytes = self.block_size // 8
+        remaining = len(tail)
+        tail = self.__pad__(tail, length)
+
+        final = []
+        for i in range(0, len(tail), block_bytes):
+            block = tail[i : i + block_bytes]
+            if i >= remaining:
+                final.append(schedules.padding_schedule(self.__schedule__, length, block))
+            else:
+                final.append(self.__schedule__(block))
+        return final
+
+
     # Logical Primitives used in the SHA Hash family are ~("NOT"), & ("AND")
     # | ("OR"), ^ ("XOR"). Here are the more complicated bit operations
 
@@ -0,0 +1,261 @@
+import importlib.util
+
+# Compression functions compiled to machine code by Numba, which is optional. The
+# functions below are written in the subset of Python that Numba compiles: they
+# only use NumPy arrays and integers, and every value is a NumPy unsigned integer
+# of a fixed width.
+#
+# Importing Numba takes a while, and compiling the functions even more, so
+# nothing is done until the first hash value is asked for. The compiled machine
+# code is then cached on disk, in __pycache__, and only loaded again by the next
+# processes. Without Numba, the 'numba' engine is not available and the other
+# engines are used.
+#
+# A whole message is compressed by a single call, so Python only pads the
+# message and encodes the state variables. A message read in pieces, from a file
+# or a pipe, is compressed by a single call for each piece, with Stream. The words are held in uint64 values
+# for every algorithm, since Numba turns a mix of signed and unsigned integers
+# into floats: the constants below are unsigned, and the 32-bit algorithms mask
+# the results of their additions and left shifts.
+
+numpy = None
+numba = None
+
+# The compiled functions, by algorithm family, once they are compiled
+_KERNELS = {}
+
+
+def available():
+    """
+    Returns whether Numba can be imported, without importing it
+    """
+    return numba is not None or (importlib.util.find_spec('numba') is not None
+                                 and importlib.util.find_spec('numpy') is not None)
+
+
+def supports(hasher):
+    """
+    Returns whether the engine can hash messages with the hasher's algorithm
+    """
+    return hasher.name == 'SHA-1' or hasher.word_size in (32, 64)
+
+
+def _sha1_blocks(H, words, K):
+    """
+    Compresses every block of the padded message words into the 5 state
+    variables H, in place. K holds the 80 constants.
+    """
+    mask = numpy.uint64(0xffffffff)
+    W = numpy.zeros(80, dtype=numpy.uint64)
+    for block in range(words.shape[0] // 16):
+        for j in range(16):
+            W[j] = words[16 * block + j]
+        for j in range(16, 80):
+            x = W[j-3] ^ W[j-8] ^ W[j-14] ^ W[j-16]
+            W[j] = ((x << numpy.uint64(1)) | (x >> numpy.uint64(31))) & mask
+
+        a = H[0]
+        b = H[1]
+        c = H[2]
+        d = H[3]
+        e = H[4]
+        for t in range(80):
+            if t < 20:
+                f = d ^ (b & (c ^ d))
+            elif t < 40 or t >= 60:
+                f = b ^ c ^ d
+            else:
+                f = (b & c) | (d & (b | c))
+            T = ((((a << numpy.uint64(5)) | (a >> numpy.uint64(27))) & mask) + f + e + K[t] + W[t]) & mask
+            e = d
+            d = c
+            c = ((b << numpy.uint64(30)) | (b >> numpy.uint64(2))) & mask
+            b = a
+            a = T
+
+        H[0] = (H[0] + a) & mask
+        H[1] = (H[1] + b) & mask
+        H[2] = (H[2] + c) & mask
+        H[3] = (H[3] + d) & mask
+        H[4] = (H[4] + e) & mask
+    return
+
+
+def _sha2_blocks(H, words, K, rotations, width, rounds):
+    """
+    Compresses every block of the padded message words into the 8 state
+    variables H, in place, with the SHA-2 rounds on words of width bits.
+    rotations holds the amounts used by Σ0, Σ1, σ0 and σ1, in that order.
+    """
+    if width == 32:
+        mask = numpy.uint64(0xffffffff)
+    else:
+        mask = numpy.uint64(0xffffffffffffffff)
+    w = numpy.uint64(width)
+    A1, A2, A3, B1, B2, B3, a1, a2, a3, b1, b2, b3 = rotations
+
+    W = numpy.zeros(rounds, dtype=numpy.uint64)
+    for block in range(words.shape[0] // 16):
+        for j in range(16):
+            W[j] = words[16 * block + j]
+        for j in range(16, rounds):
+            x = W[j-15]
+            y = W[j-2]
+            s0 = ((x >> a1) | (x << (w - a1))) ^ ((x >> a2) | (x << (w - a2))) ^ (x >> a3)
+            s1 = ((y >> b1) | (y << (w - b1))) ^ ((y >> b2) | (y << (w - b2))) ^ (y >> b3)
+            W[j] = ((s1 & mask) + W[j-7] + (s0 & mask) + W[j-16]) & mask
+
+        a = H[0]
+        b = H[1]
+        c = H[2]
+        d = H[3]
+        e = H[4]
+        f = H[5]
+        g = H[6]
+        h = H[7]
+        for t in range(rounds):
+            S1 = (((e >> B1) | (e << (w - B1))) ^ ((e >> B2) | (e << (w - B2))) ^ ((e >> B3) | (e << (w - B3)))) & mask
+            T1 = (h + S1 + (g ^ (e & (f ^ g))) + K[t] + W[t]) & mask
+            S0 = (((a >> A1) | (a << (w - A1))) ^ ((a >> A2) | (a << (w - A2))) ^ ((a >> A3) | (a << (w - A3)))) & mask
+            T2 = (S0 + ((a & b) | (c & (a | b)))) & mask
+            h = g
+            g = f
+            f = e
+            e = (d + T1) & mask
+            d = c
+            c = b
+            b = a
+            a = (T1 + T2) & mask
+
+        H[0] = (H[0] + a) & mask
+        H[1] = (H[1] + b) & mask
+        H[2] = (H[2] + c) & mask
+        H[3] = (H[3] + d) & mask
+        H[4] = (H[4] + e) & mask
+        H[5] = (H[5] + f) & mask
+        H[6] = (H[6] + g) & mask
+        H[7] = (H[7] + h) & mask
+    return
+
+
+# The rotation and shift amounts of Σ0, Σ1, σ0 and σ1 for each word size
+SHA256_ROTATIONS = (2, 13, 22, 6, 11, 25, 7, 18, 3, 17, 19, 10)
+SHA512_ROTATIONS = (28, 34, 39, 14, 18, 41, 1, 8, 7, 19, 61, 6)
+
+
+def _load():
+    """
+    Imports Numba and compiles the functions above, or loads them from
+    the cache on disk, the first time they are needed
+    """
+    global numpy, numba
+    if not _KERNELS:
+        import numpy as _numpy
+        import numba as _numba
+        numpy = _numpy
+        numba = _numba
+        _KERNELS['SHA-1'] = numba.njit(cache=True)(_sha1_blocks)
+        _KERNELS['SHA-2'] = numba.njit(cache=True)(_sha2_blocks)
+    return _KERNELS
+
+
+def _compress(hasher, H, data):
+    """
+    Compresses every block of data, whose length is a multiple of the block
+    size, into the state variables H, a NumPy array, in compiled code
+    """
+    kernels = _load()
+    word_size = hasher.word_size
+    words = numpy.frombuffer(data, dtype='>u4' if word_size == 32 else '>u8').astype(numpy.uint64)
+    K = numpy.array(hasher.K, dtype=numpy.uint64)
+
+    if hasher.name == 'SHA-1':
+        kernels['SHA-1'](H, words, K)
+    elif word_size == 32:
+        kernels['SHA-2'](H, words, K, numpy.array(SHA256_ROTATIONS, dtype=numpy.uint64), 32, 64)
+    else:
+        kernels['SHA-2'](H, words, K, numpy.array(SHA512_ROTATIONS, dtype=numpy.uint64), 64, 80)
+    return
+
+
+def compress_message(hasher, message):
+    """
+    Pads the message and compresses all of its blocks with the hasher's
+    algorithm, in compiled code. Returns the state variables as a list of
+    integers.
+    """
+    _load()
+    H = numpy.array(hasher.H0, dtype=numpy.uint64)
+    _compress(hasher, H, hasher.__pad__(message))
+    return H.tolist()
+
+
+
+class Stream:
+    """
+    Computes the hash value of a message passed in pieces, as streaming.Stream
+    does, but with the compiled compression functions. The complete blocks of
+    each piece are compressed by a single call, and only the bytes of the last
+    incomplete block are kept.
+
+    Public Member Functions:
+        - update()
+        - update_zeros()
+        - digest()
+        - close()
+
+    """
+
+    # The number of zero bytes created at a time by update_zeros()
+    ZEROS_SIZE = 1 << 20
+
+    def __init__(self, hasher):
+        _load()
+        self.hasher = hasher
+        self.block_bytes = hasher.block_size // 8
+        self.H = numpy.array(hasher.H0, dtype=numpy.uint64)
+        self.pending = b''
+        self.length = 0
+        return
+
+
+    def update(self, data):
+        """
+        Appends data to the message and compresses every block that is complete
+        """
+        self.length += len(data)
+        if self.pending:
+            data = self.pending + data
+        aligned = len(data) - len(data) % self.block_bytes
+        if aligned:
+            _compress(self.hasher, self.H, data[:aligned])
+        self.pending = data[aligned:]
+        return
+
+
+    def update_zeros(self, count):
+        """
+        Appends count zero bytes to the message
+        """
+        zeros = bytes(min(count, self.ZEROS_SIZE))
+        while count > 0:
+            self.update(zeros[:count])
+            count -= min(count, len(zeros))
+        return
+
+
+    def digest(self):
+        """
+        Pads the message and returns its hexadecimal hash value. More data may
+        still be passed to update() afterwards.
+        """
+        H = self.H.copy()
+        _compress(self.hasher, H, self.hasher.__pad__(self.pending, self.length))
+        return self.hasher.__output__(H.tolist())
+
+
+    def close(self):
+        """
+        Does nothing: the stream holds no resources
+        """
+        return
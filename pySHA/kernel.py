@@ -0,0 +1,260 @@
+import os
+import socket
+import stat
+
+# Hashing by the Linux kernel's crypto API, through AF_ALG sockets. A socket bound
+# to a hash algorithm is a factory: each socket returned by accept() on it holds
+# the state of one hash computation. Data sent with MSG_MORE is added to the
+# message, data sent without it ends the message, and the hash value is read
+# back with recv(). Nothing is compiled into this package: the kernel computes
+# the hash values with its own implementations, which may use the CPU's SHA
+# instructions.
+#
+# The data of a file does not need to be read by Python at all. os.sendfile()
+# passes it from the page cache to the socket, but a sendfile() call ends the
+# message when it returns, so it can only send the last part of a message. The
+# parts before it are passed with os.splice() through a pipe, with
+# SPLICE_F_MORE, or read and sent with MSG_MORE where splice() is missing.
+#
+# AF_ALG sockets only exist on Linux, and may be disabled in the kernel or
+# forbidden by a sandbox. Every function below checks for them first, and the
+# callers fall back to the pure Python hashers when they are missing.
+
+# The kernel's name of each algorithm, by the name of the algorithm. The kernel
+# has no SHA-512/t other than through its own templates, so it is not used for them
+CRYPTO_NAMES = {
+    'SHA-1': 'sha1',
+    'SHA-224': 'sha224',
+    'SHA-256': 'sha256',
+    'SHA-384': 'sha384',
+    'SHA-512': 'sha512',
+}
+
+# The largest number of bytes passed by a single sendfile() call on Linux
+SENDFILE_LIMIT = 0x7ffff000
+
+# The number of bytes passed at a time when a file is not passed by sendfile()
+CHUNK_SIZE = 1 << 20
+
+# Whether each kernel algorithm could be bound, by its kernel name
+_SUPPORTED = {}
+
+
+def _bind(crypto_name):
+    """
+    Returns a socket bound to the kernel algorithm, from which
+    hash computations are created with accept()
+    """
+    factory = socket.socket(socket.AF_ALG, socket.SOCK_SEQPACKET, 0)
+    try:
+        factory.bind(('hash', crypto_name))
+    except OSError:
+        factory.close()
+        raise
+    return factory
+
+
+def supports(hasher):
+    """
+    Returns whether the kernel can compute hash values with the hasher's
+    algorithm. The answer for each algorithm is found once, by binding a socket.
+    """
+    crypto_name = CRYPTO_NAMES.get(hasher.name)
+    if crypto_name is None or not hasattr(socket, 'AF_ALG'):
+        return False
+
+    if crypto_name not in _SUPPORTED:
+        try:
+            _bind(crypto_name).close()
+            _SUPPORTED[crypto_name] = True
+        except OSError:
+            _SUPPORTED[crypto_name] = False
+    return _SUPPORTED[crypto_name]
+
+
+def available():
+    """
+    Returns whether AF_ALG sockets can be used at all, which is
+    checked with SHA-256, the algorithm every kernel provides
+    """
+    if not hasattr(socket, 'AF_ALG'):
+        return False
+    if 'sha256' not in _SUPPORTED:
+        try:
+            _bind('sha256').close()
+            _SUPPORTED['sha256'] = True
+        except OSError:
+            _SUPPORTED['sha256'] = False
+    return _SUPPORTED['sha256']
+
+
+def _open(hasher):
+    """
+    Returns a socket holding a new hash computation
+    with the hasher's algorithm
+    """
+    factory = _bind(CRYPTO_NAMES[hasher.name])
+    try:
+        return factory.accept()[0]
+    finally:
+        factory.close()
+
+
+def _splice(connection, fd, offset, count):
+    """
+    Adds count bytes of the file fd, starting at offset, to the message held by
+    the socket, without ending the message
+    """
+    if not hasattr(os, 'splice'):
+        while count > 0:
+            chunk = os.pread(fd, min(CHUNK_SIZE, count), offset)
+            if not chunk:
+                raise EOFError("The file ended before the requested bytes")
+            connection.sendall(chunk, socket.MSG_MORE)
+            offset += len(chunk)
+            count -= len(chunk)
+        return
+
+    read_end, write_end = os.pipe()
+    try:
+        while count > 0:
+            moved = os.splice(fd, write_end, min(CHUNK_SIZE, count), offset_src=offset)
+            if moved == 0:
+                raise EOFError("The file ended before the requested bytes")
+            offset += moved
+            count -= moved
+            while moved > 0:
+                moved -= os.splice(read_end, connection.fileno(), moved, flags=os.SPLICE_F_MORE)
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+    return
+
+
+def digest(hasher, message):
+    """
+    Returns the hexadecimal hash value of the message, computed by the kernel
+    """
+    with _open(hasher) as connection:
+        connection.sendall(message)
+        return connection.recv(64).hex()
+
+
+def digest_file(hasher, path, prefix=b''):
+    """
+    Returns the hexadecimal hash value of prefix followed by the contents of
+    a file, computed by the kernel without reading the file into Python. Files
+    that are not regular files, such as pipes, have no known size, and are
+    read and sent in chunks until they end.
+    """
+    with open(path, 'rb', buffering=0) as f, _open(hasher) as connection:
+        fd = f.fileno()
+        st = os.fstat(fd)
+        if prefix:
+            connection.sendall(prefix, socket.MSG_MORE)
+
+        # recv() ends a message that was only sent with MSG_MORE
+        if not stat.S_ISREG(st.st_mode):
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                connection.sendall(chunk, socket.MSG_MORE)
+            return connection.recv(64).hex()
+        size = st.st_size
+
+        # The last part of the file is passed by a single sendfile() call, which
+        # ends the message, and the parts before it by splice()
+        last = min(size, SENDFILE_LIMIT)
+        _splice(connection, fd, 0, size - last)
+        offset = size - last
+        while offset < size:
+            sent = os.sendfile(connection.fileno(), fd, offset, size - offset)
+            if sent == 0:
+                raise EOFError("The file ended before the requested bytes")
+            offset += sent
+        return connection.recv(64).hex()
+
+
+
+class Stream:
+    """
+    Computes the hash value of a message passed in pieces, as streaming.Stream
+    does, but in the kernel. Every piece is passed to the kernel as soon as it
+    arrives, and nothing is held by Python.
+
+    Public Member Functions:
+        - update()
+        - update_zeros()
+        - update_file()
+        - digest()
+        - close()
+
+    """
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.connection = _open(hasher)
+        self.length = 0
+        return
+
+
+    def update(self, data):
+        """
+        Appends data to the message
+        """
+        self.connection.sendall(data, socket.MSG_MORE)
+        self.length += len(data)
+        return
+
+
+    def update_zeros(self, count):
+        """
+        Appends count zero bytes to the message
+        """
+        zeros = bytes(min(count, CHUNK_SIZE))
+        while count > 0:
+            self.update(zeros[:count])
+            count -= min(count, len(zeros))
+        return
+
+
+    def update_file(self, fd, offset, count):
+        """
+        Appends count bytes of the open file fd, starting at offset, to the
+        message, without reading them into Python
+        """
+        _splice(self.connection, fd, offset, count)
+        self.length += count
+        return
+
+
+    def digest(self):
+        """
+        Returns the hexadecimal hash value of the message. More data may
+        still be passed to update() afterwards.
+        """
+        # accept() on a socket holding a computation copies the computation, so
+        # the copy can end the message while the original goes on
+        copy = self.connection.accept()[0]
+        with copy:
+            hash_value = copy.recv(64).hex()
+        if self.hasher.trace is not None:
+            self.hasher.trace.output(self.hasher.name, hash_value)
+        return hash_value
+
+
+    def close(self):
+        """
+        Closes the socket holding the computation
+        """
+        self.connection.close()
+        return
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
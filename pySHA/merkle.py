@@ -0,0 +1,191 @@
+import multiprocessing
+import struct
+from . import algorithms
+from . import double
+from . import sha256
+from . import swar
+
+# Computes the Merkle root of a list of leaves. The leaves are hashed first, and
+# then every level of the tree is built from the one below it by hashing each
+# pair of adjacent nodes, until a single node is left. Two schemes are supported:
+#
+#   - 'bitcoin': the leaves are 32-byte hashes (for example transaction ids, in
+#     their internal byte order) and are used as they are. Each node is the double
+#     SHA-256 of the concatenation of its two children. When a level has an odd
+#     number of nodes, the last node is paired with itself.
+#
+#   - 'rfc6962': the Merkle Tree Hash of RFC 6962 (Certificate Transparency). Each
+#     leaf is hashed as H(0x00 || leaf) and each node as H(0x01 || left || right),
+#     so that a leaf can never be mistaken for a node. When a level has an odd
+#     number of nodes, the last node moves up to the next level unchanged. The
+#     root of an empty list of leaves is the hash of the empty string.
+#
+# Every node of a level has the same size, so each level is stored as a single
+# bytearray holding the nodes one after the other. The next level is written
+# over the front of the same bytearray: node i of the new level only depends on
+# nodes 2i and 2i+1, which have already been read when it is written.
+
+SCHEMES = ['bitcoin', 'rfc6962']
+
+# Levels with fewer pairs than this are always hashed in the current process,
+# since sending them to the workers would take longer than hashing them
+PARALLEL_THRESHOLD = 4096
+
+
+# The block appended to every 64-byte message by SHA-256. It holds only the
+# padding, so its message schedule is the same for every message and is
+# prepared once here.
+_SHA256 = sha256.SHA256(verbose=0)
+PADDING_BLOCK_SCHEDULE_64 = tuple(_SHA256.__schedule__(_SHA256.__pad__(bytes(64))[64:]))
+
+
+def bitcoin_node(level, offset):
+    """
+    Returns the state variables of the double SHA-256 of the 64 bytes of
+    level starting at offset: the concatenation of two 32-byte nodes
+    """
+    H = _SHA256.__compress__(sha256.SHA256.H0, _SHA256.__schedule__(level[offset : offset + 64]))
+    H = _SHA256.__compress__(H, PADDING_BLOCK_SCHEDULE_64)
+    return double.second_state(H)
+
+
+def hash_leaves(leaves, scheme, algorithm):
+    """
+    Returns the hashed leaves of the first level, one after the other
+    in a single bytearray
+    """
+    if scheme == 'bitcoin':
+        return bytearray(b''.join(leaves))
+
+    algorithm = algorithms.Algorithm(algorithm)
+    return bytearray(b''.join(algorithm.hash(b'\x00' + leaf) for leaf in leaves))
+
+
+def hash_pairs(scheme, algorithm, level, npairs, lanes=None):
+    """
+    Hashes the first npairs pairs of nodes of level and writes each new node
+    over the front of level. Returns nothing: the first npairs nodes of level
+    hold the result.
+    """
+    if scheme == 'bitcoin':
+        if lanes is not None:
+            nodes = double.sha256d_batch([bytes(level[64 * i : 64 * i + 64]) for i in range(npairs)], raw=True, lanes=lanes)
+            level[: 32 * npairs] = b''.join(nodes)
+            return
+
+        for i in range(npairs):
+            struct.pack_into('>8I', level, 32 * i, *bitcoin_node(level, 64 * i))
+        return
+
+    algorithm = algorithms.Algorithm(algorithm)
+    size = algorithm.digest_size
+    if lanes is not None and algorithm.name in algorithms.SWAR_ENGINES:
+        hasher_class, compress, state_format = algorithms.SWAR_ENGINES[algorithm.name]
+        messages = [b'\x01' + level[2 * size * i : 2 * size * (i + 1)] for i in range(npairs)]
+        states = swar.hash_batch(messages, hasher_class, compress, lanes)
+        level[: size * npairs] = b''.join(struct.pack(state_format, *H) for H in states)
+        return
+
+    # Every node is the hash of 2 * size + 1 bytes, so the padding is the same
+    padding = algorithm.padding(2 * size + 1)
+    for i in range(npairs):
+        node = algorithm.hash(b'\x01' + level[2 * size * i : 2 * size * (i + 1)], padding)
+        level[size * i : size * (i + 1)] = node
+    return
+
+
+def _hash_chunk(args):
+    """
+    Runs inside a worker process. Hashes the pairs of nodes in a chunk
+    of a level and returns the new nodes as bytes.
+    """
+    scheme, algorithm, chunk, lanes = args
+    chunk = bytearray(chunk)
+    size = 32 if scheme == 'bitcoin' else algorithms.DIGEST_SIZES[algorithm]
+    npairs = len(chunk) // (2 * size)
+    hash_pairs(scheme, algorithm, chunk, npairs, lanes)
+    return bytes(chunk[: size * npairs])
+
+
+def root(leaves, algorithm='sha256', scheme='bitcoin', workers=None, lanes=None, raw=False):
+    """
+    Computes the Merkle root of the leaves with the given scheme, either
+    'bitcoin' or 'rfc6962', and returns it as a hexadecimal string, or as raw
+    bytes if raw is set. The 'bitcoin' scheme only supports SHA-256, and its
+    leaves must be 32-byte hashes.
+
+    If workers is set, the levels with many nodes are split between that many
+    worker processes. If lanes is set, SHA-256 and SHA-1 nodes are hashed with
+    the SWAR batch engine, lanes nodes at a time.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError("Unknown Merkle tree scheme %s. Supported schemes: %s"%(scheme, ', '.join(SCHEMES)))
+    if scheme == 'bitcoin' and algorithm != 'sha256':
+        raise ValueError("The bitcoin scheme only supports the sha256 algorithm")
+    if algorithm not in algorithms.ALGORITHMS:
+        raise ValueError("Unknown algorithm %s. Supported algorithms: %s"%(algorithm, ', '.join(algorithms.ALGORITHMS)))
+
+    leaves = list(leaves)
+    size = 32 if scheme == 'bitcoin' else algorithms.DIGEST_SIZES[algorithm]
+
+    if len(leaves) == 0:
+        if scheme == 'bitcoin':
+            raise ValueError("The bitcoin scheme requires at least one leaf")
+        node = algorithms.Algorithm(algorithm).hash(b'')
+        return node if raw else node.hex()
+
+    if scheme == 'bitcoin' and any(len(leaf) != 32 for leaf in leaves):
+        raise ValueError("The leaves of the bitcoin scheme must be 32-byte hashes")
+
+    pool = multiprocessing.Pool(workers) if workers else None
+    try:
+        if pool is not None and scheme == 'rfc6962':
+            chunk_size = max(1, len(leaves) // (4 * workers))
+            chunks = [leaves[i : i + chunk_size] for i in range(0, len(leaves), chunk_size)]
+            level = bytearray(b''.join(pool.map(_hash_leaf_chunk, [(algorithm, chunk) for chunk in chunks])))
+        else:
+            level = hash_leaves(leaves, scheme, algorithm)
+        del leaves
+
+        n = len(level) // size
+        while n > 1:
+            # An odd node is paired with itself by the bitcoin scheme, and moved
+            # up to the next level unchanged by the RFC 6962 scheme
+            odd = n % 2 == 1
+            if odd and scheme == 'bitcoin':
+                level[n * size : (n + 1) * size] = level[(n - 1) * size : n * size]
+                n += 1
+                odd = False
+
+            npairs = n // 2
+            if pool is not None and npairs >= PARALLEL_THRESHOLD:
+                pairs_per_chunk = -(-npairs // (4 * workers))
+                chunk_bytes = 2 * size * pairs_per_chunk
+                chunks = [(scheme, algorithm, bytes(level[i : min(i + chunk_bytes, 2 * size * npairs)]), lanes)
+                          for i in range(0, 2 * size * npairs, chunk_bytes)]
+                level[: size * npairs] = b''.join(pool.map(_hash_chunk, chunks))
+            else:
+                hash_pairs(scheme, algorithm, level, npairs, lanes)
+
+            if odd:
+                level[npairs * size : (npairs + 1) * size] = level[(n - 1) * size : n * size]
+                npairs += 1
+
+            n = npairs
+            del level[n * size :]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    node = bytes(level[: size])
+    return node if raw else node.hex()
+
+
+def _hash_leaf_chunk(args):
+    """
+    Runs inside a worker process. Hashes a chunk of the leaves with
+    the RFC 6962 leaf prefix and returns the hashes as bytes.
+    """
+    algorithm, chunk = args
+    return bytes(hash_leaves(chunk, 'rfc6962', algorithm))
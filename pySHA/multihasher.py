@@ -0,0 +1,183 @@
+import multiprocessing
+from . import streaming
+
+
+class MultiHasher:
+    """
+    Feeds a single stream of input to several SHA hashers at once, so that
+    an input that needs more than one digest only has to be read one time.
+
+    Each hasher is an instance of one of the pySHA classes. By default, every
+    chunk passed to update() is handed to each hasher in turn. If workers is
+    set, every hasher instead lives in its own worker process and receives
+    the chunks through a pipe, so that the total time spent hashing is
+    that of the slowest algorithm rather than the sum of all of them. In
+    both cases, the chunks are hashed as they arrive, with a stream of each
+    hasher's engine, so the message is never held in memory.
+
+    Public Member Functions:
+        - update()
+        - update_zeros()
+        - digest()
+        - close()
+
+    """
+
+    def __init__(self, hashers, workers=False):
+        self.hashers = list(hashers)
+        self.workers = workers
+        self.streams = []
+        self.connections = []
+        self.processes = []
+
+        if (not workers):
+            self.streams = [_open_stream(hasher) for hasher in self.hashers]
+        else:
+            for hasher in self.hashers:
+                # The new worker inherits the parent's end of its own pipe and of
+                # the pipes of the workers started before it. It must close them,
+                # or the workers would never see their pipe close on shutdown
+                parent_conn, child_conn = multiprocessing.Pipe()
+                inherited = self.connections + [parent_conn]
+                process = multiprocessing.Process(target=_worker, args=(hasher, child_conn, inherited), daemon=True)
+                process.start()
+                child_conn.close()
+                self.connections.append(parent_conn)
+                self.processes.append(process)
+        return
+
+
+    def update(self, bytes):
+        """
+        Passes the same chunk of the message to every hasher. Empty
+        chunks are ignored.
+        """
+        if len(bytes) == 0:
+            return
+
+        if (self.workers):
+            for conn in self.connections:
+                conn.send_bytes(bytes)
+        else:
+            for hasher, stream in zip(self.hashers, self.streams):
+                if stream is not None:
+                    stream.update(bytes)
+                else:
+                    hasher.update(bytes)
+        return
+
+
+    def update_zeros(self, count):
+        """
+        Appends count zero bytes to the message of every hasher. The
+        streams and the workers are only given the count, and compute the
+        zeros themselves.
+        """
+        if count == 0:
+            return
+
+        if (self.workers):
+            for conn in self.connections:
+                conn.send_bytes(b'')
+                conn.send_bytes(count.to_bytes(8, 'big'))
+        else:
+            for hasher, stream in zip(self.hashers, self.streams):
+                if stream is not None:
+                    stream.update_zeros(count)
+                else:
+                    hasher.update(bytes(count))
+        return
+
+
+    def digest(self):
+        """
+        Computes the digest of the message seen so far with every hasher
+        and returns the hash values as a list, in the same order as the
+        hashers were given.
+        """
+        if (self.workers):
+            # Ask every worker for its digest before waiting on any of them,
+            # so that all the algorithms finish their work concurrently
+            for conn in self.connections:
+                conn.send_bytes(b'')
+                conn.send_bytes(b'')
+            return [conn.recv() for conn in self.connections]
+
+        return [stream.digest() if stream is not None else hasher.digest() for hasher, stream in zip(self.hashers, self.streams)]
+
+
+    def close(self):
+        """
+        Closes the streams, and shuts down the worker processes, if there are any
+        """
+        for stream in self.streams:
+            if stream is not None:
+                stream.close()
+        for conn in self.connections:
+            conn.close()
+        for process in self.processes:
+            process.join()
+
+        self.streams = []
+        self.connections = []
+        self.processes = []
+        return
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def _open_stream(hasher):
+    """
+    Returns a stream of the hasher's engine, or None from trace level 2,
+    where the steps of the computation need the whole message, so that the
+    hasher itself has to be fed
+    """
+    trace = hasher.trace
+    if (trace is not None and trace.level > 1):
+        return None
+    return streaming.open_stream(hasher)
+
+
+def _worker(hasher, conn, inherited):
+    """
+    Runs inside a worker process. Every non-empty message received is
+    fed to the hasher's stream, and an empty message announces a command,
+    held by the next message: an empty one is a request for the digest,
+    and 8 bytes are the number of zero bytes to append to the message.
+    The worker exits once the parent closes its end of the pipe.
+    """
+    for other in inherited:
+        other.close()
+
+    stream = _open_stream(hasher)
+
+    while True:
+        try:
+            data = conn.recv_bytes()
+            if len(data) == 0:
+                command = conn.recv_bytes()
+        except EOFError:
+            break
+
+        if len(data) > 0:
+            if stream is not None:
+                stream.update(data)
+            else:
+                hasher.update(data)
+        elif len(command) == 0:
+            conn.send(stream.digest() if stream is not None else hasher.digest())
+        elif stream is not None:
+            stream.update_zeros(int.from_bytes(command, 'big'))
+        else:
+            hasher.update(bytes(int.from_bytes(command, 'big')))
+
+    if stream is not None:
+        stream.close()
+    conn.close()
@@ -0,0 +1,75 @@
+import itertools
+import struct
+from . import algorithms
+from . import swar
+
+# Hashes the messages of an iterable one at a time, as they are needed, so that
+# hashing can be chained with other generators without building a list of all of
+# the messages or of their hash values.
+#
+# A single hasher provides the schedule and compression functions for every
+# message. Each message starts again from the seed values H0, and nothing else
+# about the hasher is reset or created again.
+
+
+def hash_iter(iterable, algorithm='sha256', batch=None, lanes=16):
+    """
+    Yields the raw hash value of each message of the iterable, in order. The
+    algorithm is one of the names of algorithms.ALGORITHMS, such as 'sha1'
+    or 'sha512_256'.
+
+    If batch is set, that many messages are read ahead from the iterable and
+    hashed together by the SWAR batch engine, lanes messages at a time. Only
+    SHA-1 and SHA-256 have a batch engine.
+    """
+    algorithm = algorithms.Algorithm(algorithm)
+    if batch is not None:
+        if algorithm.name not in algorithms.SWAR_ENGINES:
+            raise ValueError("The batch engine only supports the %s algorithms"%(' and '.join(algorithms.SWAR_ENGINES)))
+        return _hash_batches(iter(iterable), algorithm, batch, lanes)
+    return _hash_messages(iterable, algorithm)
+
+
+def _hash_messages(iterable, algorithm):
+    """
+    Hashes each message with the schedule and compression functions
+    of the algorithm's hasher
+    """
+    hasher = algorithm.hasher
+    schedule = hasher.__schedule__
+    compress = hasher.__compress__
+    final_schedules = hasher.__final_schedules__
+    block_bytes = algorithm.block_bytes
+    H0 = algorithm.H0
+
+    # The state variables are packed by a precompiled format, into the first
+    # bytes of an output buffer of the same size for every message
+    pack_into = struct.Struct(algorithm.state_format).pack_into
+    buffer = bytearray(struct.calcsize(algorithm.state_format))
+    output = memoryview(buffer)[: algorithm.digest_size]
+
+    for message in iterable:
+        H = H0
+        aligned = len(message) - len(message) % block_bytes
+        for i in range(0, aligned, block_bytes):
+            H = compress(H, schedule(message[i : i + block_bytes]))
+        for W in final_schedules(message[aligned:], len(message)):
+            H = compress(H, W)
+
+        pack_into(buffer, 0, *H)
+        yield bytes(output)
+    return
+
+
+def _hash_batches(iterator, algorithm, batch, lanes):
+    """
+    Reads batch messages at a time and hashes them with the SWAR batch engine
+    """
+    hasher_class, compress, state_format = algorithms.SWAR_ENGINES[algorithm.name]
+    pack = struct.Struct(state_format).pack
+    while True:
+        messages = list(itertools.islice(iterator, batch))
+        if not messages:
+            return
+        for H in swar.hash_batch(messages, hasher_class, compress, lanes):
+            yield pack(*H)
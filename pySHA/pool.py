@@ -0,0 +1,116 @@
+import contextlib
+import threading
+
+
+class HasherPool:
+    """
+    Keeps a bounded number of idle hashers of one algorithm, so that code
+    hashing many messages in a loop can reuse hashers instead of creating a
+    new one for every message. The pool may be shared by several threads.
+
+    acquire() returns an idle hasher if there is one (a hit), and otherwise
+    creates a new one (a miss). release() resets the hasher and keeps it for
+    later, unless maxsize hashers are already idle, in which case the hasher
+    is discarded. The hasher() context manager does both:
+
+        pool = HasherPool(SHA256)
+        with pool.hasher() as hasher:
+            hasher.update(message)
+            hash_value = hasher.digest()
+
+    The keyword arguments are passed to the hasher class when a new hasher is
+    created. Pooled hashers are created with verbose=0 unless stated otherwise.
+
+    Public Member Functions:
+        - acquire()
+        - release()
+        - hasher()
+        - hit_rate()
+        - stats()
+
+    """
+
+    def __init__(self, hasher_class, maxsize=16, **kwargs):
+        if maxsize < 0:
+            raise ValueError("Invalid pool size %s. The pool size cannot be negative"%(maxsize))
+
+        kwargs.setdefault('verbose', 0)
+        self.hasher_class = hasher_class
+        self.kwargs = kwargs
+        self.maxsize = maxsize
+
+        # The idle hashers. New hashers are only created outside of the lock,
+        # so the lock is only held while the list and counters are updated
+        self.idle = []
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        return
+
+
+    def acquire(self):
+        """
+        Returns a hasher that holds no message, taken from the pool
+        if possible and created otherwise
+        """
+        with self.lock:
+            if self.idle:
+                self.hits += 1
+                return self.idle.pop()
+            self.misses += 1
+
+        return self.hasher_class(**self.kwargs)
+
+
+    def release(self, hasher):
+        """
+        Resets the hasher and returns it to the pool, or discards
+        it if the pool already holds maxsize idle hashers
+        """
+        hasher.reset()
+        with self.lock:
+            if len(self.idle) < self.maxsize:
+                self.idle.append(hasher)
+            else:
+                self.discarded += 1
+        return
+
+
+    @contextlib.contextmanager
+    def hasher(self):
+        """
+        Acquires a hasher for the duration of a with block, and
+        releases it at the end of the block
+        """
+        hasher = self.acquire()
+        try:
+            yield hasher
+        finally:
+            self.release(hasher)
+
+
+    def hit_rate(self):
+        """
+        Returns the fraction of the calls to acquire() that were served
+        by an idle hasher, or 0 if acquire() has never been called
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return self.hits / total if total > 0 else 0.0
+
+
+    def stats(self):
+        """
+        Returns the pool counters as a dictionary
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'discarded': self.discarded,
+                'idle': len(self.idle),
+                'hit_rate': self.hits / total if total > 0 else 0.0,
+            }
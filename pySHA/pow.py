@@ -0,0 +1,249 @@
+import collections
+import itertools
+import multiprocessing
+import struct
+from . import sha256
+
+# Proof-of-work nonce search: finds a nonce such that SHA-256(prefix || nonce) has
+# at least difficulty leading zero bits. The nonce is an unsigned integer encoded
+# as nonce_size big-endian bytes, appended right after the prefix.
+#
+# Every message tried has the same prefix and the same length, so most of the work
+# is the same for every nonce and is done once, when the search is prepared:
+#
+#   - The blocks made only of prefix bytes are compressed once. Their state
+#     variables, the midstate, are the starting point of every message.
+#   - The final block holds the end of the prefix, the nonce and the padding. In
+#     its message schedule, only the words holding nonce bytes, and the words of
+#     W[16..63] computed from them, change with the nonce. The other words are
+#     computed once.
+#   - The rounds before the first word holding nonce bytes are the same for
+#     every nonce, so the working variables after them are computed once too.
+#   - If the nonce or the padding do not fit in the final block, each block after
+#     it only depends on the nonce if the nonce runs over into it. Otherwise, its
+#     message schedule is computed once.
+#
+# Only the first words of the hash value are needed to count its leading zero
+# bits, so the others are never computed.
+
+_HASHER = sha256.SHA256(verbose=0)
+_MASK = 0xffffffff
+
+# The number of nonces tried by a worker for each task it receives
+CHUNK_SIZE = 1 << 12
+
+
+def _rounds(W, start, end, state):
+    """
+    Runs the SHA-256 rounds from round start up to round end, excluded, over
+    the message schedule W, starting from the working variables in state.
+    Returns the working variables after the last round.
+    """
+    mask = _MASK
+    K = sha256.SHA256.K
+    a, b, c, d, e, f, g, h = state
+
+    for t in range(start, end):
+        T1 = h + ((e >> 6 | e << 26) ^ (e >> 11 | e << 21) ^ (e >> 25 | e << 7)) + (g ^ (e & (f ^ g))) + K[t] + W[t]
+        T2 = ((a >> 2 | a << 30) ^ (a >> 13 | a << 19) ^ (a >> 22 | a << 10)) + ((a & b) | (c & (a | b)))
+        h = g
+        g = f
+        f = e
+        e = (d + T1) & mask
+        d = c
+        c = b
+        b = a
+        a = (T1 + T2) & mask
+
+    return (a, b, c, d, e, f, g, h)
+
+
+class Search:
+    """
+    Holds everything about SHA-256(prefix || nonce) that does not depend
+    on the nonce, and tries nonces one range at a time with find()
+    """
+
+    def __init__(self, prefix, difficulty, nonce_size=8):
+        if difficulty < 0 or difficulty > 256:
+            raise ValueError("Invalid difficulty %s. The difficulty must be between 0 and 256 bits"%(difficulty))
+        if nonce_size < 1:
+            raise ValueError("Invalid nonce size %s. The nonce must hold at least one byte"%(nonce_size))
+
+        self.difficulty = difficulty
+        self.nonce_size = nonce_size
+
+        # The midstate: the state variables after the blocks made only of prefix bytes
+        full = len(prefix) - len(prefix) % 64
+        H = list(sha256.SHA256.H0)
+        for i in range(0, full, 64):
+            H = _HASHER.__compress__(H, _HASHER.__schedule__(prefix[i : i + 64]))
+        self.midstate = tuple(H)
+
+        # The final blocks, with a nonce of zero. The nonce starts at offset in the
+        # first one, and runs over into the next ones if offset + nonce_size > 64
+        offset = len(prefix) - full
+        final = _HASHER.__pad__(prefix[full:] + bytes(nonce_size), len(prefix) + nonce_size)
+        self.blocks = len(final) // 64
+
+        # The words holding nonce bytes, counted from the first word of the first
+        # final block, and the bytes of the final blocks around the nonce in them
+        self.first_word = offset // 4
+        self.last_word = (offset + nonce_size - 1) // 4
+        self.before = final[4 * self.first_word : offset]
+        self.after = final[offset + nonce_size : 4 * (self.last_word + 1)]
+        self.words = struct.Struct('>%dI' % (self.last_word - self.first_word + 1))
+
+        # The message schedule of each final block with a nonce of zero, and the
+        # words of W[16..63] of each block that depend on the nonce
+        self.schedules = []
+        self.dependent = []
+        for block in range(self.blocks):
+            self.schedules.append(tuple(_HASHER.__schedule__(final[64 * block : 64 * (block + 1)])))
+            changed = set(j - 16 * block for j in range(self.first_word, self.last_word + 1) if j // 16 == block)
+            for j in range(16, 64):
+                if changed.intersection((j - 2, j - 7, j - 15, j - 16)):
+                    changed.add(j)
+            self.dependent.append(tuple(sorted(j for j in changed if j >= 16)))
+
+        # The rounds of the first final block that come before its first
+        # nonce word do not depend on the nonce
+        self.start_state = _rounds(self.schedules[0], 0, self.first_word, self.midstate)
+
+        # The leading zero bits are counted on the first words of the hash value
+        self.needed = max(1, -(-difficulty // 32))
+        self.shift = 32 * self.needed - difficulty
+        return
+
+
+    def __schedules__(self, nonce):
+        """
+        Returns the message schedules of the final blocks for the nonce, starting
+        from the schedules with a nonce of zero and only computing again the
+        words that depend on the nonce
+        """
+        mask = _MASK
+        words = self.words.unpack(self.before + nonce.to_bytes(self.nonce_size, 'big') + self.after)
+
+        schedules = []
+        for block in range(self.blocks):
+            dependent = self.dependent[block]
+            if not dependent:
+                schedules.append(self.schedules[block])
+                continue
+
+            W = list(self.schedules[block])
+            for i, word in enumerate(words):
+                j = self.first_word + i - 16 * block
+                if 0 <= j < 16:
+                    W[j] = word
+            for j in dependent:
+                x = W[j-15]
+                y = W[j-2]
+                W[j] = (((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10)) + W[j-7]
+                        + ((x >> 7 | x << 25) ^ (x >> 18 | x << 14) ^ (x >> 3)) + W[j-16]) & mask
+            schedules.append(W)
+        return schedules
+
+
+    def leading(self, nonce):
+        """
+        Returns the first words of the hash value of prefix || nonce, the
+        ones that hold the leading bits, as a single integer
+        """
+        mask = _MASK
+        schedules = self.__schedules__(nonce)
+
+        H = self.midstate
+        state = _rounds(schedules[0], self.first_word, 64, self.start_state)
+        for W in schedules[1:]:
+            H = [(x + y) & mask for x, y in zip(H, state)]
+            state = _rounds(W, 0, 64, H)
+
+        value = 0
+        for i in range(self.needed):
+            value = value << 32 | ((H[i] + state[i]) & mask)
+        return value
+
+
+    def find(self, start, count):
+        """
+        Tries the nonces from start to start + count, excluded, in order, and
+        returns the first one that meets the difficulty, or None
+        """
+        shift = self.shift
+        leading = self.leading
+        for nonce in range(start, start + count):
+            if leading(nonce) >> shift == 0:
+                return nonce
+        return None
+
+
+
+# The search prepared in each worker process for the prefix it is given
+_WORKER_SEARCH = None
+
+
+def _init_worker(prefix, difficulty, nonce_size):
+    """
+    Runs once in each worker process and prepares its search
+    """
+    global _WORKER_SEARCH
+    _WORKER_SEARCH = Search(prefix, difficulty, nonce_size)
+    return
+
+
+def _find_chunk(args):
+    """
+    Runs inside a worker process. Tries a range of nonces.
+    """
+    start, count = args
+    return _WORKER_SEARCH.find(start, count)
+
+
+def search(prefix, difficulty, start=0, count=1 << 32, workers=None, nonce_size=8):
+    """
+    Returns the smallest nonce from start to start + count, excluded, such that
+    SHA-256(prefix || nonce) has at least difficulty leading zero bits, or None
+    if there is none. The nonce is encoded as nonce_size big-endian bytes.
+
+    If workers is set, the range is split into chunks that are tried by that
+    many worker processes. As soon as a solution is found and every chunk before
+    it has been tried, the remaining chunks are cancelled.
+    """
+    if start < 0 or count < 0 or start + count > 1 << (8 * nonce_size):
+        raise ValueError("Invalid nonce range. The nonces must fit in %d bytes"%(nonce_size))
+
+    if not workers:
+        return Search(prefix, difficulty, nonce_size).find(start, count)
+
+    chunks = ((chunk, min(CHUNK_SIZE, start + count - chunk)) for chunk in range(start, start + count, CHUNK_SIZE))
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(bytes(prefix), difficulty, nonce_size))
+    try:
+        # A few chunks per worker are handed out ahead of time, and the results
+        # are read in the order of the chunks, so the first solution read is the
+        # smallest one. Handing out all of the chunks at once would queue up
+        # millions of tasks for the default range.
+        pending = collections.deque()
+        for chunk in itertools.islice(chunks, 4 * workers):
+            pending.append(pool.apply_async(_find_chunk, (chunk,)))
+
+        while pending:
+            nonce = pending.popleft().get()
+            if nonce is not None:
+                return nonce
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.apply_async(_find_chunk, (chunk,)))
+        return None
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def verify(prefix, nonce, difficulty, nonce_size=8):
+    """
+    Checks a nonce by hashing prefix || nonce with the SHA-256 hasher
+    """
+    hasher = sha256.SHA256(verbose=0)
+    hasher.update(prefix + nonce.to_bytes(nonce_size, 'big'))
+    return int(hasher.digest(), 16) >> (256 - difficulty) == 0
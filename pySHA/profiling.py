@@ -0,0 +1,152 @@
+import contextlib
+import time
+
+
+class HashStats:
+    """
+    Holds the profiling statistics recorded by one or more hashers. The
+    times are in seconds, and are split between the phases of the computation:
+
+        - preprocess_time: padding the message and splitting it into blocks
+        - schedule_time: preparing the message schedule W of each block
+        - compression_time: running the rounds over each block
+        - output_time: encoding the final state variables as the hash value
+
+    The counters are the number of blocks compressed, the number of bytes
+    passed to update(), the number of update() calls and the number of digests.
+
+    Public Member Functions:
+        - reset()
+        - total_time()
+        - as_dict()
+        - report()
+
+    """
+
+    def __init__(self):
+        self.reset()
+        return
+
+
+    def reset(self):
+        """
+        Sets all of the times and counters back to zero
+        """
+        self.preprocess_time = 0.0
+        self.schedule_time = 0.0
+        self.compression_time = 0.0
+        self.output_time = 0.0
+        self.blocks = 0
+        self.bytes = 0
+        self.updates = 0
+        self.digests = 0
+        return
+
+
+    def total_time(self):
+        """
+        Returns the total time spent in all of the phases
+        """
+        return self.preprocess_time + self.schedule_time + self.compression_time + self.output_time
+
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dictionary, for example to be stored as JSON
+        """
+        return {
+            'preprocess_time': self.preprocess_time,
+            'schedule_time': self.schedule_time,
+            'compression_time': self.compression_time,
+            'output_time': self.output_time,
+            'blocks': self.blocks,
+            'bytes': self.bytes,
+            'updates': self.updates,
+            'digests': self.digests,
+        }
+
+
+    def report(self):
+        """
+        Returns the statistics formatted as a table for display
+        """
+        total = self.total_time()
+        lines = []
+        for name, value in [('Preprocessing', self.preprocess_time), ('Schedule', self.schedule_time),
+                            ('Compression', self.compression_time), ('Output', self.output_time)]:
+            share = 100 * value / total if total > 0 else 0.0
+            lines.append('%-14s %12.6f s  %5.1f%%' % (name, value, share))
+        lines.append('%-14s %12.6f s' % ('Total', total))
+        lines.append('%-14s %12d' % ('Blocks', self.blocks))
+        lines.append('%-14s %12d' % ('Bytes', self.bytes))
+        lines.append('%-14s %12d' % ('Updates', self.updates))
+        lines.append('%-14s %12d' % ('Digests', self.digests))
+        return '\n'.join(lines)
+
+
+    def __repr__(self):
+        return 'HashStats(%s)' % (', '.join('%s=%r' % item for item in self.as_dict().items()))
+
+
+def timed(stats, schedule, compress, final_schedules, output):
+    """
+    Returns the schedule, compression, final schedules and output functions of a
+    hasher wrapped so that each call records its time in stats, and each
+    compression counts one block. The final schedules are counted as
+    preprocessing, since they include the padding of the message.
+    """
+    clock = time.perf_counter
+
+    def timed_schedule(block):
+        start = clock()
+        W = schedule(block)
+        stats.schedule_time += clock() - start
+        return W
+
+    def timed_compress(H, W):
+        start = clock()
+        H = compress(H, W)
+        stats.compression_time += clock() - start
+        stats.blocks += 1
+        return H
+
+    def timed_final_schedules(tail, length):
+        start = clock()
+        final = final_schedules(tail, length)
+        stats.preprocess_time += clock() - start
+        return final
+
+    def timed_output(H):
+        start = clock()
+        hash_value = output(H)
+        stats.output_time += clock() - start
+        return hash_value
+
+    return timed_schedule, timed_compress, timed_final_schedules, timed_output
+
+
+@contextlib.contextmanager
+def profile(*hashers, stats=None):
+    """
+    Records profiling statistics for the given hashers while the context is
+    active, and yields the stats object. All of the hashers record into the
+    same stats object, which is created if it is not given. For example:
+
+        with profile(hasher) as stats:
+            hasher.update(message)
+            hasher.digest()
+        print(stats.report())
+
+    """
+    if stats is None:
+        stats = HashStats()
+
+    previous = [hasher.stats for hasher in hashers]
+    for hasher in hashers:
+        hasher.enable_profiling(stats)
+
+    try:
+        yield stats
+    finally:
+        for hasher, old in zip(hashers, previous):
+            hasher.stats = old
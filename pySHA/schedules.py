@@ -0,0 +1,58 @@
+# Message schedules that do not depend on the contents of the message, computed
+# once and reused.
+#
+# When the padding of a message does not fit in its last block, or when the
+# length of the message is a multiple of the block size, the padding ends up
+# in a final block of its own. That block only depends on the length of the
+# message, so its whole message schedule is stored in a small cache, keyed by
+# the length of the message, and reused for every message of the same length.
+
+# The maximum number of padding schedules kept, for all the algorithms together.
+# When the cache is full, the schedule that was stored first is removed.
+CACHE_SIZE = 64
+
+_PADDING_CACHE = {}
+
+
+def padding_schedule(schedule, length, block):
+    """
+    Returns the message schedule of a final block holding only padding, for a
+    message of the given length. The schedule is computed with the hasher's
+    __schedule__ method the first time, and taken from the cache afterwards. A
+    new list is returned every time, since the compression function may modify it.
+    """
+    # Hashers whose classes share the same schedule function share the cache entries
+    key = (schedule.__func__, length)
+    W = _PADDING_CACHE.get(key)
+    if W is None:
+        W = tuple(schedule(block))
+        if len(_PADDING_CACHE) >= CACHE_SIZE:
+            _PADDING_CACHE.pop(next(iter(_PADDING_CACHE)), None)
+        _PADDING_CACHE[key] = W
+    return list(W)
+
+
+def clear_cache():
+    """
+    Removes every stored padding schedule
+    """
+    _PADDING_CACHE.clear()
+    return
+
+
+# The message schedule of a block of zeros is the same for every message. Each
+# schedule function has a single entry, which is never removed.
+_ZERO_CACHE = {}
+
+
+def zero_schedule(schedule, block_bytes):
+    """
+    Returns the message schedule of a block of block_bytes zeros, computed
+    with the hasher's __schedule__ method the first time. A new list is
+    returned every time, since the compression function may modify it.
+    """
+    W = _ZERO_CACHE.get(schedule.__func__)
+    if W is None:
+        W = tuple(schedule(bytes(block_bytes)))
+        _ZERO_CACHE[schedule.__func__] = W
+    return list(W)
@@ -0,0 +1,94 @@
+import threading
+from . import sha512
+
+# Initial state variables derived for each value of t. These are shared by
+# every SHA512_t hasher in the process, so the IV generation function runs
+# only once for each t. The values are stored as tuples so that no hasher
+# can modify them in place.
+_IV_CACHE = {}
+_IV_LOCK = threading.Lock()
+
+
+class SHA512_t(sha512.SHA512):
+    """
+    Implements the SHA-512/t Algorithm for any supported t. SHA-512/t computes
+    the hash in the same way as SHA-512, but uses a different set of seed values
+    of H for every t, and truncates the output to its leftmost t bits.
+
+    SHA-512/224 and SHA-512/256 are the two instances of SHA-512/t given
+    their own classes. Their seed values are predefined in the official
+    specification, but they are generated by the same SHA-512/t IV Generation
+    Function this class uses to derive the seed values for other values of t.
+    """
+
+    # Unlike the other algorithms, the seed values and the name depend on t,
+    # so they are stored with each hasher
+    __slots__ = ('t', 'name', 'H0')
+
+    def __init__(self, t, verbose=1, trace=None, backend=None):
+        # The official specification allows any t below 512 except 384, for which
+        # the SHA-384 algorithm is used instead. The hash value is returned as a
+        # hexadecimal string, so t must also be a whole number of bytes.
+        if t <= 0 or t >= 512 or t == 384 or t % 8 != 0:
+            raise ValueError("Invalid value of t for SHA-512/t: %s. t must be a \
+                multiple of 8 between 8 and 504, other than 384"%(t))
+
+        self.t = t
+        self.name = 'SHA-512/%d'%(t)
+
+        # Initial state variables for SHA-512/t, generated from the SHA-512/t IV
+        # Generation Function, or taken from the cache if another hasher has
+        # already generated them for the same t. The cached tuple is shared by
+        # all of the hashers for that t.
+        self.H0 = initial_hash_values(t)
+        sha512.SHA512.__init__(self, verbose=verbose, trace=trace, backend=backend)
+        return
+
+
+    def __output__(self, H):
+        """
+        Encodes the state variables H as the hexadecimal SHA-512/t hash value.
+        """
+        # Note that SHA-512/t computes the hash using the same process as SHA-512, but
+        # truncates the end result to t bits instead of 512 bits.
+        output = [item.to_bytes(8, 'big').hex() for item in H]
+        hash_value = ''.join(output)[0:int(self.t/4)]
+
+        if self.trace is not None:
+            self.trace.output(self.name, hash_value)
+
+        return hash_value
+
+
+
+def initial_hash_values(t):
+    """
+    Returns the SHA-512/t initial state variables as a tuple of 8 words,
+    generating them only the first time they are requested for a given t.
+    """
+    H_init = _IV_CACHE.get(t)
+    if H_init is not None:
+        return H_init
+
+    with _IV_LOCK:
+        # Another thread may have generated the values while this
+        # one was waiting for the lock
+        H_init = _IV_CACHE.get(t)
+        if H_init is None:
+            H_init = generate_hash_values(t)
+            _IV_CACHE[t] = H_init
+    return H_init
+
+
+def generate_hash_values(t):
+    """
+    The SHA-512/t IV Generation Function. Computes the SHA-512 hash of the
+    string 'SHA-512/t', with the SHA-512 seed values each XORed with
+    0xa5a5a5a5a5a5a5a5, and returns the 8 words of the result as a tuple.
+    """
+    hasher = sha512.SHA512(verbose=0)
+    H = [item ^ 0xa5a5a5a5a5a5a5a5 for item in sha512.SHA512.H0]
+    padded = hasher.__pad__(('SHA-512/%d'%(t)).encode('ascii'))
+    for i in range(0, len(padded), 128):
+        H = hasher.__compress__(H, hasher.__schedule__(padded[i : i + 128]))
+    return tuple(H)
@@ -0,0 +1,227 @@
+import array
+import itertools
+import multiprocessing
+import os
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+from . import algorithms
+from . import backends
+
+# Hashes large batches of messages in worker processes without pickling them.
+# The messages are copied once into a shared memory arena, which every worker
+# maps into its own address space, and only the bounds of each worker's slice of
+# the batch are sent through the pool. The arena is laid out as:
+#
+#   - the offsets table: count + 1 unsigned 64-bit integers. Message i is made of
+#     the bytes from offsets[i] to offsets[i + 1] of the data region.
+#   - the output region: count raw digests of digest_size bytes, one after the
+#     other, written in place by the workers.
+#   - the data region: the messages, one after the other.
+#
+# The pool and the arena are kept from one batch to the next. The arena is only
+# created again when a batch does not fit in it, and then with twice the size.
+# Each worker keeps the arena it last attached to, so it only maps it again when
+# its name changes.
+
+# The number of slices handed out to each worker for a batch, so that the
+# workers finishing early take over some of the work of the others
+SLICES_PER_WORKER = 4
+
+# The smallest arena created, in bytes
+MIN_ARENA_SIZE = 1 << 20
+
+
+class SharedBatchHasher:
+    """
+    Computes the raw hash values of batches of messages with a warm pool of
+    worker processes, passing the messages and the hash values through shared
+    memory. The algorithm is one of the names of algorithms.ALGORITHMS, such as
+    'sha1' or 'sha512_256', and backend is the engine used by the workers, as
+    for the hashers. By default, each worker hashes its slice in place with the
+    'python' engine, or with a batch engine when one is available.
+
+        with SharedBatchHasher('sha256', workers=4) as hasher:
+            digests = hasher.hash(messages)
+
+    Public Member Functions:
+        - hash()
+        - close()
+
+    """
+
+    def __init__(self, algorithm='sha256', workers=None, backend=None):
+        self.algorithm = algorithms.Algorithm(algorithm)
+        if backend is not None:
+            backends.get(backend)
+
+        # The workers register every arena they attach to with the resource
+        # tracker, which unlinks what is left when it exits. Started here, before
+        # the workers, the tracker is the parent's one, which only unlinks the
+        # arenas the parent did not. Otherwise each forked worker would start
+        # its own and unlink the arena when the pool shuts down.
+        resource_tracker.ensure_running()
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(algorithm, backend))
+        self.arena = None
+        return
+
+
+    def __reserve__(self, size):
+        """
+        Returns an arena of at least size bytes, keeping the current
+        one if it is large enough
+        """
+        if self.arena is not None and self.arena.size >= size:
+            return self.arena
+
+        if self.arena is not None:
+            size = max(size, 2 * self.arena.size)
+            self.arena.close()
+            self.arena.unlink()
+        self.arena = shared_memory.SharedMemory(create=True, size=max(size, MIN_ARENA_SIZE))
+        return self.arena
+
+
+    def hash(self, messages):
+        """
+        Returns the raw hash value of each message, as a list
+        in the same order as the messages
+        """
+        messages = list(messages)
+        count = len(messages)
+        if count == 0:
+            return []
+
+        digest_size = self.algorithm.digest_size
+        table_size = 8 * (count + 1)
+        output_start = table_size
+        data_start = output_start + digest_size * count
+        lengths = list(map(len, messages))
+        arena = self.__reserve__(data_start + sum(lengths))
+
+        # The offsets table is written with a single copy, and each message
+        # is copied straight into the data region
+        offsets = array.array('Q', [0])
+        offsets.extend(itertools.accumulate(lengths))
+        buffer = arena.buf
+        buffer[:table_size] = offsets.tobytes()
+        for offset, message in zip(offsets, messages):
+            buffer[data_start + offset : data_start + offset + len(message)] = message
+
+        # Only the name of the arena and the bounds of each slice are pickled
+        step = -(-count // (SLICES_PER_WORKER * self.workers))
+        tasks = [(arena.name, count, start, min(start + step, count)) for start in range(0, count, step)]
+        self.pool.map(_hash_slice, tasks)
+
+        output = bytes(buffer[output_start : data_start])
+        return [output[digest_size * i : digest_size * (i + 1)] for i in range(count)]
+
+
+    def close(self):
+        """
+        Shuts down the worker processes and frees the arena
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.arena is not None:
+            self.arena.close()
+            self.arena.unlink()
+            self.arena = None
+        return
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+
+# The algorithm of each worker process, whose hasher asks for the engine
+# given to the batch hasher, and the arena the worker last attached to
+_WORKER_ALGORITHM = None
+_WORKER_ARENA = None
+
+
+def _init_worker(algorithm, backend):
+    """
+    Runs once in each worker process and prepares its algorithm
+    """
+    global _WORKER_ALGORITHM
+    _WORKER_ALGORITHM = algorithms.Algorithm(algorithm)
+    _WORKER_ALGORITHM.hasher.backend = backend
+    return
+
+
+def _attach(name):
+    """
+    Returns the arena with the given name, attaching to it
+    if it is not the one the worker last attached to
+    """
+    global _WORKER_ARENA
+    if _WORKER_ARENA is None or _WORKER_ARENA.name != name:
+        if _WORKER_ARENA is not None:
+            _WORKER_ARENA.close()
+        _WORKER_ARENA = shared_memory.SharedMemory(name=name)
+    return _WORKER_ARENA
+
+
+def _hash_slice(task):
+    """
+    Runs inside a worker process. Hashes the messages from start to end,
+    excluded, and writes their raw hash values into the output region.
+    """
+    name, count, start, end = task
+    algorithm = _WORKER_ALGORITHM
+    hasher = algorithm.hasher
+    digest_size = algorithm.digest_size
+    output_start = 8 * (count + 1)
+    data_start = output_start + digest_size * count
+
+    buffer = _attach(name).buf
+    table = buffer[8 * start : 8 * (end + 1)].cast('Q')
+    try:
+        offsets = table.tolist()
+    finally:
+        table.release()
+
+    # The batch engines need the messages as bytes, so the slice is copied out
+    # of the arena at once, which is still much cheaper than pickling it
+    engine = backends.select_batch(hasher, end - start)
+    if engine.name != 'python':
+        data = bytes(buffer[data_start + offsets[0] : data_start + offsets[-1]])
+        first = offsets[0]
+        messages = [data[a - first : b - first] for a, b in zip(offsets, offsets[1:])]
+        hash_values = engine.digest_batch(hasher, messages)
+        buffer[output_start + digest_size * start : output_start + digest_size * end] = bytes.fromhex(''.join(hash_values))
+        return end - start
+
+    # Otherwise, the blocks are read from the arena itself, and only the tail of
+    # each message is copied to be padded
+    schedule = hasher.__schedule__
+    compress = hasher.__compress__
+    final_schedules = hasher.__final_schedules__
+    block_bytes = algorithm.block_bytes
+    pack_into = struct.Struct(algorithm.state_format).pack_into
+    state = bytearray(struct.calcsize(algorithm.state_format))
+
+    for i in range(end - start):
+        a = data_start + offsets[i]
+        b = data_start + offsets[i + 1]
+        H = algorithm.H0
+        aligned = b - (b - a) % block_bytes
+        for j in range(a, aligned, block_bytes):
+            H = compress(H, schedule(buffer[j : j + block_bytes]))
+        for W in final_schedules(bytes(buffer[aligned : b]), b - a):
+            H = compress(H, W)
+
+        pack_into(state, 0, *H)
+        position = output_start + digest_size * (start + i)
+        buffer[position : position + digest_size] = state[:digest_size]
+    return end - start
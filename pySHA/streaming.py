@@ -0,0 +1,294 @@
+import errno
+import os
+import stat
+from . import backends
+from . import kernel
+from . import schedules
+
+# Hashes a message passed in pieces without keeping the whole message in memory.
+# Each block goes through the hasher's __schedule__ and __compress__ functions as
+# soon as it is complete, and only the bytes of the last incomplete block are
+# kept until the next piece arrives, or until the message is padded at the end.
+#
+# Blocks of zeros all have the same message schedule, which is taken from the
+# cache in schedules.py instead of being computed again for each block. This
+# matters for sparse files, such as virtual machine images, which are mostly
+# holes: on Linux, the holes are found with SEEK_DATA and SEEK_HOLE and are
+# never read, and each block of a hole is compressed with the cached schedule.
+#
+# Hashers that ask for another engine, with their backend argument or with the
+# PYSHA_BACKEND environment variable, are given the pieces through that engine's
+# own stream instead, from its stream() function in backends.py. Hashers that ask
+# for the 'kernel' engine are given their files through kernel.py, when the
+# kernel supports their algorithm, and their files are never read by Python.
+
+# The number of bytes read from a file at a time
+CHUNK_SIZE = 1 << 20
+
+
+class Stream:
+    """
+    Computes the hash value of a message passed in pieces with update(), or
+    update_zeros() for runs of zeros, holding at most one block of the message.
+    The hasher only provides the algorithm, and is not modified.
+
+    Public Member Functions:
+        - update()
+        - update_zeros()
+        - digest()
+        - close()
+
+    """
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.block_bytes = hasher.block_size // 8
+        self.zero_block = bytes(self.block_bytes)
+        self.zero_schedule = tuple(schedules.zero_schedule(hasher.__schedule__, self.block_bytes))
+        self.H = list(hasher.H0)
+
+        # The bytes of the last incomplete block, and the length of the message
+        self.pending = b''
+        self.length = 0
+
+        # The number of blocks compressed with the cached schedule of a block of zeros
+        self.zero_blocks = 0
+        return
+
+
+    def update(self, data):
+        """
+        Appends data to the message and compresses every block that is complete
+        """
+        self.length += len(data)
+        if self.pending:
+            data = self.pending + data
+
+        hasher = self.hasher
+        block_bytes = self.block_bytes
+        zero_block = self.zero_block
+        zero_schedule = self.zero_schedule
+        H = self.H
+
+        aligned = len(data) - len(data) % block_bytes
+        for i in range(0, aligned, block_bytes):
+            block = data[i : i + block_bytes]
+            if block == zero_block:
+                W = list(zero_schedule)
+                self.zero_blocks += 1
+            else:
+                W = hasher.__schedule__(block)
+            H = hasher.__compress__(H, W)
+
+        self.H = H
+        self.pending = data[aligned:]
+        return
+
+
+    def update_zeros(self, count):
+        """
+        Appends count zero bytes to the message without creating them
+        """
+        block_bytes = self.block_bytes
+
+        # Complete the pending block first, so that the zeros start on a block boundary
+        if self.pending:
+            fill = min(count, block_bytes - len(self.pending))
+            self.update(bytes(fill))
+            count -= fill
+
+        compress = self.hasher.__compress__
+        zero_schedule = self.zero_schedule
+        H = self.H
+        for _ in range(count // block_bytes):
+            H = compress(H, list(zero_schedule))
+        self.zero_blocks += count // block_bytes
+        self.H = H
+
+        self.length += count - count % block_bytes
+        self.update(bytes(count % block_bytes))
+        return
+
+
+    def digest(self):
+        """
+        Pads the message and returns its hexadecimal hash value. More data may
+        still be passed to update() afterwards.
+        """
+        hasher = self.hasher
+        H = self.H
+        for W in hasher.__final_schedules__(self.pending, self.length):
+            H = hasher.__compress__(H, W)
+        return hasher.__output__(H)
+
+
+    def close(self):
+        """
+        Does nothing: the stream holds no resources
+        """
+        return
+
+
+
+def regions(f):
+    """
+    Yields the regions of an open file as (offset, length, hole) tuples, in
+    order. The holes of a sparse file are found with SEEK_DATA and SEEK_HOLE
+    where they are supported. Otherwise, the whole file is a single region
+    of data. Only regular files have a known size, so the file must be one.
+    """
+    st = os.fstat(f.fileno())
+    if not stat.S_ISREG(st.st_mode):
+        raise ValueError("Only the regions of a regular file can be found, not those of %s"%(f.name))
+
+    size = st.st_size
+    if not hasattr(os, 'SEEK_DATA'):
+        if size > 0:
+            yield (0, size, False)
+        return
+
+    offset = 0
+    while offset < size:
+        try:
+            data = os.lseek(f.fileno(), offset, os.SEEK_DATA)
+        except OSError as error:
+            # ENXIO means that there is no data after offset. Any other error
+            # means that the file system cannot find holes, so the rest is read
+            if error.errno == errno.ENXIO:
+                yield (offset, size - offset, True)
+            else:
+                yield (offset, size - offset, False)
+            return
+
+        if data > offset:
+            yield (offset, data - offset, True)
+        hole = min(os.lseek(f.fileno(), data, os.SEEK_HOLE), size)
+        yield (data, hole - data, False)
+        offset = hole
+    return
+
+
+def _uses_kernel(hasher):
+    """
+    Returns whether the hasher's data is passed to the kernel
+    """
+    backend = backends.requested(hasher)
+    return backend is not None and backend.name == 'kernel'
+
+
+def open_stream(hasher):
+    """
+    Returns a stream computing the hash value of a message passed in pieces
+    with the engine requested for the hasher, or a Stream when no engine is
+    requested, or when the requested one cannot hash a message in pieces
+    """
+    backend = backends.requested(hasher)
+    stream = backend.stream(hasher) if backend is not None else None
+    return stream if stream is not None else Stream(hasher)
+
+
+def hash_file(path, hashers, chunk_size=CHUNK_SIZE, prefix=b''):
+    """
+    Computes the hash value of the contents of a file with each of the hashers,
+    reading the file only once and skipping its holes. Returns the hexadecimal
+    hash values as a list, in the same order as the hashers. If prefix is given,
+    the message hashed is prefix followed by the contents of the file.
+
+    The file is passed to the kernel for each of the hashers that ask for the
+    'kernel' engine, and is only read for the other ones, which hash it with
+    the streams of the engines they ask for.
+    """
+    hash_values = [None] * len(hashers)
+    for i, hasher in enumerate(hashers):
+        if _uses_kernel(hasher):
+            hash_values[i] = kernel.digest_file(hasher, path, prefix)
+            if hasher.trace is not None:
+                hasher.trace.output(hasher.name, hash_values[i])
+
+    indices = [i for i, hash_value in enumerate(hash_values) if hash_value is None]
+    if indices:
+        for i, hash_value in zip(indices, _hash_file(path, [hashers[i] for i in indices], chunk_size, prefix)):
+            hash_values[i] = hash_value
+    return hash_values
+
+
+def _hash_file(path, hashers, chunk_size, prefix):
+    """
+    Computes the hash value of prefix and the contents of a file with
+    each of the hashers, with the streams of their engines
+    """
+    streams = [open_stream(hasher) for hasher in hashers]
+    try:
+        for stream in streams:
+            stream.update(prefix)
+        read_file(path, streams, chunk_size)
+        return [stream.digest() for stream in streams]
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def read_file(path, streams, chunk_size=CHUNK_SIZE):
+    """
+    Passes the contents of a file to each of the streams, or any objects with
+    the same update() and update_zeros() functions, reading the file only once.
+    Its holes are passed to update_zeros() without being read. Files that are
+    not regular files, such as pipes, are read until they end.
+    """
+    with open(path, 'rb', buffering=0) as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            read_stream(f, streams, chunk_size)
+            return
+
+        for offset, length, hole in regions(f):
+            if hole:
+                for stream in streams:
+                    stream.update_zeros(length)
+                continue
+
+            f.seek(offset)
+            while length > 0:
+                chunk = f.read(min(chunk_size, length))
+                if len(chunk) == 0:
+                    break
+                length -= len(chunk)
+                for stream in streams:
+                    stream.update(chunk)
+    return
+
+
+def read_stream(f, streams, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Passes everything read from an open binary file to each of the streams,
+    one chunk at a time, and returns the number of bytes read. If progress is
+    given, it is called with the total number of bytes read so far after each
+    chunk.
+    """
+    total = 0
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        for stream in streams:
+            stream.update(chunk)
+        if progress is not None:
+            progress(total)
+    return total
+
+
+def hash_stream(f, hashers, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Computes the hash value of everything read from an open binary file, such
+    as a pipe, with each of the hashers, holding at most one chunk at a time.
+    Returns the hexadecimal hash values as a list, in the same order as the
+    hashers. If progress is given, it is called with the total number of bytes
+    read so far after each chunk.
+    """
+    streams = [open_stream(hasher) for hasher in hashers]
+    try:
+        read_stream(f, streams, chunk_size, progress)
+        return [stream.digest() for stream in streams]
+    finally:
+        for stream in streams:
+            stream.close()
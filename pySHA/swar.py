@@ -0,0 +1,187 @@
+import struct
+from . import sha1
+from . import sha256
+
+# SWAR ("SIMD within a register") batch engine. Python integers have arbitrary
+# precision, so the words of k different messages can be packed into a single
+# integer, each in its own 64-bit lane:
+#
+#   packed = word_0 | word_1 << 64 | word_2 << 128 | ... | word_k-1 << 64 (k - 1)
+#
+# Every 32-bit word sits in the low half of its lane, and the high half is a guard
+# area. A single Python operation on the packed integers then computes the same
+# operation on all k words at once:
+#
+#   - AND, OR and XOR work bit by bit, so they never mix lanes.
+#   - Additions carry out of the 32-bit word into the guard area, which can hold
+#     the carries of more than 2^31 additions before reaching the next lane.
+#   - Shifting a word left by at most 32 bits keeps it within its lane, and
+#     shifting right by at most 32 bits only moves the low bits of the next lane
+#     into the guard area of this one.
+#
+# Clearing every guard area with a mask of 0xffffffff repeated in each lane thus
+# gives the same result as masking each word on its own to 32 bits. The rounds
+# below mask the words at the same points as __compress__, and also before any
+# value with bits shifted into the guard area is added to another value, since
+# the carries would otherwise spill into the next lane.
+#
+# All the messages packed together must have the same number of blocks. The
+# messages in a batch are grouped by their number of blocks, and each group is
+# hashed k messages at a time.
+
+LANE_BITS = 64
+
+# The packed mask, constants and seed values, by algorithm class and number of
+# lanes, as returned by constants()
+_REPEAT_CACHE = {}
+
+
+def repeat(k):
+    """
+    Returns the integer with a 1 at the bottom of each of k lanes. Multiplying a
+    32-bit word by it copies the word into every lane.
+    """
+    return int.from_bytes(b'\x01\x00\x00\x00\x00\x00\x00\x00' * k, 'little')
+
+
+def constants(hasher_class, k):
+    """
+    Returns the mask of 32 bits, the round constants K and the seed values H0 of
+    the algorithm, copied into every one of k lanes, as a (M, K, H0) tuple. They
+    are only packed the first time they are needed for each number of lanes.
+    """
+    packed = _REPEAT_CACHE.get((hasher_class, k))
+    if packed is None:
+        ones = repeat(k)
+        packed = (0xffffffff * ones, [item * ones for item in hasher_class.K], [word * ones for word in hasher_class.H0])
+        _REPEAT_CACHE[(hasher_class, k)] = packed
+    return packed
+
+
+def pack(words):
+    """
+    Packs one 32-bit word per lane into a single integer
+    """
+    return int.from_bytes(struct.pack('<%dQ' % (len(words)), *words), 'little')
+
+
+def unpack(packed, k):
+    """
+    Returns the 32-bit words held in the k lanes of a packed integer
+    """
+    return struct.unpack('<%dQ' % (k), packed.to_bytes(8 * k, 'little'))
+
+
+def compress_sha256(H, W, M, K):
+    """
+    Runs the 64 SHA-256 rounds on several messages at once. H holds the 8
+    packed state variables and W the 16 packed words of one block of each
+    message. M and K are the packed mask and round constants from constants().
+    Returns the new packed state variables.
+    """
+    W = list(W)
+    for j in range(16, 64):
+        x = W[j-15]
+        y = W[j-2]
+        s0 = ((x >> 7 | x << 25) ^ (x >> 18 | x << 14) ^ (x >> 3)) & M
+        s1 = ((y >> 17 | y << 15) ^ (y >> 19 | y << 13) ^ (y >> 10)) & M
+        W.append((s1 + W[j-7] + s0 + W[j-16]) & M)
+
+    a, b, c, d, e, f, g, h = H
+    for t in range(64):
+        T1 = h + (((e >> 6 | e << 26) ^ (e >> 11 | e << 21) ^ (e >> 25 | e << 7)) & M) + (g ^ (e & (f ^ g))) + K[t] + W[t]
+        T2 = (((a >> 2 | a << 30) ^ (a >> 13 | a << 19) ^ (a >> 22 | a << 10)) & M) + ((a & b) | (c & (a | b)))
+        h = g
+        g = f
+        f = e
+        e = (d + T1) & M
+        d = c
+        c = b
+        b = a
+        a = (T1 + T2) & M
+
+    return [(H[0] + a) & M, (H[1] + b) & M, (H[2] + c) & M, (H[3] + d) & M,
+            (H[4] + e) & M, (H[5] + f) & M, (H[6] + g) & M, (H[7] + h) & M]
+
+
+def compress_sha1(H, W, M, K):
+    """
+    Runs the 80 SHA-1 rounds on several messages at once. H holds the 5
+    packed state variables and W the 16 packed words of one block of each
+    message. M and K are the packed mask and round constants from constants().
+    Returns the new packed state variables.
+    """
+    W = list(W)
+    for j in range(16, 80):
+        x = W[j-3] ^ W[j-8] ^ W[j-14] ^ W[j-16]
+        W.append((x << 1 | x >> 31) & M)
+
+    a, b, c, d, e = H
+    for t in range(80):
+        if t < 20:
+            f = d ^ (b & (c ^ d))
+        elif t < 40 or t >= 60:
+            f = b ^ c ^ d
+        else:
+            f = (b & c) | (d & (b | c))
+        T = (((a << 5 | a >> 27) & M) + f + e + K[t] + W[t]) & M
+        a, b, c, d, e = T, a, (b << 30 | b >> 2) & M, c, d
+
+    return [(H[0] + a) & M, (H[1] + b) & M, (H[2] + c) & M, (H[3] + d) & M, (H[4] + e) & M]
+
+
+def hash_batch(messages, hasher_class, compress, lanes):
+    """
+    Hashes every message with the given compression function, lanes messages
+    at a time, and returns the raw state variables of each message as a list
+    of tuples, in the same order as the messages
+    """
+    if lanes < 1:
+        raise ValueError("Invalid number of lanes %s. At least one lane is required"%(lanes))
+
+    padder = hasher_class(verbose=0)
+    padded = [padder.__pad__(message) for message in messages]
+
+    # Group the messages by their number of blocks, keeping their positions
+    groups = {}
+    for index, message in enumerate(padded):
+        groups.setdefault(len(message), []).append(index)
+
+    states = [None] * len(messages)
+    for length, indices in groups.items():
+        for start in range(0, len(indices), lanes):
+            chunk = indices[start : start + lanes]
+            k = len(chunk)
+            M, K, H = constants(hasher_class, k)
+
+            for offset in range(0, length, 64):
+                # The i-th packed word of the block holds the i-th word of
+                # the block of every message in its own lane
+                words = [struct.unpack('>16I', padded[index][offset : offset + 64]) for index in chunk]
+                W = [pack(column) for column in zip(*words)]
+                H = compress(H, W, M, K)
+
+            for lane, values in enumerate(zip(*[unpack(word, k) for word in H])):
+                states[chunk[lane]] = values
+
+    return states
+
+
+def sha256_batch(messages, lanes=16):
+    """
+    Computes the SHA-256 hash of every message, hashing lanes messages with
+    each packed computation. Returns the hexadecimal hash values as a list, in
+    the same order as the messages.
+    """
+    states = hash_batch(messages, sha256.SHA256, compress_sha256, lanes)
+    return [struct.pack('>8I', *H).hex() for H in states]
+
+
+def sha1_batch(messages, lanes=16):
+    """
+    Computes the SHA-1 hash of every message, hashing lanes messages with
+    each packed computation. Returns the hexadecimal hash values as a list, in
+    the same order as the messages.
+    """
+    states = hash_batch(messages, sha1.SHA1, compress_sha1, lanes)
+    return [struct.pack('>5I', *H).hex() for H in states]
@@ -0,0 +1,129 @@
+import struct
+from . import sha224
+from . import sha256
+
+
+# The functions Σ0, Σ1, σ0 and σ1 of the 32-bit SHA-2 algorithms are linear over
+# GF(2): each output bit is the XOR of some of the input bits. A word x is the XOR
+# of its four bytes, each shifted to its place, so the function of x is the XOR
+# of the function applied to each shifted byte on its own:
+#
+#   f(x) = f(x & 0xff) ^ f(x & 0xff00) ^ f(x & 0xff0000) ^ f(x & 0xff000000)
+#
+# Each of the four terms only depends on the value of a single byte, so it can be
+# looked up in a table of 256 entries, built once when this module is imported.
+
+def rot_right(x, n):
+    return ((x >> n) | (x << (32 - n))) & 0xffffffff
+
+def Sigma0(x):
+    return rot_right(x, 2) ^ rot_right(x, 13) ^ rot_right(x, 22)
+
+def Sigma1(x):
+    return rot_right(x, 6) ^ rot_right(x, 11) ^ rot_right(x, 25)
+
+def sigma0(x):
+    return rot_right(x, 7) ^ rot_right(x, 18) ^ (x >> 3)
+
+def sigma1(x):
+    return rot_right(x, 17) ^ rot_right(x, 19) ^ (x >> 10)
+
+
+def build_tables(function):
+    """
+    Returns the four 256-entry tables for a linear function of a 32-bit
+    word. The k-th table holds the function of each value of the k-th
+    byte of the word, counting from the least significant byte.
+    """
+    return tuple(tuple(function(value << (8 * k)) for value in range(256)) for k in range(4))
+
+
+SIGMA0 = build_tables(Sigma0)
+SIGMA1 = build_tables(Sigma1)
+SMALL_SIGMA0 = build_tables(sigma0)
+SMALL_SIGMA1 = build_tables(sigma1)
+
+
+class SHA256_Tables(sha256.SHA256):
+    """
+    Implements the SHA-256 Algorithm with table lookups in place of the
+    rotations in Σ0, Σ1, σ0 and σ1. Computes the same hash values as SHA256,
+    and is provided as an alternative engine to compare the two approaches.
+    """
+    __slots__ = ()
+
+
+    def __schedule__(self, block):
+        """
+        Prepares the message schedule W for a single 512-bit block,
+        computing σ0 and σ1 from the byte tables
+        """
+        s00, s01, s02, s03 = SMALL_SIGMA0
+        s10, s11, s12, s13 = SMALL_SIGMA1
+        W = list(struct.unpack('>16I', block))
+        for j in range(16, 64):
+            x = W[j-15]
+            y = W[j-2]
+            s0 = s00[x & 0xff] ^ s01[(x >> 8) & 0xff] ^ s02[(x >> 16) & 0xff] ^ s03[x >> 24]
+            s1 = s10[y & 0xff] ^ s11[(y >> 8) & 0xff] ^ s12[(y >> 16) & 0xff] ^ s13[y >> 24]
+            W.append((s1 + W[j-7] + s0 + W[j-16]) & 0xffffffff)
+        return W
+
+
+    def __compress__(self, H, W):
+        """
+        Runs the 64 rounds over the message schedule W of a single block,
+        computing Σ0 and Σ1 from the byte tables
+        """
+        mask = 0xffffffff
+        K = self.K
+        S00, S01, S02, S03 = SIGMA0
+        S10, S11, S12, S13 = SIGMA1
+        a, b, c, d, e, f, g, h = H
+
+        for t in range(64):
+            T1 = h + (S10[e & 0xff] ^ S11[(e >> 8) & 0xff] ^ S12[(e >> 16) & 0xff] ^ S13[e >> 24]) \
+                + (g ^ (e & (f ^ g))) + K[t] + W[t]
+            T2 = (S00[a & 0xff] ^ S01[(a >> 8) & 0xff] ^ S02[(a >> 16) & 0xff] ^ S03[a >> 24]) \
+                + ((a & b) | (c & (a | b)))
+            h = g
+            g = f
+            f = e
+            e = (d + T1) & mask
+            d = c
+            c = b
+            b = a
+            a = (T1 + T2) & mask
+
+        return [(H[0] + a) & mask, (H[1] + b) & mask, (H[2] + c) & mask, (H[3] + d) & mask,
+                (H[4] + e) & mask, (H[5] + f) & mask, (H[6] + g) & mask, (H[7] + h) & mask]
+
+
+    # The step by step computation displayed from verbosity 3 up
+    # uses the same tables
+    def __Sigma0__(self, x):
+        return SIGMA0[0][x & 0xff] ^ SIGMA0[1][(x >> 8) & 0xff] ^ SIGMA0[2][(x >> 16) & 0xff] ^ SIGMA0[3][x >> 24]
+
+    def __Sigma1__(self, x):
+        return SIGMA1[0][x & 0xff] ^ SIGMA1[1][(x >> 8) & 0xff] ^ SIGMA1[2][(x >> 16) & 0xff] ^ SIGMA1[3][x >> 24]
+
+    def __sigma0__(self, x):
+        return SMALL_SIGMA0[0][x & 0xff] ^ SMALL_SIGMA0[1][(x >> 8) & 0xff] ^ SMALL_SIGMA0[2][(x >> 16) & 0xff] ^ SMALL_SIGMA0[3][x >> 24]
+
+    def __sigma1__(self, x):
+        return SMALL_SIGMA1[0][x & 0xff] ^ SMALL_SIGMA1[1][(x >> 8) & 0xff] ^ SMALL_SIGMA1[2][(x >> 16) & 0xff] ^ SMALL_SIGMA1[3][x >> 24]
+
+
+class SHA224_Tables(sha224.SHA224):
+    """
+    Implements the SHA-224 Algorithm with the same table lookups as
+    SHA256_Tables
+    """
+    __slots__ = ()
+
+    __schedule__ = SHA256_Tables.__schedule__
+    __compress__ = SHA256_Tables.__compress__
+    __Sigma0__ = SHA256_Tables.__Sigma0__
+    __Sigma1__ = SHA256_Tables.__Sigma1__
+    __sigma0__ = SHA256_Tables.__sigma0__
+    __sigma1__ = SHA256_Tables.__sigma1__
@@ -0,0 +1,271 @@
+import gzip
+import json
+import sys
+
+
+class TraceSink:
+    """
+    Receives the steps of a hash computation as they happen. A hasher
+    given a trace sink calls the methods below with the raw integer values
+    of each step, and it is up to the sink to format, store or ignore them.
+    The base class ignores every step, so a sink only needs to implement
+    the methods it is interested in.
+
+    The level of the sink decides how much detail the hasher passes on,
+    with the same meaning as the verbosity of the hashers:
+
+        - 1: output()
+        - 2: preprocess(), begin() and state() for each block
+        - 3: block(), schedule() and working() for each block
+        - 4 and 5: round() for every round of every block
+
+    Events:
+        - begin(algorithm, word_size)
+        - preprocess(algorithm, message_bits, num_zeros, padded_bits, block_size, nblocks)
+        - state(algorithm, block, H)
+        - block(algorithm, block)
+        - schedule(algorithm, block, j, word)
+        - working(algorithm, block, variables)
+        - round(algorithm, block, t, T1, T2, variables)
+        - output(algorithm, hash_value)
+
+    """
+
+    def __init__(self, level=5):
+        self.level = level
+        return
+
+    def begin(self, algorithm, word_size):
+        pass
+
+    def preprocess(self, algorithm, message_bits, num_zeros, padded_bits, block_size, nblocks):
+        pass
+
+    def state(self, algorithm, block, H):
+        pass
+
+    def block(self, algorithm, block):
+        pass
+
+    def schedule(self, algorithm, block, j, word):
+        pass
+
+    def working(self, algorithm, block, variables):
+        pass
+
+    def round(self, algorithm, block, t, T1, T2, variables):
+        pass
+
+    def output(self, algorithm, hash_value):
+        pass
+
+
+class PrintSink(TraceSink):
+    """
+    Prints the steps of the computation to the terminal, or to file if
+    it is given. This is what the hashers use for their verbosity levels.
+    """
+
+    def __init__(self, level, file=None):
+        self.level = level
+        self.file = file
+        self.word_bytes = {}
+        return
+
+    def __print__(self, line):
+        print(line, file=self.file if self.file is not None else sys.stdout)
+
+    def __word__(self, algorithm, word):
+        return '0x' + word.to_bytes(self.word_bytes.get(algorithm, 4), 'big').hex()
+
+    def begin(self, algorithm, word_size):
+        self.word_bytes[algorithm] = word_size // 8
+
+    def preprocess(self, algorithm, message_bits, num_zeros, padded_bits, block_size, nblocks):
+        if (self.level > 1):
+            self.__print__('[%s] Beginning Preprocessing'%(algorithm))
+            self.__print__('[%s]    Message Length: %d bits'%(algorithm, message_bits))
+            self.__print__("[%s]    Adding a single '1' bit"%(algorithm))
+            self.__print__('[%s]    Padding %d Zeros'%(algorithm, num_zeros))
+            self.__print__('[%s]    New Input Length: %d bits'%(algorithm, padded_bits))
+            self.__print__('[%s]    Number of %d-bit Blocks: %d'%(algorithm, block_size, nblocks))
+            self.__print__('[%s] Preprocessing Complete'%(algorithm))
+
+    def state(self, algorithm, block, H):
+        if (self.level > 1):
+            if block == 0:
+                self.__print__('[%s] Initializing State Variables H0-H%d'%(algorithm, len(H) - 1))
+            self.__print__('[%s]    H[%2d] = %s'%(algorithm, block, ' '.join('%10s'%(self.__word__(algorithm, word)) for word in H)))
+
+    def block(self, algorithm, block):
+        if (self.level > 2):
+            self.__print__('[%s] Iterating through Block %d'%(algorithm, block))
+        if (self.level > 3):
+            self.__print__('[%s]    Preparing Message Schedule'%(algorithm))
+
+    def schedule(self, algorithm, block, j, word):
+        if (self.level > 2):
+            line = '[%s]        W[%2d]=%10s'%(algorithm, j, self.__word__(algorithm, word))
+            if j >= 16 and algorithm == 'SHA-1':
+                line += '       ' + ' ' * 24 + '<- Rot_Left(W[%2d] xor W[%2d] xor W[%2d] xor W[%2d], 1)'%(j-3, j-8, j-14, j-16)
+            elif j >= 16:
+                line += '       ' + ' ' * 24 + '<- σ0(W[%2d]) + σ1(W[%2d]) + W[%2d] + W[%2d]'%(j-15, j-2, j-7, j-16)
+            self.__print__(line)
+
+    def working(self, algorithm, block, variables):
+        if (self.level > 2):
+            self.__print__('[%s]    Finished Preparing Message Schedule'%(algorithm))
+            self.__print__('[%s]    Initializing Local Working Variables'%(algorithm))
+        if (self.level > 3):
+            self.__print_variables__(algorithm, variables)
+
+    def round(self, algorithm, block, t, T1, T2, variables):
+        if (self.level > 4):
+            if T2 is None:
+                # SHA-1 computes a single temporary word T in each round
+                self.__print__('[%s]            T = %10s  <-  f_%2d(b, c, d) + e + K[%2d] + W[%2d]'%(algorithm, self.__word__(algorithm, T1), t, t, t))
+                formulas = [('e', 'd'), ('d', 'c'), ('c', 'Rot_Left(b, 30)'), ('b', 'a'), ('a', 'T')]
+            else:
+                self.__print__('[%s]            T1 = %10s  <-  Σ1(e) + Ch(e,f,g) + K[%2d] + W[%2d]'%(algorithm, self.__word__(algorithm, T1), t, t))
+                self.__print__('[%s]            T2 = %10s  <-  Σ0(a) + Maj(a,b,c)'%(algorithm, self.__word__(algorithm, T2)))
+                formulas = [('h', 'g'), ('g', 'f'), ('f', 'e'), ('e', 'd + T1'), ('d', 'c'), ('c', 'b'), ('b', 'a'), ('a', 'T1 + T2')]
+
+            names = 'abcdefgh'
+            for name, formula in formulas:
+                word = variables[names.index(name)]
+                self.__print__('[%s]            %s  = %10s  <-  %s'%(algorithm, name, self.__word__(algorithm, word), formula))
+
+        if (self.level > 3):
+            self.__print_variables__(algorithm, variables)
+
+    def output(self, algorithm, hash_value):
+        if (self.level > 0):
+            if algorithm == 'SHA-1':
+                self.__print__('[%s] Output Hash: %40s'%(algorithm, hash_value))
+            else:
+                self.__print__('[%s] Output Hash: %64s'%(algorithm, hash_value))
+
+    def __print_variables__(self, algorithm, variables):
+        self.__print__('[%s]        %s'%(algorithm, ' '.join(
+            '%s=%10s'%(name, self.__word__(algorithm, word)) for name, word in zip('abcdefgh', variables))))
+
+
+class TraceWriter(TraceSink):
+    """
+    Stores the steps of the computation in a file, one JSON list per line,
+    so that they can be displayed later with render(). Nothing is formatted
+    while hashing: each step is stored as the name of the event followed
+    by its raw values, and the lines are written out in batches. The file
+    is compressed with gzip if its name ends with '.gz'.
+
+    Public Member Functions:
+        - flush()
+        - close()
+
+    """
+
+    def __init__(self, path, level=5, buffer_size=4096):
+        self.level = level
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+        if path.endswith('.gz'):
+            self.file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        return
+
+    def __record__(self, *event):
+        self.buffer.append(json.dumps(event, separators=(',', ':')))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def begin(self, algorithm, word_size):
+        self.__record__('begin', algorithm, word_size)
+
+    def preprocess(self, algorithm, message_bits, num_zeros, padded_bits, block_size, nblocks):
+        self.__record__('preprocess', algorithm, message_bits, num_zeros, padded_bits, block_size, nblocks)
+
+    def state(self, algorithm, block, H):
+        self.__record__('state', algorithm, block, list(H))
+
+    def block(self, algorithm, block):
+        self.__record__('block', algorithm, block)
+
+    def schedule(self, algorithm, block, j, word):
+        self.__record__('schedule', algorithm, block, j, word)
+
+    def working(self, algorithm, block, variables):
+        self.__record__('working', algorithm, block, list(variables))
+
+    def round(self, algorithm, block, t, T1, T2, variables):
+        self.__record__('round', algorithm, block, t, T1, T2, list(variables))
+
+    def output(self, algorithm, hash_value):
+        self.__record__('output', algorithm, hash_value)
+
+    def flush(self):
+        """
+        Writes out the steps stored in the buffer
+        """
+        if self.buffer:
+            self.file.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+        return
+
+    def close(self):
+        """
+        Writes out the remaining steps and closes the file
+        """
+        self.flush()
+        self.file.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def read(path):
+    """
+    Yields the events stored in a file written by a TraceWriter, each
+    as a list of the event name followed by its values
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def replay(path, sink):
+    """
+    Passes every event stored in a file written by a TraceWriter
+    on to another trace sink
+    """
+    for event in read(path):
+        getattr(sink, event[0])(*event[1:])
+    return
+
+
+def render(path, level=5, file=None):
+    """
+    Displays the steps stored in a file written by a TraceWriter in the
+    same way as a hasher would at the given verbosity level
+    """
+    replay(path, PrintSink(level, file))
+    return
+
+
+def default_sink(verbose):
+    """
+    Returns the trace sink used by a hasher created with the given
+    verbosity and no trace sink: nothing at verbosity 0, and otherwise
+    a PrintSink at that level.
+    """
+    if verbose > 0:
+        return PrintSink(verbose)
+    return None
+
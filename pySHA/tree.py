@@ -0,0 +1,325 @@
+import json
+import multiprocessing
+import os
+import queue
+import stat
+import time
+from . import algorithms
+from . import streaming
+
+# Digest of a whole directory tree, computed bottom-up like a Merkle tree:
+#
+#   - a file is hashed by its contents, and a symbolic link by its target. Other
+#     special files, such as pipes and devices, have no contents and are hashed
+#     as empty files.
+#   - a directory is hashed by the list of its entries, sorted by name. Each
+#     entry is written as its mode in octal, a space, its name, a zero byte and
+#     the raw digest of the entry:
+#
+#         b'100644 README.md\x00' + digest
+#
+# The mode holds the type of the entry and its permission bits, so renaming a
+# file, changing its permissions or changing its contents all change the digest
+# of every directory above it. Names are compared as the bytes stored by the file
+# system, so the order does not depend on the locale.
+#
+# Each node of the resulting tree keeps its digest and its children, so two trees
+# are compared by their root digests, and only the directories whose digests
+# differ are visited to find the entries that changed.
+#
+# With workers, each file is handed to a pool of worker processes as soon as the
+# walk reaches it, so the files are hashed while the directories are scanned, and
+# each directory is hashed as soon as the last of its entries is done. With a cache,
+# files whose size, modification time and mode have not changed since they were
+# last hashed are not read again. The cache is a dictionary whose keys are the
+# algorithm and the absolute path of each file, such as 'sha256:/data/a.txt',
+# and whose values are the size, modification time, mode and digest of the file.
+
+# Files modified less than this many nanoseconds before the walk started are not
+# cached: they may still be changing within the resolution of their modification
+# time, which would leave a stale digest in the cache with the same metadata
+RACY_WINDOW = 2 * 10**9
+
+# The largest number of files handed to the workers and not hashed yet. The walk
+# waits for the workers beyond it, so the files of a huge tree are not all queued
+MAX_PENDING = 4096
+
+
+class Node:
+    """
+    An entry of a directory tree: its name, its mode, its raw digest and, for
+    a directory, its entries by name. The digest of a directory is None until
+    all of its entries have been hashed.
+    """
+    __slots__ = ('name', 'mode', 'digest', 'children', 'parent', 'pending')
+
+    def __init__(self, name, mode, parent=None):
+        self.name = name
+        self.mode = mode
+        self.digest = None
+        self.children = {} if stat.S_ISDIR(mode) else None
+        self.parent = parent
+
+        # The number of entries of a directory that are not hashed yet
+        self.pending = 0
+        return
+
+
+    def entry(self):
+        """
+        Returns the bytes that stand for this entry in its parent directory
+        """
+        return b'%o %s\x00'%(self.mode, os.fsencode(self.name)) + self.digest
+
+
+    def hexdigest(self):
+        """
+        Returns the digest of the entry as a hexadecimal string
+        """
+        return self.digest.hex()
+
+
+    def walk(self, path=''):
+        """
+        Yields the path and node of every entry below this one, this one
+        included, parents first and in the order of the names
+        """
+        yield path, self
+        if self.children is not None:
+            for name in sorted(self.children, key=os.fsencode):
+                yield from self.children[name].walk(os.path.join(path, name))
+        return
+
+
+
+def _mode(st):
+    """
+    Returns the type and permission bits of a file, leaving out any
+    other bits that may differ between file systems
+    """
+    return stat.S_IFMT(st.st_mode) | stat.S_IMODE(st.st_mode)
+
+
+def _hash_file(args):
+    """
+    Returns the raw digest of the contents of a file. Also runs inside the
+    worker processes, in which case the path is passed back with the digest.
+    """
+    path, algorithm = args
+    hasher = algorithms.ALGORITHMS[algorithm][0](verbose=0)
+    return path, bytes.fromhex(streaming.hash_file(path, [hasher])[0])
+
+
+
+class _Walker:
+    """
+    Walks a directory tree and hashes its entries bottom-up
+    """
+
+    def __init__(self, algorithm, pool, cache):
+        self.algorithm = algorithms.Algorithm(algorithm)
+        self.pool = pool
+        self.cache = cache
+        self.start = time.time_ns()
+
+        # The files handed to the workers, by path, with their metadata, and
+        # the results of the workers, put in the queue as they come in
+        self.jobs = {}
+        self.results = queue.SimpleQueue()
+        return
+
+
+    def __done__(self, node):
+        """
+        Records that an entry is hashed, and hashes its directory
+        if it was the last entry left
+        """
+        while node.parent is not None:
+            parent = node.parent
+            parent.pending -= 1
+            if parent.pending > 0:
+                return
+            self.__hash_directory__(parent)
+            node = parent
+        return
+
+
+    def __hash_directory__(self, node):
+        entries = sorted(node.children.values(), key=lambda child: os.fsencode(child.name))
+        node.digest = self.algorithm.hash(b''.join(child.entry() for child in entries))
+        return
+
+
+    def __file__(self, path, node, st):
+        """
+        Hashes a file, or takes its digest from the cache, or hands
+        it to the workers. Returns whether the file is hashed.
+        """
+        key = [st.st_size, st.st_mtime_ns, node.mode]
+        if self.cache is not None:
+            cached = self.cache.get('%s:%s'%(self.algorithm.name, path))
+            if cached is not None and cached[:3] == key:
+                node.digest = bytes.fromhex(cached[3])
+                return True
+
+        if self.pool is not None:
+            self.jobs[path] = (node, key)
+            self.pool.apply_async(_hash_file, ((path, self.algorithm.name),), callback=self.results.put,
+                                  error_callback=self.results.put)
+            self.__collect__(MAX_PENDING)
+            return False
+
+        node.digest = _hash_file((path, self.algorithm.name))[1]
+        self.__store__(path, node, key)
+        return True
+
+
+    def __store__(self, path, node, key):
+        if self.cache is not None and key[1] < self.start - RACY_WINDOW:
+            self.cache['%s:%s'%(self.algorithm.name, path)] = key + [node.digest.hex()]
+        return
+
+
+    def walk(self, path, node):
+        """
+        Adds the entries of the directory at path to node, hashing the ones
+        that can be hashed right away, and hashes the directory itself if
+        none are left
+        """
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+        node.pending = len(entries)
+
+        for entry in entries:
+            st = entry.stat(follow_symlinks=False)
+            child = Node(entry.name, _mode(st), node)
+            node.children[entry.name] = child
+
+            if stat.S_ISDIR(st.st_mode):
+                self.walk(entry.path, child)
+                continue
+
+            if stat.S_ISREG(st.st_mode):
+                if not self.__file__(entry.path, child, st):
+                    continue
+            elif stat.S_ISLNK(st.st_mode):
+                child.digest = self.algorithm.hash(os.fsencode(os.readlink(entry.path)))
+            else:
+                child.digest = self.algorithm.hash(b'')
+            self.__done__(child)
+
+        if not entries:
+            self.__hash_directory__(node)
+            self.__done__(node)
+        return
+
+
+    def __collect__(self, limit):
+        """
+        Takes the digests of the files the workers have finished, and hashes
+        the directories that were waiting for them. Waits for the workers
+        while more than limit files are not hashed yet.
+        """
+        while self.jobs:
+            try:
+                result = self.results.get(block=len(self.jobs) > limit)
+            except queue.Empty:
+                return
+            if isinstance(result, BaseException):
+                raise result
+
+            path, digest = result
+            node, key = self.jobs.pop(path)
+            node.digest = digest
+            self.__store__(path, node, key)
+            self.__done__(node)
+        return
+
+
+    def finish(self):
+        """
+        Waits for the files still being hashed by the workers, and hashes
+        the directories waiting for them
+        """
+        self.__collect__(0)
+        return
+
+
+
+def digest(path, algorithm='sha256', workers=None, cache=None):
+    """
+    Computes the digest of the directory tree at path with the given algorithm,
+    one of the names of algorithms.ALGORITHMS, and returns its root Node. The
+    digest of the whole tree is root.digest, or root.hexdigest().
+
+    If workers is set, the files are hashed by that many worker processes. If
+    cache is a dictionary, such as one returned by load_cache(), it is used to
+    skip the files that have not changed since they were cached, and it is
+    updated with the digests of the files hashed.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise ValueError("%s is not a directory"%(path))
+
+    pool = multiprocessing.Pool(workers) if workers else None
+    try:
+        walker = _Walker(algorithm, pool, cache)
+        root = Node('', _mode(st))
+        walker.walk(path, root)
+        walker.finish()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return root
+
+
+def diff(old, new, path=''):
+    """
+    Yields the differences between two trees returned by digest(), as
+    (change, path) tuples where change is 'added', 'removed' or 'modified'.
+    Only the directories whose digests differ are visited.
+    """
+    if old.digest == new.digest and old.mode == new.mode:
+        return
+
+    # The entry itself changed: it is a file, its type changed, or it is a
+    # directory with the same entries and other permissions
+    if old.children is None or new.children is None or old.digest == new.digest:
+        yield ('modified', path)
+        return
+
+    for name in sorted(set(old.children) | set(new.children), key=os.fsencode):
+        child = os.path.join(path, name)
+        if name not in new.children:
+            yield ('removed', child)
+        elif name not in old.children:
+            yield ('added', child)
+        else:
+            yield from diff(old.children[name], new.children[name], child)
+    return
+
+
+def load_cache(path):
+    """
+    Returns the cache of file digests stored at path, or an
+    empty cache if there is no such file
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_cache(cache, path):
+    """
+    Stores the cache of file digests at path. The cache is written to a
+    temporary file first, so a reader never sees a partial cache.
+    """
+    temporary = '%s.%d.tmp'%(path, os.getpid())
+    with open(temporary, 'w') as f:
+        json.dump(cache, f)
+    os.replace(temporary, path)
+    return
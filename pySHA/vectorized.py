@@ -0,0 +1,134 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Batch engine built on NumPy, which is optional. The messages of a batch are
+# hashed together: every variable of the algorithm, such as a state variable or
+# a word of the message schedule, is an array holding its value for each message,
+# and each NumPy operation computes one step of the algorithm for all of them.
+#
+# NumPy's uint32 and uint64 arrays wrap around on overflow, so additions are
+# already taken modulo 2^32 or 2^64, and the bits shifted out of a word are
+# dropped. Rotations are written as two shifts, as in the __schedule__ and
+# __compress__ functions of the pure Python classes, without any mask.
+#
+# The blocks of a message are compressed one after the other, so the messages
+# of a batch are grouped by their number of blocks, and each group is hashed on
+# its own. A single message gains nothing from this engine.
+
+
+def _compress_sha1(H, W, K):
+    """
+    Runs the 80 SHA-1 rounds. H holds the 5 state variables and W the 16 words
+    of one block, each as an array with one value per message. Returns the new
+    state variables.
+    """
+    W = list(W)
+    for j in range(16, 80):
+        x = W[j-3] ^ W[j-8] ^ W[j-14] ^ W[j-16]
+        W.append((x << 1) | (x >> 31))
+
+    a, b, c, d, e = H
+    for t in range(80):
+        if t < 20:
+            f = d ^ (b & (c ^ d))
+        elif t < 40 or t >= 60:
+            f = b ^ c ^ d
+        else:
+            f = (b & c) | (d & (b | c))
+        T = ((a << 5) | (a >> 27)) + f + e + K[t] + W[t]
+        a, b, c, d, e = T, a, (b << 30) | (b >> 2), c, d
+
+    return [H[0] + a, H[1] + b, H[2] + c, H[3] + d, H[4] + e]
+
+
+def _compress_sha2(H, W, K, rotations, rounds):
+    """
+    Runs the rounds of the SHA-2 algorithms, on 32-bit or 64-bit words. H holds
+    the 8 state variables and W the 16 words of one block, each as an array with
+    one value per message. rotations holds the amounts used by Σ0, Σ1, σ0 and σ1.
+    Returns the new state variables.
+    """
+    w = 8 * W[0].itemsize
+    (A1, A2, A3), (B1, B2, B3), (a1, a2, a3), (b1, b2, b3) = rotations
+
+    W = list(W)
+    for j in range(16, rounds):
+        x = W[j-15]
+        y = W[j-2]
+        s0 = ((x >> a1) | (x << (w - a1))) ^ ((x >> a2) | (x << (w - a2))) ^ (x >> a3)
+        s1 = ((y >> b1) | (y << (w - b1))) ^ ((y >> b2) | (y << (w - b2))) ^ (y >> b3)
+        W.append(s1 + W[j-7] + s0 + W[j-16])
+
+    a, b, c, d, e, f, g, h = H
+    for t in range(rounds):
+        S1 = ((e >> B1) | (e << (w - B1))) ^ ((e >> B2) | (e << (w - B2))) ^ ((e >> B3) | (e << (w - B3)))
+        T1 = h + S1 + (g ^ (e & (f ^ g))) + K[t] + W[t]
+        S0 = ((a >> A1) | (a << (w - A1))) ^ ((a >> A2) | (a << (w - A2))) ^ ((a >> A3) | (a << (w - A3)))
+        T2 = S0 + ((a & b) | (c & (a | b)))
+        h = g
+        g = f
+        f = e
+        e = d + T1
+        d = c
+        c = b
+        b = a
+        a = T1 + T2
+
+    return [H[0] + a, H[1] + b, H[2] + c, H[3] + d, H[4] + e, H[5] + f, H[6] + g, H[7] + h]
+
+
+# The rotation and shift amounts of Σ0, Σ1, σ0 and σ1 for each word size
+SHA256_ROTATIONS = ((2, 13, 22), (6, 11, 25), (7, 18, 3), (17, 19, 10))
+SHA512_ROTATIONS = ((28, 34, 39), (14, 18, 41), (1, 8, 7), (19, 61, 6))
+
+
+def supports(hasher):
+    """
+    Returns whether the engine can hash messages with the hasher's algorithm
+    """
+    return numpy is not None and (hasher.name == 'SHA-1' or hasher.word_size in (32, 64))
+
+
+def hash_batch(messages, hasher):
+    """
+    Hashes every message with the hasher's algorithm and returns the state
+    variables of each message as a list of lists of integers, in the same order
+    as the messages
+    """
+    if numpy is None:
+        raise ImportError("The vectorized engine requires NumPy")
+
+    word_size = hasher.word_size
+    dtype = numpy.dtype('>u4' if word_size == 32 else '>u8')
+    native = numpy.uint32 if word_size == 32 else numpy.uint64
+    block_bytes = hasher.block_size // 8
+    K = [native(item) for item in hasher.K]
+
+    # Group the messages by their number of blocks, keeping their positions
+    groups = {}
+    for index, message in enumerate(messages):
+        groups.setdefault(-(-(len(message) + 1 + block_bytes // 8) // block_bytes), []).append(index)
+
+    states = [None] * len(messages)
+    for blocks, indices in groups.items():
+        # words[i, j] is the j-th word of the padded message i
+        padded = b''.join(hasher.__pad__(messages[index]) for index in indices)
+        words = numpy.frombuffer(padded, dtype=dtype).astype(native).reshape(len(indices), 16 * blocks)
+
+        H = [numpy.full(len(indices), item, dtype=native) for item in hasher.H0]
+        with numpy.errstate(over='ignore'):
+            for block in range(blocks):
+                W = [words[:, 16 * block + j] for j in range(16)]
+                if hasher.name == 'SHA-1':
+                    H = _compress_sha1(H, W, K)
+                elif word_size == 32:
+                    H = _compress_sha2(H, W, K, SHA256_ROTATIONS, 64)
+                else:
+                    H = _compress_sha2(H, W, K, SHA512_ROTATIONS, 80)
+
+        for lane, values in enumerate(numpy.stack(H, axis=1).tolist()):
+            states[indices[lane]] = values
+
+    return states
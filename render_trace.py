@@ -0,0 +1,22 @@
+import argparse
+from pySHA import tracing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Display the steps of a SHA Hash computation stored with sha.py --trace-file.')
+    parser.add_argument('path',
+                        type=str,
+                        help='The trace file. Files ending with .gz are read as gzip')
+    parser.add_argument('--verbosity', '-v',
+                        type=int,
+                        choices=[1,2,3,4,5],
+                        default=5,
+                        help='Displays the steps in the same way as sha.py at this verbosity')
+
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    tracing.render(args.path, args.verbosity)
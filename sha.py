@@ -1,94 +1,332 @@
 import argparse
-from pySHA import SHA1
-from pySHA import SHA224
-from pySHA import SHA256
-from pySHA import SHA384
-from pySHA import SHA512
-from pySHA import SHA512_224
-from pySHA import SHA512_256
+import itertools
+import os
+import sys
+import time
+from pySHA import MultiHasher
+from pySHA import TraceWriter
+from pySHA import hash_iter
+from pySHA import backends
+from pySHA import tree
+from pySHA.algorithms import ALGORITHMS
+from pySHA.algorithms import SWAR_ENGINES
+from pySHA.streaming import hash_file
+from pySHA.streaming import hash_stream
+from pySHA.streaming import read_file
+from pySHA.streaming import read_stream
+
+
+# Maps the values accepted by --algorithm to the names of the algorithms in
+# pySHA.algorithms. The hasher class of each one is ALGORITHMS[name][0], and
+# the name of that class is displayed when more than one algorithm is requested
+NAMES = {
+    '1': 'sha1',
+    '224': 'sha224',
+    '256': 'sha256',
+    '384': 'sha384',
+    '512': 'sha512',
+    '512224': 'sha512_224',
+    '512256': 'sha512_256',
+}
+
+# The number of records read at a time by --lines, and the size of the
+# buffers used to read them and to write their hash values
+LINE_BATCH = 4096
+BUFFER_SIZE = 1 << 20
+
+# The number of seconds between two reports of the reading rate of the standard input
+PROGRESS_INTERVAL = 1.0
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Compute the SHA Hash of an input.')
-    parser.add_argument('--algorithm', '-a', 
-                        type=str, 
-                        choices=['1', '224', '256', '384', '512', '512224', '512256'], 
-                        help='The specific SHA hash function. Supports SHA-1, SHA-224, SHA-256, SHA-384, SHA-512, SHA-512/224, and SHA-512/256', 
+    parser.add_argument('--algorithm', '-a',
+                        type=str,
+                        action='append',
+                        choices=list(NAMES),
+                        help='The specific SHA hash function. Supports SHA-1, SHA-224, SHA-256, SHA-384, SHA-512, SHA-512/224, and SHA-512/256. \
+                            May be given more than once to compute several hashes while reading the input only once',
                         required=True)
-    parser.add_argument('--verbosity', '-v', 
-                        type=int, 
+    parser.add_argument('--verbosity', '-v',
+                        type=int,
                         choices=[0,1,2,3,4,5],
                         default=0)
+    parser.add_argument('--parallel', '-p',
+                        action='store_true',
+                        help='When several algorithms are given, runs each one in its own worker process')
+    parser.add_argument('--trace-file',
+                        type=str,
+                        default=None,
+                        help='Stores the steps of the computation in the given file instead of printing them, \
+                            up to the given verbosity or all of them if it is 0. Use render_trace.py to display them')
+    parser.add_argument('--backend', '-b',
+                        type=str,
+                        choices=list(backends.BACKENDS),
+                        default=None,
+                        help='The engine that computes the hash values. Files and the standard input are hashed in pieces \
+                            by the engines that can stream, and the batch engines are refused for them. With kernel, files \
+                            are passed to the Linux kernel with sendfile() without being read. Falls back to the default \
+                            engine where the requested one is not available or does not support the algorithm')
+    parser.add_argument('--tree-cache',
+                        type=str,
+                        default=None,
+                        help='With --tree-digest, reuses the digests of the files that have not changed since they \
+                            were stored in this file, and stores the new ones')
+    parser.add_argument('--lines',
+                        action='store_true',
+                        help='Hashes every line of the input file, or of the standard input if no file is given, as a separate \
+                            record without its line ending (\\n or \\r\\n), and writes the hash value of each record on its own line')
 
-    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group = parser.add_mutually_exclusive_group()
     input_group.add_argument('--text', '-t',
-                        type=str, 
+                        type=str,
                         default=None,
                         help='Calculates the hash using the provided text at the command line')
     input_group.add_argument('--file', '-f',
                         type=str,
                         default=None,
-                        help='Calculates the hash using the provided input file')
-    input_group.add_argument('--test', 
+                        help='Calculates the hash using the provided input file, or the standard input if it is -. \
+                            The standard input is also read when no input is given')
+    input_group.add_argument('--tree-digest',
+                        type=str,
+                        nargs='+',
+                        metavar='DIR',
+                        default=None,
+                        help='Calculates the digest of a whole directory tree. When a second directory is given, \
+                            also lists the entries that differ between the two trees')
+    input_group.add_argument('--test',
                         action='store_true',
                         help='Calculates the hash using the test message `abc`')
-    
+
     args = parser.parse_args()
+    if (args.lines and (args.text is not None or args.test)):
+        parser.error('--lines reads its records from --file or from the standard input')
+    if (args.lines and (args.verbosity > 0 or args.trace_file)):
+        parser.error('--lines does not display the steps of the computation')
+    if (args.tree_digest and len(args.tree_digest) > 2):
+        parser.error('--tree-digest accepts at most two directories')
+    if (args.tree_digest and (args.lines or args.verbosity > 0 or args.trace_file)):
+        parser.error('--tree-digest does not display the steps of the computation')
+    if (args.tree_cache and not args.tree_digest):
+        parser.error('--tree-cache is only used with --tree-digest')
+    if (args.backend and not backends.get(args.backend).streaming and args.verbosity <= 1 and not args.trace_file
+            and not (args.text is not None or args.test or args.tree_digest or args.lines)):
+        parser.error('--backend %s only hashes whole messages, and cannot hash a file or the standard input in pieces'%(args.backend))
+    if (args.file == '-'):
+        args.file = None
     return args
 
 
+def open_stdin():
+    """
+    Returns the standard input as an unbuffered binary file, so that each read
+    returns whatever the pipe holds, up to the size asked for
+    """
+    return open(sys.stdin.fileno(), 'rb', buffering=0, closefd=False)
+
+
+def progress_reporter():
+    """
+    Returns a function that is called with the number of bytes read so far, and
+    reports the reading rate on stderr at most once every PROGRESS_INTERVAL
+    seconds, along with a function that reports the final rate
+    """
+    start = time.perf_counter()
+    last = [start]
+
+    def report(total):
+        now = time.perf_counter()
+        if (now - last[0] >= PROGRESS_INTERVAL):
+            last[0] = now
+            print('[stdin] %d bytes read, %.0f bytes/s'%(total, total / (now - start)), file=sys.stderr)
+
+    def finish(total):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print('[stdin] %d bytes hashed in %.2f s, %.0f bytes/s'%(total, elapsed, total / elapsed), file=sys.stderr)
+
+    return report, finish
+
+
+def hash_lines(f, algorithms, output):
+    """
+    Hashes every line of f as a record, without its line ending, either '\\n'
+    or '\\r\\n', and writes the hexadecimal hash values of each record to output
+    on one line, separated by spaces when several algorithms are given. The
+    records are read and hashed LINE_BATCH at a time, with the SWAR batch
+    engine when the algorithm has one.
+    """
+    names = [NAMES[algorithm] for algorithm in algorithms]
+    lines = iter(f)
+    while True:
+        records = [line[:-2] if line.endswith(b'\r\n') else line[:-1] if line.endswith(b'\n') else line
+                   for line in itertools.islice(lines, LINE_BATCH)]
+        if not records:
+            break
+
+        columns = []
+        for name in names:
+            if (name in SWAR_ENGINES):
+                columns.append(hash_iter(records, name, batch=LINE_BATCH, lanes=64))
+            else:
+                columns.append(hash_iter(records, name))
+
+        output.write(b''.join(b' '.join(digest.hex().encode() for digest in row) + b'\n' for row in zip(*columns)))
+    output.flush()
+    return
+
+
+def tree_digest(directories, algorithms, workers, cache_path):
+    """
+    Prints the digest of each directory tree for each algorithm, and the
+    entries that differ when two trees are given. The files are hashed by
+    worker processes if workers is set.
+    """
+    cache = tree.load_cache(cache_path) if cache_path else None
+    for algorithm in algorithms:
+        name = NAMES[algorithm]
+        display = ALGORITHMS[name][0].name
+        roots = [tree.digest(directory, name, workers, cache) for directory in directories]
+        for directory, root in zip(directories, roots):
+            if (len(algorithms) > 1):
+                print('%-12s %s  %s'%(display, root.hexdigest(), directory))
+            else:
+                print('%s  %s'%(root.hexdigest(), directory))
+
+        if (len(roots) == 2):
+            for change, path in tree.diff(roots[0], roots[1]):
+                print('%-8s %s'%(change, path))
+    if (cache_path):
+        tree.save_cache(cache, cache_path)
+    return
+
+
 if __name__ == '__main__':
 
     # The default argparse value for the verbosity is 0
     args = parse_args()
+
+    # In --lines mode, every line is hashed on its own and nothing else is displayed
+    if (args.lines):
+        output = open(sys.stdout.fileno(), 'wb', buffering=BUFFER_SIZE, closefd=False)
+        if (args.file):
+            with open(args.file, 'rb', buffering=BUFFER_SIZE) as f:
+                hash_lines(f, args.algorithm, output)
+        else:
+            hash_lines(open(sys.stdin.fileno(), 'rb', buffering=BUFFER_SIZE, closefd=False), args.algorithm, output)
+        sys.exit(0)
+
+    # The digest of a directory tree is computed from the digests of its files,
+    # which are hashed by a pool of worker processes with --parallel
+    if (args.tree_digest):
+        tree_digest(args.tree_digest, args.algorithm, os.cpu_count() if args.parallel else None, args.tree_cache)
+        sys.exit(0)
+
+    # Only the hash value is displayed at verbosity 1, so the input can be hashed
+    # as a stream. From verbosity 2, the steps need the whole message. With
+    # --parallel, the stream is passed to the workers of the MultiHasher
+    streaming = args.verbosity <= 1 and not args.trace_file
+
     if (args.verbosity > 0):
         print()
 
-    # Generate a hasher depending on the specified input
-    if (args.algorithm == '1'):
-        hasher = SHA1(verbose=args.verbosity)
-    elif (args.algorithm == '224'):
-        hasher = SHA224(verbose=args.verbosity)
-    elif (args.algorithm == '256'):
-        hasher = SHA256(verbose=args.verbosity)
-    elif (args.algorithm == '384'):
-        hasher = SHA384(verbose=args.verbosity)
-    elif (args.algorithm == '512'):
-        hasher = SHA512(verbose=args.verbosity)
-    elif (args.algorithm == '512224'):
-        hasher = SHA512_224(verbose=args.verbosity)
-    elif (args.algorithm == '512256'):
-        hasher = SHA512_256(verbose=args.verbosity)
+    # When a trace file is given, the steps of the computation are written
+    # to it instead of the terminal, and the hash value is printed below
+    trace = None
+    if (args.trace_file):
+        trace = TraceWriter(args.trace_file, level=args.verbosity if args.verbosity > 0 else 5)
+
+    # Generate a hasher for each of the specified algorithms. When more than
+    # one is requested, a MultiHasher feeds the input to all of them at once
+    hashers = [ALGORITHMS[NAMES[algorithm]][0](verbose=args.verbosity, trace=trace, backend=args.backend) for algorithm in args.algorithm]
+    if (len(hashers) == 1):
+        hasher = hashers[0]
+    else:
+        hasher = MultiHasher(hashers, workers=args.parallel)
 
     # Handle case where the --test flag is set
+    hash_value = None
     if (args.test):
         message = 'abc'
         hasher.update(message.encode('utf-8'))
 
     # Handle case where the --file flag is set
     elif (args.file):
-        f = open(args.file, 'rb')
-        while True:
-            line = f.readline()
-            if len(line) == 0:
-                break
-            hasher.update(line)
+        # When no steps are displayed, the file is hashed as a stream by all of the
+        # hashers at once, without being held in memory, and its holes are skipped.
+        # With --backend kernel, the file is passed to the kernel without being read.
+        # With --parallel, the workers hash the chunks as they are read
+        if (streaming and len(hashers) > 1 and args.parallel):
+            read_file(args.file, [hasher])
+        elif (streaming):
+            hash_value = hash_file(args.file, hashers)
+            if (len(hashers) == 1):
+                hash_value = hash_value[0]
+        else:
+            f = open(args.file, 'rb')
+            while True:
+                line = f.readline()
+                if len(line) == 0:
+                    break
+                hasher.update(line)
 
     # Handle case where the --text flag is set
-    elif (args.text):
+    elif (args.text is not None):
         message = args.text
         hasher.update(message.encode('utf-8'))
 
+    # Otherwise, the input is read from the standard input in large chunks, for
+    # example from a pipe with `tar c dir | python3 sha.py -a 256`. The reading
+    # rate is reported on stderr from verbosity 1
+    else:
+        stdin = open_stdin()
+        report, finish = progress_reporter()
+        if (streaming):
+            total = [0]
+            def progress(nbytes):
+                total[0] = nbytes
+                if (args.verbosity > 0):
+                    report(nbytes)
+
+            if (len(hashers) > 1 and args.parallel):
+                read_stream(stdin, [hasher], BUFFER_SIZE, progress)
+            else:
+                hash_value = hash_stream(stdin, hashers, BUFFER_SIZE, progress)
+                if (len(hashers) == 1):
+                    hash_value = hash_value[0]
+            total = total[0]
+        else:
+            total = 0
+            while True:
+                chunk = stdin.read(BUFFER_SIZE)
+                if len(chunk) == 0:
+                    break
+                total += len(chunk)
+                hasher.update(chunk)
+                if (args.verbosity > 0):
+                    report(total)
+
+        if (args.verbosity > 0):
+            finish(total)
+
 
     # This executes the hash function calculation and
     # displays the output in the terminal, provided that
     # the hasher's verbosity is 1 or above. The default action
     # is that verbosity is set to 0 and the hash value is printed
     # not by the hasher, but in this function below.
-    hash_value = hasher.digest()
+    if (hash_value is None):
+        hash_value = hasher.digest()
+    if (trace):
+        trace.close()
 
-    if (args.verbosity == 0):
+    if (len(hashers) > 1):
+        hasher.close()
+        if (args.verbosity == 0 or trace):
+            for single, value in zip(hashers, hash_value):
+                print('%-12s %s'%(single.name, value))
+
+    elif (args.verbosity == 0 or trace):
         print(hash_value)
 
     if (args.verbosity > 0):
-        print()
\ No newline at end of file
+        print()
@@ -502,6 +502,1022 @@ class SHA512_256_Test(unittest.TestCase):
 
 
 
+class SHA512_t_Test(unittest.TestCase):
+
+
+    def test_SHA512_t_matches_fixed_truncations(self):
+        message = ''.join(random.choice(string.ascii_letters) for _ in range(300))
+
+        for t, cls in [(224, pySHA.SHA512_224), (256, pySHA.SHA512_256)]:
+            m1 = SHA512.new(truncate=str(t))
+            m1.update(message.encode())
+            hash1 = m1.hexdigest()
+
+            m2 = pySHA.SHA512_t(t, verbose=0)
+            m2.update(message.encode())
+            hash2 = m2.digest()
+
+            self.assertEqual(hash1, hash2)
+            self.assertEqual(m2.H0, cls(verbose=0).H0)
+
+
+    def test_SHA512_t_memoized_iv(self):
+        from pySHA import sha512_t
+        m1 = pySHA.SHA512_t(136, verbose=0)
+        m2 = pySHA.SHA512_t(136, verbose=0)
+        m1.update(b'abc')
+
+        self.assertIs(sha512_t.initial_hash_values(136), sha512_t._IV_CACHE[136])
+        self.assertEqual(m1.H0, sha512_t.generate_hash_values(136))
+        self.assertIs(m2.H0, m1.H0)
+        self.assertEqual(len(m1.digest()), 136 // 4)
+        for t in [0, 384, 100, 512]:
+            self.assertRaises(ValueError, pySHA.SHA512_t, t)
+
+
+
+
+class Tables_Test(unittest.TestCase):
+
+
+    def test_tables_match_rotations(self):
+        m2 = pySHA.SHA256(verbose=0)
+        m3 = pySHA.SHA256_Tables(verbose=0)
+        for _ in range(1000):
+            x = random.getrandbits(32)
+            self.assertEqual(m2.__Sigma0__(x), m3.__Sigma0__(x))
+            self.assertEqual(m2.__Sigma1__(x), m3.__Sigma1__(x))
+            self.assertEqual(m2.__sigma0__(x), m3.__sigma0__(x))
+            self.assertEqual(m2.__sigma1__(x), m3.__sigma1__(x))
+
+
+    def test_tables_engine(self):
+        for n in [0, 3, 55, 56, 64, 1000]:
+            message = ''.join(random.choice(string.ascii_letters) for _ in range(n))
+
+            for cls, ref in [(pySHA.SHA224_Tables, SHA224), (pySHA.SHA256_Tables, SHA256)]:
+                m1 = ref.new()
+                m1.update(message.encode())
+                hash1 = m1.hexdigest()
+
+                for trace in [None, pySHA.TraceSink(5)]:
+                    m2 = cls(verbose=0, trace=trace)
+                    m2.update(message.encode())
+                    hash2 = m2.digest()
+
+                    self.assertEqual(hash1, hash2)
+
+
+
+class SWAR_Test(unittest.TestCase):
+
+
+    def test_swar_batch(self):
+        messages = [''.join(random.choice(string.ascii_letters) for _ in range(random.randint(0, 200))).encode()
+                    for _ in range(50)]
+
+        for lanes in [1, 7, 64]:
+            hashes = pySHA.swar.sha256_batch(messages, lanes)
+            self.assertEqual(hashes, [SHA256.new(message).hexdigest() for message in messages])
+
+            hashes = pySHA.swar.sha1_batch(messages, lanes)
+            self.assertEqual(hashes, [SHA1.new(message).hexdigest() for message in messages])
+
+        self.assertEqual(pySHA.swar.sha256_batch([]), [])
+        self.assertRaises(ValueError, pySHA.swar.sha1_batch, messages, 0)
+
+
+
+class SHA256d_Test(unittest.TestCase):
+
+
+    def test_sha256d(self):
+        for n in [0, 3, 32, 55, 56, 64, 80, 1000]:
+            message = ''.join(random.choice(string.ascii_letters) for _ in range(n)).encode()
+            hash1 = SHA256.new(SHA256.new(message).digest())
+
+            self.assertEqual(pySHA.sha256d(message), hash1.hexdigest())
+            self.assertEqual(pySHA.sha256d(message, raw=True), hash1.digest())
+
+
+    def test_sha256d_batch(self):
+        messages = [''.join(random.choice(string.ascii_letters) for _ in range(random.randint(0, 200))).encode()
+                    for _ in range(40)]
+        hashes = [SHA256.new(SHA256.new(message).digest()).digest() for message in messages]
+
+        self.assertEqual(pySHA.sha256d_batch(messages, raw=True), hashes)
+        self.assertEqual(pySHA.sha256d_batch(messages, lanes=8), [item.hex() for item in hashes])
+
+
+
+class Merkle_Test(unittest.TestCase):
+
+
+    def test_merkle_bitcoin(self):
+        for n in [1, 2, 3, 7, 10]:
+            leaves = [SHA256.new(str(i).encode()).digest() for i in range(n)]
+
+            level = list(leaves)
+            while len(level) > 1:
+                if len(level) % 2 == 1:
+                    level.append(level[-1])
+                level = [SHA256.new(SHA256.new(level[i] + level[i + 1]).digest()).digest() for i in range(0, len(level), 2)]
+
+            self.assertEqual(pySHA.merkle.root(leaves), level[0].hex())
+            self.assertEqual(pySHA.merkle.root(leaves, lanes=4, raw=True), level[0])
+
+
+    def test_merkle_rfc6962(self):
+        def mth(leaves):
+            if len(leaves) == 0:
+                return SHA256.new(b'').digest()
+            if len(leaves) == 1:
+                return SHA256.new(b'\x00' + leaves[0]).digest()
+            k = 1
+            while 2 * k < len(leaves):
+                k = 2 * k
+            return SHA256.new(b'\x01' + mth(leaves[:k]) + mth(leaves[k:])).digest()
+
+        for n in [0, 1, 2, 3, 5, 11]:
+            leaves = [''.join(random.choice(string.ascii_letters) for _ in range(random.randint(0, 80))).encode()
+                      for _ in range(n)]
+            self.assertEqual(pySHA.merkle.root(leaves, scheme='rfc6962'), mth(leaves).hex())
+
+        self.assertRaises(ValueError, pySHA.merkle.root, [b'a' * 32], 'sha1', 'bitcoin')
+        self.assertRaises(ValueError, pySHA.merkle.root, [b'a' * 31])
+
+
+
+class Pipeline_Test(unittest.TestCase):
+
+
+    def test_hash_iter(self):
+        messages = [''.join(random.choice(string.ascii_letters) for _ in range(n)).encode() for n in [0, 3, 55, 56, 64, 111, 112, 128, 300]]
+        references = {'sha1': SHA1, 'sha224': SHA224, 'sha256': SHA256, 'sha384': SHA384, 'sha512': SHA512}
+
+        for name, reference in references.items():
+            digests = pySHA.hash_iter(iter(messages), name)
+            self.assertEqual(list(digests), [reference.new(message).digest() for message in messages])
+
+        for name in ['sha1', 'sha256']:
+            digests = pySHA.hash_iter(iter(messages), name, batch=4, lanes=2)
+            self.assertEqual(list(digests), [references[name].new(message).digest() for message in messages])
+
+        self.assertRaises(ValueError, pySHA.hash_iter, messages, 'sha512', 4)
+
+
+    def test_hash_iter_lazy(self):
+        def records():
+            for i in range(3):
+                yield b'record %d'%(i)
+            raise AssertionError('Read past the first three records')
+
+        digests = pySHA.hash_iter(records())
+        for i in range(3):
+            self.assertEqual(next(digests), SHA256.new(b'record %d'%(i)).digest())
+
+
+
+class ProofOfWork_Test(unittest.TestCase):
+
+
+    def test_search(self):
+        def smallest(prefix, difficulty, count, nonce_size):
+            for nonce in range(count):
+                digest = SHA256.new(prefix + nonce.to_bytes(nonce_size, 'big')).digest()
+                if int.from_bytes(digest, 'big') >> (256 - difficulty) == 0:
+                    return nonce
+            return None
+
+        # Prefixes that leave the nonce, and its padding, in one or two final
+        # blocks, including nonces that run over into the second one
+        for length in [0, 20, 50, 55, 60, 62, 64, 100]:
+            prefix = bytes(random.getrandbits(8) for _ in range(length))
+            for nonce_size in [4, 8]:
+                nonce = pySHA.pow.search(prefix, 5, 0, 200, nonce_size=nonce_size)
+                self.assertEqual(nonce, smallest(prefix, 5, 200, nonce_size))
+                if nonce is not None:
+                    self.assertTrue(pySHA.pow.verify(prefix, nonce, 5, nonce_size))
+
+        # Long nonces run over into a third final block
+        for length, nonce_size in [(63, 60), (10, 150)]:
+            prefix = b'x' * length
+            self.assertEqual(pySHA.pow.search(prefix, 5, 0, 200, nonce_size=nonce_size), smallest(prefix, 5, 200, nonce_size))
+
+        self.assertIsNone(pySHA.pow.search(b'abc', 200, 0, 50))
+        self.assertRaises(ValueError, pySHA.pow.search, b'abc', 4, 250, 10, None, 1)
+
+
+    def test_search_workers(self):
+        prefix = b'challenge:' + bytes(random.getrandbits(8) for _ in range(60))
+        self.assertEqual(pySHA.pow.search(prefix, 8, 0, 3000, workers=2), pySHA.pow.search(prefix, 8, 0, 3000))
+
+
+
+class Backends_Test(unittest.TestCase):
+
+
+    def test_backends(self):
+        messages = [bytes(random.getrandbits(8) for _ in range(n)) for n in [0, 3, 55, 56, 64, 111, 112, 128, 300]]
+        classes = [(pySHA.SHA1, SHA1), (pySHA.SHA224, SHA224), (pySHA.SHA256, SHA256), (pySHA.SHA384, SHA384), (pySHA.SHA512, SHA512)]
+
+        for name in pySHA.backends.available():
+            for cls, reference in classes:
+                m2 = cls(verbose=0, backend=name)
+                self.assertEqual(m2.digest_batch(messages), [reference.new(message).hexdigest() for message in messages])
+                for message in messages[:4]:
+                    m2.update(message)
+                    self.assertEqual(m2.digest(), reference.new(message).hexdigest())
+                    m2.reset()
+
+        self.assertRaises(ValueError, pySHA.SHA256, 0, None, 'unknown')
+
+
+    def test_backend_selection(self):
+        m2 = pySHA.SHA512(verbose=0, backend='swar')
+        self.assertEqual(pySHA.backends.select(m2).name, 'python')
+        self.assertEqual(pySHA.backends.select(pySHA.SHA256(verbose=3)).name, 'reference')
+        self.assertEqual(pySHA.backends.select_batch(pySHA.SHA256(verbose=0), 1).name, 'python')
+        self.assertEqual(pySHA.backends.select_batch(pySHA.SHA256(verbose=0), pySHA.backends.SWAR_MIN_BATCH).name, 'swar')
+
+
+    @unittest.skipUnless(pySHA.jit.available(), 'Numba is not installed')
+    def test_numba(self):
+        from Crypto.Hash import SHA512 as SHA512_t
+        classes = [(pySHA.SHA1, SHA1.new), (pySHA.SHA224, SHA224.new), (pySHA.SHA256, SHA256.new), (pySHA.SHA384, SHA384.new),
+                   (pySHA.SHA512, SHA512.new), (pySHA.SHA512_224, lambda data: SHA512_t.new(data, truncate='224')),
+                   (pySHA.SHA512_256, lambda data: SHA512_t.new(data, truncate='256'))]
+
+        # The same messages as the abc and robustness_1 tests of each algorithm
+        message = 'abc'
+        for cls, reference in classes:
+            m2 = cls(verbose=0, backend='numba')
+            m2.update(message.encode())
+            self.assertEqual(pySHA.backends.select(m2).name, 'numba')
+            self.assertEqual(m2.digest(), reference(message.encode()).hexdigest())
+
+        message = ''
+        for i in range(1, 1250, 4):
+            message = message + random.choice(string.ascii_letters)
+            for cls, reference in classes:
+                m2 = cls(verbose=0, backend='numba')
+                m2.update(message.encode())
+                self.assertEqual(m2.digest(), reference(message.encode()).hexdigest(), 'Failed with message length: ' + str(len(message)))
+
+
+    def test_backend_streams(self):
+        import io
+        message = bytes(random.getrandbits(8) for _ in range(3000)) + bytes(5000) + b'end'
+        for name in ['python', 'hashlib', 'numba']:
+            if name not in pySHA.backends.available():
+                continue
+            hashers = [pySHA.SHA1(verbose=0, backend=name), pySHA.SHA384(verbose=0, backend=name)]
+            stream = pySHA.streaming.open_stream(hashers[0])
+            self.assertTrue(pySHA.backends.get(name).streaming)
+            stream.update(message[:3000])
+            stream.update_zeros(5000)
+            stream.update(message[8000:])
+            self.assertEqual(stream.digest(), SHA1.new(message).hexdigest())
+
+            self.assertEqual(pySHA.streaming.hash_stream(io.BytesIO(message), hashers, chunk_size=777),
+                             [SHA1.new(message).hexdigest(), SHA384.new(message).hexdigest()])
+
+        self.assertIsInstance(pySHA.streaming.open_stream(pySHA.SHA256(verbose=0, backend='swar')), pySHA.streaming.Stream)
+
+
+    @unittest.skipIf(pySHA.vectorized.numpy is None, 'NumPy is not installed')
+    def test_numpy_batch(self):
+        messages = [bytes(random.getrandbits(8) for _ in range(random.randint(0, 400))) for _ in range(100)]
+        for cls, reference in [(pySHA.SHA1, SHA1), (pySHA.SHA256, SHA256), (pySHA.SHA512, SHA512)]:
+            m2 = cls(verbose=0)
+            self.assertEqual(pySHA.backends.select_batch(m2, len(messages)).name, 'numpy')
+            self.assertEqual(m2.digest_batch(messages), [reference.new(message).hexdigest() for message in messages])
+
+
+
+class Kernel_Test(unittest.TestCase):
+
+
+    def test_kernel_fallback(self):
+        import os
+        import tempfile
+        message = bytes(random.getrandbits(8) for _ in range(3000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'message')
+            with open(path, 'wb') as f:
+                f.write(message)
+
+            # SHA-512/256 is never passed to the kernel, and the other hashers
+            # fall back to the Python streams where AF_ALG is missing
+            hashers = [pySHA.SHA1(verbose=0, backend='kernel'), pySHA.SHA512_256(verbose=0, backend='kernel'),
+                       pySHA.SHA256(verbose=0)]
+            self.assertEqual(pySHA.streaming.hash_file(path, hashers)[::2], [SHA1.new(message).hexdigest(), SHA256.new(message).hexdigest()])
+            self.assertFalse(pySHA.kernel.supports(hashers[1]))
+
+
+    @unittest.skipUnless(pySHA.kernel.available(), 'AF_ALG sockets are not available')
+    def test_kernel_stream(self):
+        import os
+        import tempfile
+        message = bytes(random.getrandbits(8) for _ in range(5000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'message')
+            with open(path, 'wb') as f:
+                f.write(message)
+
+            for cls, reference in [(pySHA.SHA1, SHA1), (pySHA.SHA224, SHA224), (pySHA.SHA256, SHA256), (pySHA.SHA384, SHA384), (pySHA.SHA512, SHA512)]:
+                m2 = cls(verbose=0, backend='kernel')
+                self.assertEqual(pySHA.kernel.digest_file(m2, path), reference.new(message).hexdigest())
+                m2.update(message)
+                self.assertEqual(m2.digest(), reference.new(message).hexdigest())
+
+                with pySHA.kernel.Stream(m2) as stream, open(path, 'rb') as f:
+                    stream.update(message[:100])
+                    self.assertEqual(stream.digest(), reference.new(message[:100]).hexdigest())
+                    stream.update_file(f.fileno(), 100, 4000)
+                    stream.update_zeros(300)
+                    self.assertEqual(stream.digest(), reference.new(message[:4100] + bytes(300)).hexdigest())
+
+
+    @unittest.skipUnless(pySHA.kernel.available() and hasattr(__import__('os'), 'mkfifo'), 'AF_ALG sockets or FIFOs are not available')
+    def test_kernel_fifo(self):
+        import os
+        import tempfile
+        import threading
+        message = bytes(random.getrandbits(8) for _ in range(5000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'message.fifo')
+            os.mkfifo(path)
+
+            def write():
+                with open(path, 'wb') as f:
+                    f.write(message)
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            self.assertEqual(pySHA.kernel.digest_file(pySHA.SHA256(verbose=0, backend='kernel'), path, b'prefix'),
+                             SHA256.new(b'prefix' + message).hexdigest())
+            writer.join()
+
+
+
+class CAS_Test(unittest.TestCase):
+
+
+    def test_put_get(self):
+        import io
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            store = pySHA.cas.Store(directory, 'sha512')
+            message = random.randbytes(100000)
+            digest = store.put(io.BytesIO(message))
+            self.assertEqual(digest, SHA512.new(message).hexdigest())
+
+            # The same contents are only stored once
+            self.assertEqual(store.put(message), digest)
+            self.assertEqual(os.listdir(os.path.join(directory, 'objects')), [digest[:2]])
+            self.assertEqual(os.listdir(os.path.join(directory, 'tmp')), [])
+
+            contents = store.get(digest)
+            self.assertEqual(contents[:], message)
+            contents.close()
+            self.assertEqual(store.get(store.put(b'')), b'')
+            self.assertRaises(KeyError, store.get, SHA512.new(b'missing').hexdigest())
+            self.assertRaises(ValueError, store.path, 'abc')
+
+            # A store opened again finds the objects on disk
+            self.assertTrue(pySHA.cas.Store(directory, 'sha512').has(digest))
+
+
+    def test_verify(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            with pySHA.cas.Store(directory, 'sha1') as store:
+                digests = [store.put(b'object %d'%(i)) for i in range(5)]
+                path = store.path(digests[2])
+                os.chmod(path, 0o644)
+                with open(path, 'r+b') as f:
+                    f.write(b'O')
+
+                store.verify_in_background().join()
+                self.assertEqual(store.corrupted, [digests[2]])
+                self.assertFalse(store.has(digests[2]))
+                self.assertEqual(os.listdir(os.path.join(directory, 'corrupt')), [digests[2]])
+                self.assertEqual(store.put(b'object 2'), digests[2])
+                self.assertTrue(store.verify(digests[2]))
+
+
+    def test_verify_missing_object(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            with pySHA.cas.Store(directory, 'sha256') as store:
+                digests = [store.put(b'object %d'%(i)) for i in range(3)]
+                os.remove(store.path(digests[0]))
+
+                self.assertEqual(store.verify_all(), [])
+                self.assertFalse(store.has(digests[0]))
+                self.assertTrue(store.has(digests[1]))
+                self.assertEqual(os.listdir(os.path.join(directory, 'corrupt')), [])
+
+
+    def test_verify_does_not_block_put(self):
+        import tempfile
+        import threading
+        from unittest import mock
+        hash_file = pySHA.streaming.hash_file
+        started = threading.Event()
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow_hash_file(*args):
+            started.set()
+            release.wait(10)
+            finished.set()
+            return hash_file(*args)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with pySHA.cas.Store(directory, 'sha256') as store:
+                digest = store.put(b'object')
+                with mock.patch.object(pySHA.cas.streaming, 'hash_file', slow_hash_file):
+                    verifier = store.verify_in_background()
+                    started.wait(10)
+                    self.assertEqual(store.put(b'another object'), SHA256.new(b'another object').hexdigest())
+                    self.assertFalse(finished.is_set())
+                    release.set()
+                    verifier.join()
+                self.assertEqual(store.corrupted, [])
+                self.assertTrue(store.has(digest))
+
+
+
+class Git_Test(unittest.TestCase):
+
+
+    def test_blob_tree_ids(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'hello')
+            with open(path, 'wb') as f:
+                f.write(b'hello\n')
+            self.assertEqual(pySHA.git.blob_id(path), 'ce013625030ba8dba906f756967f9e9ca394464a')
+            self.assertEqual(pySHA.git.blob_id(path, 'sha256'), SHA256.new(b'blob 6\x00hello\n').hexdigest())
+
+        self.assertEqual(pySHA.git.tree_id([]), '4b825dc642cb6eb9a060e54bf8d69288fbee4904')
+        self.assertEqual(pySHA.git.tree_id([], 'sha256'), '6ef19b41225c5369f1c104d45d8d85efa9b057b53b14b4b9b939dd74decc5321')
+        self.assertRaises(ValueError, pySHA.git.tree_id, [], 'md5')
+
+
+    def test_worktree(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'a'))
+            os.makedirs(os.path.join(directory, 'empty'))
+            os.makedirs(os.path.join(directory, '.git'))
+            content = random.randbytes(5000)
+            for name, data in [('a/x', content), ('a.b', b'dot'), ('.git/HEAD', b'ref')]:
+                with open(os.path.join(directory, name), 'wb') as f:
+                    f.write(data)
+            os.chmod(os.path.join(directory, 'a.b'), 0o755)
+
+            for object_format, reference in [('sha1', SHA1), ('sha256', SHA256)]:
+                x = reference.new(b'blob 5000\x00' + content).digest()
+                dot = reference.new(b'blob 3\x00dot').digest()
+                a = b'100644 x\x00' + x
+                a = reference.new(b'tree %d\x00'%(len(a)) + a).digest()
+
+                # 'a.b' comes before the directory 'a', which is sorted as 'a/'
+                top = b'100755 a.b\x00' + dot + b'40000 a\x00' + a
+                objects = pySHA.git.worktree(directory, object_format, workers=2)
+                self.assertEqual(objects, pySHA.git.worktree(directory, object_format))
+                self.assertEqual(objects[''], ('40000', reference.new(b'tree %d\x00'%(len(top)) + top).hexdigest()))
+                self.assertEqual(sorted(objects), ['', 'a', 'a.b', 'a/x'])
+
+
+
+class Tree_Test(unittest.TestCase):
+
+
+    def make_tree(self, directory):
+        import os
+        os.makedirs(os.path.join(directory, 'a', 'b'))
+        os.makedirs(os.path.join(directory, 'empty'))
+        for path, data in [('a/x.txt', b'hello'), ('a/b/y.bin', random.randbytes(3000)), ('c.txt', b'')]:
+            with open(os.path.join(directory, path), 'wb') as f:
+                f.write(data)
+        os.symlink('c.txt', os.path.join(directory, 'link'))
+
+
+    def test_tree_digest(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            self.make_tree(directory)
+            root = pySHA.tree.digest(directory)
+            self.assertEqual(root.hexdigest(), pySHA.tree.digest(directory, workers=2).hexdigest())
+
+            # The walk waits for the workers once too many files are pending
+            limit = pySHA.tree.MAX_PENDING
+            pySHA.tree.MAX_PENDING = 1
+            try:
+                self.assertEqual(root.hexdigest(), pySHA.tree.digest(directory, workers=2).hexdigest())
+            finally:
+                pySHA.tree.MAX_PENDING = limit
+
+            # The entries of a directory are hashed in the order of their names
+            with open(os.path.join(directory, 'a', 'b', 'y.bin'), 'rb') as f:
+                y = SHA256.new(f.read()).digest()
+            b = SHA256.new(b'100644 y.bin\x00' + y).digest()
+            mode = os.stat(os.path.join(directory, 'a', 'b')).st_mode
+            a = SHA256.new(b'%o b\x00'%(mode) + b + b'100644 x.txt\x00' + SHA256.new(b'hello').digest()).digest()
+            self.assertEqual(root.children['a'].digest, a)
+            self.assertEqual(root.children['link'].digest, SHA256.new(b'c.txt').digest())
+            self.assertEqual(root.children['empty'].digest, SHA256.new(b'').digest())
+
+
+    def test_tree_cache_diff(self):
+        import os
+        import shutil
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            old = os.path.join(directory, 'old')
+            new = os.path.join(directory, 'new')
+            self.make_tree(old)
+
+            # Files modified just now are not cached, since they may still change
+            cache = {}
+            pySHA.tree.digest(old, 'sha1', cache=cache)
+            self.assertEqual(cache, {})
+            for path in ['a/x.txt', 'a/b/y.bin', 'c.txt']:
+                os.utime(os.path.join(old, path), ns=(10**18, 10**18))
+            root = pySHA.tree.digest(old, 'sha1', cache=cache)
+            self.assertEqual(len(cache), 3)
+
+            # A cached digest is used as long as the metadata of the file has not changed
+            key = 'sha1:%s'%(os.path.join(old, 'a', 'x.txt'))
+            cache[key][3] = SHA1.new(b'cached').hexdigest()
+            self.assertEqual(pySHA.tree.digest(old, 'sha1', cache=cache).children['a'].children['x.txt'].hexdigest(), cache[key][3])
+            del cache[key]
+
+            shutil.copytree(old, new, symlinks=True)
+            self.assertEqual(list(pySHA.tree.diff(root, pySHA.tree.digest(new, 'sha1'))), [])
+            with open(os.path.join(new, 'a', 'b', 'y.bin'), 'ab') as f:
+                f.write(b'more')
+            with open(os.path.join(new, 'a', 'z.txt'), 'wb') as f:
+                f.write(b'new')
+            os.remove(os.path.join(new, 'c.txt'))
+            os.chmod(os.path.join(new, 'empty'), 0o700)
+            self.assertEqual(list(pySHA.tree.diff(root, pySHA.tree.digest(new, 'sha1', cache=cache))), [
+                ('modified', 'a/b/y.bin'), ('added', 'a/z.txt'), ('removed', 'c.txt'), ('modified', 'empty')])
+
+
+
+class Schedules_Test(unittest.TestCase):
+
+
+    def test_padding_blocks(self):
+        pySHA.schedules.clear_cache()
+        classes = [(pySHA.SHA1, SHA1), (pySHA.SHA256, SHA256), (pySHA.SHA512, SHA512)]
+
+        # Block aligned messages and messages whose padding does not fit in their
+        # last block end with a block holding only padding, hashed twice each
+        for _ in range(2):
+            for length in [0, 56, 63, 64, 120, 128, 1024]:
+                message = ''.join(random.choice(string.ascii_letters) for _ in range(length))
+                for cls, reference in classes:
+                    m2 = cls(verbose=0)
+                    m2.update(message.encode())
+                    self.assertEqual(m2.digest(), reference.new(message.encode()).hexdigest())
+
+        self.assertIn((pySHA.SHA256.__schedule__, 64), pySHA.schedules._PADDING_CACHE)
+        self.assertIn((pySHA.SHA512.__schedule__, 128), pySHA.schedules._PADDING_CACHE)
+        self.assertNotIn((pySHA.SHA512.__schedule__, 63), pySHA.schedules._PADDING_CACHE)
+
+
+
+class Streaming_Test(unittest.TestCase):
+
+
+    def test_stream_pieces(self):
+        for _ in range(20):
+            message = bytearray(random.getrandbits(8) for _ in range(random.randint(0, 600)))
+            start = random.randint(0, len(message))
+            message[start : start + 300] = bytes(len(message[start : start + 300]))
+
+            streams = [pySHA.streaming.Stream(pySHA.SHA1(verbose=0)), pySHA.streaming.Stream(pySHA.SHA512(verbose=0))]
+            i = 0
+            while i < len(message):
+                piece = bytes(message[i : i + random.randint(1, 150)])
+                for stream in streams:
+                    if piece == bytes(len(piece)):
+                        stream.update_zeros(len(piece))
+                    else:
+                        stream.update(piece)
+                i += len(piece)
+
+            self.assertEqual(streams[0].digest(), SHA1.new(bytes(message)).hexdigest())
+            self.assertEqual(streams[1].digest(), SHA512.new(bytes(message)).hexdigest())
+
+
+    def test_sparse_file(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sparse.img')
+            with open(path, 'wb') as f:
+                f.truncate(1 << 18)
+                f.seek(8192)
+                f.write(b'data' * 1000)
+                f.seek((1 << 17) + 5)
+                f.write(b'more data')
+
+            with open(path, 'rb') as f:
+                message = f.read()
+                regions = list(pySHA.streaming.regions(f))
+            self.assertEqual(sum(length for _, length, _ in regions), len(message))
+
+            hashers = [pySHA.SHA1(verbose=0), pySHA.SHA224(verbose=0), pySHA.SHA384(verbose=0)]
+            self.assertEqual(pySHA.streaming.hash_file(path, hashers, chunk_size=1000), [
+                SHA1.new(message).hexdigest(), SHA224.new(message).hexdigest(), SHA384.new(message).hexdigest()])
+
+
+    @unittest.skipUnless(hasattr(__import__('os'), 'mkfifo'), 'FIFOs are not supported')
+    def test_fifo_file(self):
+        import os
+        import tempfile
+        import threading
+        message = bytes(random.getrandbits(8) for _ in range(5000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'input.fifo')
+            os.mkfifo(path)
+
+            def write():
+                with open(path, 'wb') as f:
+                    f.write(message)
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            hash_values = pySHA.streaming.hash_file(path, [pySHA.SHA256(verbose=0), pySHA.SHA1(verbose=0)], chunk_size=999)
+            writer.join()
+            self.assertEqual(hash_values, [SHA256.new(message).hexdigest(), SHA1.new(message).hexdigest()])
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            with open(path, 'rb') as f:
+                self.assertRaises(ValueError, list, pySHA.streaming.regions(f))
+                f.read()
+                writer.join()
+
+
+    def test_hash_stream(self):
+        import io
+        message = bytes(random.getrandbits(8) for _ in range(5000))
+        totals = []
+        hash_values = pySHA.streaming.hash_stream(io.BytesIO(message), [pySHA.SHA256(verbose=0), pySHA.SHA512(verbose=0)],
+                                                  chunk_size=999, progress=totals.append)
+
+        self.assertEqual(hash_values, [SHA256.new(message).hexdigest(), SHA512.new(message).hexdigest()])
+        self.assertEqual(totals, [min(999 * (i + 1), 5000) for i in range(6)])
+
+
+
+class MultiHasher_Test(unittest.TestCase):
+
+
+    def test_MultiHasher_matches_individual_hashers(self):
+        message = ''
+        for _ in range(2500):
+            message = message + random.choice(string.ascii_letters)
+
+        m1 = pySHA.MultiHasher([pySHA.SHA1(verbose=0), pySHA.SHA256(verbose=0), pySHA.SHA512(verbose=0)])
+        for i in range(0, len(message), 100):
+            m1.update(message[i : i + 100].encode())
+        hashes = m1.digest()
+
+        self.assertEqual(hashes[0], SHA1.new(message.encode()).hexdigest())
+        self.assertEqual(hashes[1], SHA256.new(message.encode()).hexdigest())
+        self.assertEqual(hashes[2], SHA512.new(message.encode()).hexdigest())
+
+
+    def test_MultiHasher_zeros(self):
+        import hashlib
+        import tracemalloc
+        message = bytes(random.getrandbits(8) for _ in range(500)) + bytes(5000) + b'end'
+        with pySHA.MultiHasher([pySHA.SHA256(verbose=0), pySHA.SHA1(verbose=0)]) as m1:
+            m1.update(message[:500])
+            m1.update_zeros(5000)
+            m1.update(message[5500:])
+            self.assertEqual(m1.digest(), [SHA256.new(message).hexdigest(), SHA1.new(message).hexdigest()])
+
+        # A large run of zeros is never created in memory at once
+        reference = hashlib.sha256()
+        for _ in range(128):
+            reference.update(bytes(1 << 20))
+        with pySHA.MultiHasher([pySHA.SHA256(verbose=0, backend='hashlib')]) as m1:
+            tracemalloc.start()
+            m1.update_zeros(1 << 27)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertLess(peak, 1 << 24)
+            self.assertEqual(m1.digest(), [reference.hexdigest()])
+
+
+    def test_MultiHasher_workers(self):
+        message = 'abc'
+
+        with pySHA.MultiHasher([pySHA.SHA1(verbose=0), pySHA.SHA384(verbose=0)], workers=True) as m1:
+            m1.update(message.encode())
+            hashes = m1.digest()
+
+        self.assertEqual(hashes[0], SHA1.new(message.encode()).hexdigest())
+        self.assertEqual(hashes[1], SHA384.new(message.encode()).hexdigest())
+
+
+    def test_MultiHasher_workers_stream(self):
+        message = bytes(random.getrandbits(8) for _ in range(3000)) + bytes(10000) + b'abc'
+
+        with pySHA.MultiHasher([pySHA.SHA256(verbose=0), pySHA.SHA512(verbose=0, backend='hashlib')], workers=True) as m1:
+            m1.update(message[:1000])
+            hashes = m1.digest()
+            self.assertEqual(hashes[0], SHA256.new(message[:1000]).hexdigest())
+            m1.update(message[1000:3000])
+            m1.update_zeros(10000)
+            m1.update(message[13000:])
+            hashes = m1.digest()
+
+        self.assertEqual(hashes[0], SHA256.new(message).hexdigest())
+        self.assertEqual(hashes[1], SHA512.new(message).hexdigest())
+
+
+
+
+class Profiling_Test(unittest.TestCase):
+
+
+    def test_profiling_counters(self):
+        message = 'a' * 1000
+
+        m2 = pySHA.SHA256(verbose=0)
+        with pySHA.profile(m2) as stats:
+            m2.update(message[:500].encode())
+            m2.update(message[500:].encode())
+            hash2 = m2.digest()
+
+        self.assertEqual(hash2, SHA256.new(message.encode()).hexdigest())
+        self.assertEqual(stats.updates, 2)
+        self.assertEqual(stats.bytes, 1000)
+        self.assertEqual(stats.digests, 1)
+        self.assertEqual(stats.blocks, 16)
+        self.assertGreater(stats.compression_time, 0)
+        self.assertIsNone(m2.stats)
+
+
+    def test_profiling_shared_stats(self):
+        stats = pySHA.HashStats()
+        m1 = pySHA.SHA1(verbose=0)
+        m2 = pySHA.SHA512(verbose=0)
+        m1.enable_profiling(stats)
+        m2.enable_profiling(stats)
+
+        m1.update(b'abc')
+        m2.update(b'abc')
+        m1.digest()
+        m2.digest()
+
+        self.assertEqual(stats.digests, 2)
+        self.assertEqual(stats.blocks, 2)
+        self.assertIs(m1.disable_profiling(), stats)
+
+
+
+class Tracing_Test(unittest.TestCase):
+
+
+    def test_tracing_custom_sink(self):
+        message = 'a' * 100
+
+        class Recorder(pySHA.TraceSink):
+            def __init__(self):
+                self.level = 5
+                self.rounds = 0
+                self.states = []
+            def round(self, algorithm, block, t, T1, T2, variables):
+                self.rounds += 1
+            def state(self, algorithm, block, H):
+                self.states.append(list(H))
+
+        for cls, ref, rounds in [(pySHA.SHA1, SHA1, 80), (pySHA.SHA256, SHA256, 64), (pySHA.SHA512, SHA512, 80)]:
+            sink = Recorder()
+            m2 = cls(verbose=0, trace=sink)
+            m2.update(message.encode())
+            hash2 = m2.digest()
+
+            nblocks = len(sink.states) - 1
+            self.assertEqual(hash2, ref.new(message.encode()).hexdigest())
+            self.assertEqual(sink.rounds, rounds * nblocks)
+            self.assertEqual(sink.states[0], list(cls.H0))
+
+
+    def test_tracing_writer_render(self):
+        import io, os, tempfile
+        message = 'abc'
+
+        for suffix in ['.jsonl', '.jsonl.gz']:
+            fd, path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+            try:
+                with pySHA.TraceWriter(path, buffer_size=16) as trace:
+                    m2 = pySHA.SHA224(verbose=0, trace=trace)
+                    m2.update(message.encode())
+                    hash2 = m2.digest()
+
+                events = list(pySHA.tracing.read(path))
+                self.assertEqual(hash2, SHA224.new(message.encode()).hexdigest())
+                self.assertEqual(events[-1], ['output', 'SHA-224', hash2])
+                self.assertEqual(sum(1 for event in events if event[0] == 'schedule'), 64)
+
+                rendered = io.StringIO()
+                pySHA.tracing.render(path, level=2, file=rendered)
+                lines = rendered.getvalue().splitlines()
+                self.assertEqual(lines[0], '[SHA-224] Beginning Preprocessing')
+                self.assertEqual(lines[-1], '[SHA-224] Output Hash: %64s'%(hash2))
+            finally:
+                os.remove(path)
+
+
+    def test_tracing_round_level(self):
+        import os, tempfile
+        message = 'abc'
+
+        for level, rounds in [(3, 0), (4, 64)]:
+            fd, path = tempfile.mkstemp(suffix='.jsonl')
+            os.close(fd)
+            try:
+                with pySHA.TraceWriter(path, level=level) as trace:
+                    m2 = pySHA.SHA256(verbose=0, trace=trace)
+                    m2.update(message.encode())
+                    hash2 = m2.digest()
+
+                events = list(pySHA.tracing.read(path))
+                self.assertEqual(hash2, SHA256.new(message.encode()).hexdigest())
+                self.assertEqual(sum(1 for event in events if event[0] == 'schedule'), 64)
+                self.assertEqual(sum(1 for event in events if event[0] == 'round'), rounds)
+            finally:
+                os.remove(path)
+
+
+
+class SharedBatchHasher_Test(unittest.TestCase):
+
+
+    def test_shared_batches(self):
+        classes = {'sha1': SHA1, 'sha224': SHA224, 'sha512': SHA512}
+        for name, reference in classes.items():
+            with pySHA.SharedBatchHasher(name, workers=2) as hasher:
+                for count in [40, 100]:
+                    messages = [random.randbytes(random.randint(0, 300)) for _ in range(count)]
+                    self.assertEqual(hasher.hash(messages), [reference.new(message).digest() for message in messages])
+                self.assertEqual(hasher.hash([]), [])
+
+
+    def test_shared_arena_growth(self):
+        with pySHA.SharedBatchHasher('sha256', workers=2, backend='hashlib') as hasher:
+            # The second batch does not fit in the arena of the first one
+            for messages in [[b'message %d'%(i) for i in range(500)], [random.randbytes(1 << 19) for _ in range(3)]]:
+                self.assertEqual(hasher.hash(messages), [SHA256.new(message).digest() for message in messages])
+            self.assertGreater(hasher.arena.size, pySHA.shared.MIN_ARENA_SIZE)
+
+
+
+class HasherPool_Test(unittest.TestCase):
+
+
+    def test_reset_reuse(self):
+        messages = [''.join(random.choice(string.ascii_letters) for _ in range(n)) for n in [3, 200, 0, 64]]
+
+        # The hasher is reused on both the fast path and the step by step path
+        for trace in [None, pySHA.TraceSink(5)]:
+            m2 = pySHA.SHA512(verbose=0, trace=trace)
+            H = m2.H
+            for message in messages:
+                m2.update(message.encode())
+                hash2 = m2.digest()
+                self.assertEqual(hash2, SHA512.new(message.encode()).hexdigest())
+                m2.reset()
+
+            self.assertEqual(list(m2.H), list(pySHA.SHA512.H0))
+            self.assertEqual(m2.get_current_input(), b'')
+            if trace is None:
+                self.assertIs(m2.H, H)
+
+
+    def test_pool_threads(self):
+        import threading
+        pool = pySHA.HasherPool(pySHA.SHA256, maxsize=4)
+        errors = []
+
+        def work(n):
+            for i in range(20):
+                message = ('%d-%d'%(n, i)).encode()
+                with pool.hasher() as m2:
+                    m2.update(message)
+                    if m2.digest() != SHA256.new(message).hexdigest():
+                        errors.append(message)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.stats()
+        self.assertEqual(errors, [])
+        self.assertEqual(stats['hits'] + stats['misses'], 80)
+        self.assertLessEqual(stats['idle'], 4)
+        self.assertGreater(pool.hit_rate(), 0.5)
+
+
+
+
+class Command_Test(unittest.TestCase):
+
+
+    def run_sha(self, arguments, stdin=b''):
+        import os
+        import subprocess
+        import sys
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sha.py')
+        return subprocess.run([sys.executable, script] + arguments, input=stdin, capture_output=True, timeout=60)
+
+
+    def test_empty_text(self):
+        import hashlib
+        result = self.run_sha(['-a', '256', '-t', ''], stdin=b'not the message')
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout.decode().strip(), hashlib.sha256(b'').hexdigest())
+
+        result = self.run_sha(['-a', '256', '--lines', '-t', ''])
+        self.assertNotEqual(result.returncode, 0)
+
+
+    def test_lines(self):
+        import hashlib
+        records = [''.join(random.choice(string.ascii_letters) for _ in range(random.randint(0, 80))).encode() for _ in range(300)]
+
+        result = self.run_sha(['-a', '256', '--lines'], stdin=b''.join(record + b'\n' for record in records))
+        self.assertEqual(result.stdout.decode().split('\n')[:-1], [hashlib.sha256(record).hexdigest() for record in records])
+
+        result = self.run_sha(['-a', '1', '-a', '512', '--lines'], stdin=b''.join(record + b'\n' for record in records))
+        self.assertEqual(result.stdout.decode().split('\n')[:-1],
+                         [hashlib.sha1(record).hexdigest() + ' ' + hashlib.sha512(record).hexdigest() for record in records])
+
+
+    def test_lines_endings(self):
+        import hashlib
+        result = self.run_sha(['-a', '256', '--lines'], stdin=b'alice\nbob')
+        self.assertEqual(result.stdout.decode().split(), [hashlib.sha256(b'alice').hexdigest(), hashlib.sha256(b'bob').hexdigest()])
+
+        result = self.run_sha(['-a', '256', '--lines'], stdin=b'alice\r\nbob\r\n\r\ncarol\r\r\n')
+        self.assertEqual(result.stdout.decode().split(), [hashlib.sha256(record).hexdigest() for record in [b'alice', b'bob', b'', b'carol\r']])
+
+
+    def test_stdin_file(self):
+        import hashlib
+        message = bytes(random.getrandbits(8) for _ in range(10000))
+        result = self.run_sha(['-a', '256', '-f', '/dev/stdin'], stdin=message)
+        self.assertEqual(result.stdout.decode().strip(), hashlib.sha256(message).hexdigest())
+
+        result = self.run_sha(['-a', '256', '-b', 'kernel', '-f', '/dev/stdin'], stdin=message)
+        self.assertEqual(result.stdout.decode().strip(), hashlib.sha256(message).hexdigest())
+
+        result = self.run_sha(['-a', '256', '-a', '1', '-p', '-f', '/dev/stdin'], stdin=message)
+        self.assertEqual(result.stdout.decode().split()[1::2], [hashlib.sha256(message).hexdigest(), hashlib.sha1(message).hexdigest()])
+
+
+    def test_backend_file(self):
+        import hashlib
+        import os
+        import tempfile
+        message = bytes(random.getrandbits(8) for _ in range(10000))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'input.bin')
+            with open(path, 'wb') as f:
+                f.write(message)
+
+            result = self.run_sha(['-a', '256', '-b', 'hashlib', '-f', path])
+            self.assertEqual(result.stdout.decode().strip(), hashlib.sha256(message).hexdigest())
+            result = self.run_sha(['-a', '1', '-b', 'hashlib'], stdin=message)
+            self.assertEqual(result.stdout.decode().strip(), hashlib.sha1(message).hexdigest())
+
+            result = self.run_sha(['-a', '256', '-b', 'swar', '-f', path])
+            self.assertNotEqual(result.returncode, 0)
+
+
+
 
 
 if __name__ == '__main__':